@@ -0,0 +1,101 @@
+"""
+Compare the native vector index (exact and HNSW) against the Chroma backend.
+
+    python -m benchmarks.bench_vector_backends --sizes 1000 10000 --dim 384
+
+Reports add throughput (including any background index build, also shown
+on its own as "build s"), mean/p95 query latency and recall@k against exact
+search on random unit vectors. Chroma is skipped if chromadb is not installed.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from core.memory.backends import create_backend
+from core.memory.similarity import l2_normalize, top_k
+
+
+def _run(name: str, backend, data: np.ndarray, queries: np.ndarray, k: int, batch: int) -> Dict:
+    n = data.shape[0]
+    start = time.perf_counter()
+    for i in range(0, n, batch):
+        chunk = data[i:i + batch]
+        ids = [str(j) for j in range(i, i + chunk.shape[0])]
+        backend.add(ids, chunk, ids, [{"n": j} for j in range(i, i + chunk.shape[0])])
+    build_start = time.perf_counter()
+    if hasattr(backend, "wait_for_index"):
+        # The HNSW graph builds in the background: count it as part of adding, and
+        # time queries against the finished graph rather than the interim exact scan
+        backend.wait_for_index()
+    build_seconds = time.perf_counter() - build_start
+    add_seconds = time.perf_counter() - start
+
+    latencies: List[float] = []
+    recall = 0.0
+    for query in queries:
+        exact = set(top_k(data @ query, k)[0].tolist())
+        start = time.perf_counter()
+        results = backend.query(query, k)
+        latencies.append(time.perf_counter() - start)
+        recall += len(exact & {int(r["id"]) for r in results}) / k
+
+    return {
+        "backend": name,
+        "n": n,
+        "adds_per_s": n / add_seconds,
+        "build_s": build_seconds,
+        "query_ms_mean": 1000 * float(np.mean(latencies)),
+        "query_ms_p95": 1000 * float(np.percentile(latencies, 95)),
+        "recall": recall / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for n in args.sizes:
+        data = l2_normalize(rng.standard_normal((n, args.dim)).astype(np.float32))
+        queries = l2_normalize(rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+        configs = [
+            ("native-exact", "native", {"hnsw_threshold": n + 1}),
+            ("native-hnsw", "native", {"hnsw_threshold": 1}),
+            ("chroma", "chroma", {}),
+        ]
+        for label, kind, options in configs:
+            workdir = tempfile.mkdtemp(prefix="bench_vec_")
+            try:
+                backend = create_backend(kind, workdir, "bench", **options)
+            except ImportError as e:
+                print(f"skipping {label}: {e}")
+                shutil.rmtree(workdir, ignore_errors=True)
+                continue
+            try:
+                rows.append(_run(label, backend, data, queries, args.k, args.batch))
+            finally:
+                backend.close()
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    header = f"{'backend':<14}{'n':>9}{'adds/s':>12}{'build s':>10}{'q mean ms':>12}{'q p95 ms':>11}{'recall':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['backend']:<14}{row['n']:>9}{row['adds_per_s']:>12.0f}{row['build_s']:>10.2f}"
+            f"{row['query_ms_mean']:>12.3f}{row['query_ms_p95']:>11.3f}{row['recall']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Check that speculative decoding leaves greedy output unchanged, and time it.
+
+    python -m benchmarks.check_speculative --mode prompt_lookup
+    python -m benchmarks.check_speculative --mode draft --draft-model core/model/draft.gguf
+
+Generates each prompt greedily with speculation off and on, reports end-to-end
+tokens/s for both, and exits with status 1 if any output differs. Both runs use
+the same model instance (loaded with logits_all), so compare the "off" rate
+with a plain run (--baseline) to see the cost of logits_all itself.
+"""
+import argparse
+import sys
+import time
+
+from config import MODEL_CONFIG
+from core.models.llm import LlamaInterface
+
+PROMPTS = [
+    "List three steps to organise a small software project:\n1.",
+    "Repeat the following sentence exactly: the quick brown fox jumps over the lazy dog. "
+    "The quick brown fox",
+    "Write a Python function that returns the sum of a list of integers.\n",
+]
+
+
+def _timed(llm: LlamaInterface, prompt: str, max_tokens: int, mode: str):
+    """
+    Greedy generation with the given speculative mode: (text, generated tokens, seconds).
+    """
+    start = time.perf_counter()
+    text = llm.generate(prompt, max_tokens, speculative=mode, temperature=0.0)
+    seconds = time.perf_counter() - start
+    return text, len(llm.tokenize(text)) if text else 0, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_CONFIG["model_path"])
+    parser.add_argument("--mode", default="prompt_lookup", choices=["prompt_lookup", "draft"])
+    parser.add_argument("--draft-model", default=MODEL_CONFIG["draft_model_path"])
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--baseline", action="store_true",
+                        help="also time a model loaded without speculation (no logits_all)")
+    args = parser.parse_args()
+
+    llm = LlamaInterface(
+        args.model,
+        n_ctx=MODEL_CONFIG["n_ctx"],
+        n_threads=MODEL_CONFIG["n_threads"],
+        n_batch=MODEL_CONFIG["n_batch"],
+        speculative=args.mode,
+        draft_model_path=args.draft_model
+    )
+    failures = 0
+    totals = {"off": [0, 0.0], args.mode: [0, 0.0]}
+    for prompt in PROMPTS:
+        outputs = {}
+        for mode in ("off", args.mode):
+            outputs[mode], tokens, seconds = _timed(llm, prompt, args.max_tokens, mode)
+            totals[mode][0] += tokens
+            totals[mode][1] += seconds
+        same = outputs["off"] == outputs[args.mode]
+        failures += not same
+        print(f"{'ok  ' if same else 'DIFF'} {prompt[:40]!r}")
+        if not same:
+            print(f"  off: {outputs['off']!r}\n  {args.mode}: {outputs[args.mode]!r}")
+    for mode, (tokens, seconds) in totals.items():
+        print(f"{mode:>14}: {tokens} tokens in {seconds:.2f}s = {tokens / max(seconds, 1e-9):.1f} tokens/s")
+    print(llm.get_speculative_stats())
+
+    if args.baseline:
+        del llm
+        plain = LlamaInterface(
+            args.model,
+            n_ctx=MODEL_CONFIG["n_ctx"],
+            n_threads=MODEL_CONFIG["n_threads"],
+            n_batch=MODEL_CONFIG["n_batch"]
+        )
+        tokens, seconds = 0, 0.0
+        for prompt in PROMPTS:
+            _, count, elapsed = _timed(plain, prompt, args.max_tokens, "off")
+            tokens += count
+            seconds += elapsed
+        print(f"{'no logits_all':>14}: {tokens} tokens in {seconds:.2f}s = {tokens / max(seconds, 1e-9):.1f} tokens/s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,30 @@ from .settings import (
     SYSTEM_CONFIG,
     MEMORY_CONFIG,
     RESOURCE_LIMITS,
-    TOOL_CONFIG
+    SEMANTIC_CACHE_CONFIG,
+    TOOL_CONFIG,
+    HTTP_CONFIG
 )
 
 def get_config():
     return {
         "model_path": MODEL_CONFIG["model_path"],
+        "embedding_model_path": MODEL_CONFIG["embedding_model_path"],
         "n_ctx": MODEL_CONFIG["n_ctx"],
         "max_tokens": MODEL_CONFIG["max_tokens"],
         "temperature": MODEL_CONFIG["temperature"],
+        "n_threads": MODEL_CONFIG["n_threads"],
+        "n_batch": MODEL_CONFIG["n_batch"],
+        "autotune": MODEL_CONFIG["autotune"],
+        "autotune_cache_path": MODEL_CONFIG["autotune_cache_path"],
+        "speculative": MODEL_CONFIG["speculative"],
+        "draft_model_path": MODEL_CONFIG["draft_model_path"],
+        "num_pred_tokens": MODEL_CONFIG["num_pred_tokens"],
+        "inference_mode": MODEL_CONFIG["inference_mode"],
+        "inference_workers": MODEL_CONFIG["inference_workers"],
         **SYSTEM_CONFIG,
         **MEMORY_CONFIG,
         **RESOURCE_LIMITS,
     }
 
-__all__ = ['get_config', 'MODEL_CONFIG', 'SYSTEM_CONFIG', 'MEMORY_CONFIG', 'RESOURCE_LIMITS', 'TOOL_CONFIG']
+__all__ = ['get_config', 'MODEL_CONFIG', 'SYSTEM_CONFIG', 'MEMORY_CONFIG', 'RESOURCE_LIMITS', 'SEMANTIC_CACHE_CONFIG', 'TOOL_CONFIG', 'HTTP_CONFIG']
@@ -9,20 +9,72 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 MODEL_CONFIG = {
     "model_path": str(MODEL_DIR / "Llama-3.2-3B-Instruct-Q8_0.gguf"),
+    "embedding_model_path": str(MODEL_DIR / "all-MiniLM-L6-v2.F32.gguf"),
     "n_ctx": 2048,
     "max_tokens": 200,
     "temperature": 0.1,
+    "n_threads": 8,
+    "n_batch": 512,
+    # Benchmark n_threads/n_batch once per (model file, host) and reuse the result
+    "autotune": False,
+    "autotune_cache_path": str(DATA_DIR / "autotune.json"),
+    # Speculative decoding: None, "prompt_lookup" (no extra model) or "draft".
+    # Enabling it loads the model with logits_all, which keeps an n_ctx x n_vocab
+    # float32 logits buffer (~1 GB for a 128k vocab at n_ctx=2048) and computes
+    # logits for every prompt token; check the net gain with
+    # python -m benchmarks.check_speculative before turning it on.
+    "speculative": None,
+    "draft_model_path": None,
+    "num_pred_tokens": 10,
+    # "in_process" runs llama.cpp in the agent process; "worker_pool" moves
+    # generation and embeddings into separate model processes.
+    "inference_mode": "in_process",
+    "inference_workers": 2,
 }
 
 SYSTEM_CONFIG = {
     "max_tasks": 10,
     "batch_size": 3,
-    "debug": False
+    "debug": False,
+    # Constrain planner output with a GBNF grammar (at most max_tasks steps)
+    "planner_grammar": False,
+    # Load models, vector stores and tools in the background right after startup
+    # (otherwise each loads on first use)
+    "preload_models": True,
 }
 
 MEMORY_CONFIG = {
     "vector_db_path": str(DATA_DIR / "chroma_db"),
-    "state_db_path": str(DATA_DIR / "agent_state.db")
+    "state_db_path": str(DATA_DIR / "agent_state.db"),
+    # Memoized workflow step outputs kept in the state DB (count cap, max age in seconds)
+    "max_step_outputs": 10000,
+    "step_output_ttl": 30 * 24 * 3600,
+    # Persistent embedding cache (memory-mapped) and its in-memory LRU size
+    "embedding_cache_dir": str(DATA_DIR / "embedding_cache"),
+    "embedding_cache_size": 4096,
+    # "chroma" or "native" (memory-mapped flat index, HNSW past hnsw_threshold vectors)
+    "vector_backend": "chroma",
+    "hnsw_threshold": 20000,
+    # Metadata keys the native backend indexes for filtered queries (created_at is bucketed by hour)
+    "indexed_metadata_keys": ["objective", "type"],
+    # Seconds a get_context() result is reused for the same query (cleared on writes)
+    "context_cache_ttl": 30.0,
+    # Write-behind of task results into memory (chunk sizes in embedding-model tokens,
+    # capped at the embedder's n_batch)
+    "write_results": True,
+    "write_queue_size": 1000,
+    "write_batch_size": 32,
+    "write_flush_interval": 1.0,
+    "write_chunk_size": 120,
+    "write_chunk_overlap": 16,
+    # Background dedup/compaction of agent memory (interval in seconds; None disables)
+    "compaction_interval": 600,
+    "dedup_threshold": 0.95,
+    "dedup_policy": "newest",  # or "highest_score"
+    # Vacuum once deleted rows make up this share of the index
+    "compaction_vacuum_ratio": 0.2,
+    "max_memory_entries": None,
+    "max_memory_bytes": None,
 }
 
 RESOURCE_LIMITS = {
@@ -30,7 +82,15 @@ RESOURCE_LIMITS = {
     "max_cpu_percent": 90.0,
 }
 
+SEMANTIC_CACHE_CONFIG = {
+    "enabled": False,
+    "similarity_threshold": 0.92,
+    "ttl": 3600,  # seconds
+    "collection_name": "task_result_cache",
+}
+
 TOOL_CONFIG = {
+    # Built-in tools (core/tools/implementations) to register; tools/ modules are always loaded
     "enabled_tools": [
         "file_reader",
         "file_writer",
@@ -38,4 +98,36 @@ TOOL_CONFIG = {
         "system_info"
     ],
     "tool_timeout": 30,  # seconds
+    # Cached tool declarations, so discovery needs no imports
+    "manifest_path": str(DATA_DIR / "tool_manifest.json"),
+    # Pools for tool calls: threads for IO-bound tools, processes for tools marked "executor": "process"
+    "max_tool_threads": 8,
+    "max_tool_processes": 2,
+    # LRU of results from tools declared cacheable
+    "result_cache_size": 256,
+    # Run every tool in isolated worker processes (tools with "executor": "sandbox" always are)
+    "sandbox": False,
+    "sandbox_workers": 2,
+    # Workers are replaced after this many calls or above this peak RSS
+    "sandbox_max_calls": 100,
+    "sandbox_max_rss_mb": 1024,
+    # Default rlimits for sandboxed calls (cpu_seconds, memory_mb, file_mb); tool "limits" override
+    "sandbox_limits": {"cpu_seconds": 60, "file_mb": 256},
+}
+
+HTTP_CONFIG = {
+    # Search API used by web_search; point at a local stub server for testing
+    "search_endpoint": "https://api.duckduckgo.com/",
+    "search_query_param": "q",
+    "search_params": {"format": "json", "no_html": 1},
+    # Pooled keep-alive connections shared by all web tools
+    "max_connections": 32,
+    "max_connections_per_host": 8,
+    "max_concurrency": 16,  # requests in flight
+    "timeout": 15,  # seconds per request
+    "retries": 3,
+    "backoff": 0.5,  # seconds, doubled per retry
+    "cache_ttl": 300,  # seconds GET responses are reused; None disables
+    "cache_size": 256,
+    "user_agent": "task-manager-agent/0.1",
 }
@@ -1,10 +1,34 @@
-from core.models.llm import LlamaInterface
-from core.memory.vector import VectorStorage
-from core.memory.state import StateManager
-from core.engine.scheduler import TaskScheduler
-from core.engine.queue import TaskQueue
-from core.engine.executor import TaskExecutor as CoreExecutor
-from core.agents.planner import PlannerAgent
-from core.plugins.registry import PluginRegistry
+import importlib
 
 __version__ = "0.1.0"
+
+# Exports are resolved on first access so `import core` does not pull in every
+# subsystem (and their heavy dependencies) up front.
+_EXPORTS = {
+    "LlamaInterface": "core.models.llm",
+    "VectorStorage": "core.memory.vector",
+    "StateManager": "core.memory.state",
+    "TaskScheduler": "core.engine.scheduler",
+    "TaskQueue": "core.engine.queue",
+    "CoreExecutor": "core.engine.executor",
+    "PlannerAgent": "core.agents.planner",
+    "PluginRegistry": "core.plugins.registry",
+}
+
+_ATTRIBUTES = {"CoreExecutor": "TaskExecutor"}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'core' has no attribute '{name}'")
+    module = importlib.import_module(_EXPORTS[name])
+    value = getattr(module, _ATTRIBUTES.get(name, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
+
+
+__all__ = list(_EXPORTS)
@@ -1,12 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, Optional
 from core.models.llm import LlamaInterface
+from core.models.context import ContextBuilder
 from core.memory.vector import VectorStorage
 
 class BaseAgent(ABC):
-    def __init__(self, llm: LlamaInterface, memory: VectorStorage):
+    def __init__(self, llm: LlamaInterface, memory: VectorStorage, context_builder: Optional[ContextBuilder] = None):
         self.llm = llm
         self.memory = memory
+        self.context_builder = context_builder or ContextBuilder(llm)
         self.state: Dict = {}
 
     @abstractmethod
@@ -2,24 +2,27 @@ import logging
 from typing import Dict, Optional
 from core.models.llm import LlamaInterface
 from core.memory.vector import VectorStorage
+from core.models.context import ContextBuilder
 from .base import BaseAgent
 from core.models.prompts import PromptTemplates
 
 logger = logging.getLogger(__name__)
 
 class ExecutorAgent(BaseAgent):
-    def __init__(self, llm: LlamaInterface, memory: VectorStorage):
-        super().__init__(llm, memory)
+    def __init__(self, llm: LlamaInterface, memory: VectorStorage, context_builder: Optional[ContextBuilder] = None):
+        super().__init__(llm, memory, context_builder)
 
     def execute(self, task: Dict, context: str) -> Optional[str]:
-        prompt = PromptTemplates.format_prompt(
+        max_tokens = task.get('max_tokens', 200)
+        prompt = self.context_builder.build(
             PromptTemplates.TASK_EXECUTION,
+            max_tokens=max_tokens,
             objective=task.get('objective', ''),
             task=task.get('description', ''),
             context=context
         )
         logger.info(f"[ExecutorAgent] Generating with prompt:\n{prompt}\n")
-        result = self.llm.generate(prompt, max_tokens=task.get('max_tokens', 200))
+        result = self.llm.generate(prompt, max_tokens=max_tokens)
         logger.info(f"[ExecutorAgent] LLM responded with:\n{result}\n")
         return result
 
@@ -0,0 +1,85 @@
+from typing import Iterable
+
+PLAN_END = "END"
+
+# Plan text is printable ASCII, so every token emits at least one character and
+# a line of at most N characters costs at most N tokens.
+TEXT_CHAR = '[ -~]'
+MAX_KEY_CHARS = 16
+
+
+def _literal(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _bounded(unit: str, min_count: int, max_count: int) -> str:
+    """
+    'unit' repeated min_count..max_count times, as nested optionals rather than
+    {m,n} for older llama.cpp builds.
+    """
+    optional = ""
+    for _ in range(max_count - min_count):
+        optional = f"({unit}{' ' + optional if optional else ''})?"
+    parts = [unit] * min_count + ([optional] if optional else [])
+    return " ".join(parts) or '""'
+
+
+def longest_line(tool_names: Iterable[str], max_line_chars: int = 80, max_args: int = 2,
+                   max_value_chars: int = 24) -> int:
+    """
+    Length of the longest line build_plan_grammar() allows, newline included.
+    """
+    task_line = len("TASK# ") + max_line_chars + 1
+    names = list(tool_names)
+    if not names:
+        return task_line
+    arg = 1 + MAX_KEY_CHARS + 1 + max_value_chars + 2
+    tool_line = len("TOOL# ") + max(len(name) for name in names) + max_args * arg + 1
+    return max(task_line, tool_line)
+
+
+def plan_max_tokens(tool_names: Iterable[str], max_steps: int = 10, max_line_chars: int = 80,
+                    max_args: int = 2, max_value_chars: int = 24) -> int:
+    """
+    max_tokens that always leaves room for a complete plan under build_plan_grammar()
+    with the same limits, so generation ends at the grammar's terminator.
+    """
+    line = longest_line(tool_names, max_line_chars, max_args, max_value_chars)
+    return max(1, max_steps) * line + len(PLAN_END) + 1
+
+
+def build_plan_grammar(tool_names: Iterable[str], max_steps: int = 10, max_line_chars: int = 80,
+                       max_args: int = 2, max_value_chars: int = 24) -> str:
+    """
+    GBNF grammar for planner output: 1..max_steps TASK#/TOOL# lines followed by END.
+
+    Tool names are restricted to 'tool_names'. Lines, arguments and the number of
+    steps are bounded, so with max_tokens from plan_max_tokens() llama.cpp always
+    reaches the terminator, can then only emit EOS, and generation stops on its own.
+    """
+    tool_names = sorted(set(tool_names))
+    max_steps = max(1, max_steps)
+
+    rules = [
+        f'root ::= steps {_literal(PLAN_END)}',
+        f'steps ::= {_bounded("step", 1, max_steps)}',
+        'step ::= task | tool' if tool_names else 'step ::= task',
+        'task ::= "TASK# " text "\\n"',
+        f'text ::= {_bounded("textchar", 1, max_line_chars)}',
+        f'textchar ::= {TEXT_CHAR}',
+    ]
+    if tool_names:
+        rules += [
+            'tool ::= "TOOL# " toolname args "\\n"',
+            'toolname ::= ' + " | ".join(_literal(name) for name in tool_names),
+            f'args ::= {_bounded("arg", 0, max_args)}',
+            'arg ::= " " key "=" value',
+            f'key ::= [a-zA-Z_] {_bounded("keychar", 0, MAX_KEY_CHARS - 1)}',
+            'keychar ::= [a-zA-Z0-9_]',
+            f'value ::= "\\"" {_bounded("quotedchar", 0, max_value_chars)} "\\"" '
+            f'| {_bounded("barechar", 1, max_value_chars)}',
+            'quotedchar ::= [ !#-~]',
+            'barechar ::= [!#-~]',
+        ]
+    return "\n".join(rules) + "\n"
@@ -1,16 +1,31 @@
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 from .base import BaseAgent
 from core.models.llm import LlamaInterface
 from core.memory.vector import VectorStorage
 from core.models.prompts import PromptTemplates
+from core.models.context import ContextBuilder
+from core.agents.plan_grammar import build_plan_grammar, plan_max_tokens
 import re
 
 logger = logging.getLogger(__name__)
 
 class PlannerAgent(BaseAgent):
-    def __init__(self, llm: LlamaInterface, memory: VectorStorage):
-        super().__init__(llm, memory)
+    def __init__(
+        self,
+        llm: LlamaInterface,
+        memory: VectorStorage,
+        context_builder: Optional[ContextBuilder] = None,
+        tool_marketplace=None,
+        use_grammar: bool = False,
+        max_steps: int = 10
+    ):
+        super().__init__(llm, memory, context_builder)
+        # With use_grammar, output is constrained to TASK#/TOOL# lines naming registered tools
+        self.tool_marketplace = tool_marketplace
+        self.use_grammar = use_grammar
+        self.max_steps = max_steps
+        self._grammar_cache: Dict = {}
 
     def process(self, input_data: Dict) -> Dict:
         objective = input_data.get('objective', '')
@@ -25,19 +40,43 @@ class PlannerAgent(BaseAgent):
         }
 
     def create_plan(self, objective: str) -> Dict:
-        context = self.memory.get_context(objective)
-        prompt = PromptTemplates.format_prompt(
+        # A grammar-constrained plan needs room for max_steps full lines plus the terminator
+        max_tokens = plan_max_tokens(self._tool_names(), self.max_steps) if self.use_grammar else None
+        context = self.memory.get_context(
+            objective,
+            token_budget=self.context_builder.available_tokens(
+                PromptTemplates.TASK_PLANNING, max_tokens, objective=objective
+            ),
+            token_counter=self.context_builder.count_tokens
+        )
+        prompt = self.context_builder.build(
             PromptTemplates.TASK_PLANNING,
+            max_tokens=max_tokens,
             objective=objective,
             context=context
         )
         logger.info(f"[PlannerAgent] Generating plan with prompt:\n{prompt}\n")
-        response = self.llm.generate(prompt)
+        if self.use_grammar:
+            response = self.llm.generate(prompt, max_tokens=max_tokens, grammar=self._plan_grammar())
+        else:
+            response = self.llm.generate(prompt)
         logger.info(f"[PlannerAgent] Plan generation returned:\n{response}\n")
 
         tasks = self._parse_tasks(response, objective)
         return {"tasks": tasks}
 
+    def _tool_names(self) -> List[str]:
+        if not self.tool_marketplace:
+            return []
+        return [tool['name'] for tool in self.tool_marketplace.list_tools()]
+
+    def _plan_grammar(self) -> str:
+        tool_names = self._tool_names()
+        key = (tuple(sorted(tool_names)), self.max_steps)
+        if key not in self._grammar_cache:
+            self._grammar_cache[key] = build_plan_grammar(tool_names, self.max_steps)
+        return self._grammar_cache[key]
+
     def _parse_tasks(self, response: str, objective: str) -> List[Dict]:
         tasks = []
         for line in response.strip().split('\n'):
@@ -4,6 +4,8 @@ from core.engine.scheduler import TaskScheduler
 from core.engine.broker import MessageBroker
 from core.engine.resource_manager import ResourceManager
 from core.engine.workflow import WorkflowEngine
+from core.engine.result_cache import SemanticResultCache
+from core.engine.system_snapshot import SystemSnapshot
 
 __all__ = [
     'CoreExecutor',
@@ -11,5 +13,7 @@ __all__ = [
     'TaskScheduler',
     'MessageBroker',
     'ResourceManager',
-    'WorkflowEngine'
+    'WorkflowEngine',
+    'SemanticResultCache',
+    'SystemSnapshot'
 ]
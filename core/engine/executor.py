@@ -1,5 +1,10 @@
+import json
 import logging
-from typing import Any, Dict
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+from core.models.context import ContextBuilder
+from core.models.prompts import PromptTemplates
 
 logger = logging.getLogger(__name__)
 
@@ -9,32 +14,95 @@ class TaskExecutor:
     This typically calls the Llama model, memory, tools, etc.
     """
 
-    def __init__(self, llm, memory, resource_manager, tool_marketplace, broker):
+    def __init__(self, llm, memory, resource_manager, tool_marketplace, broker, result_cache=None, context_builder=None, memory_writer=None, tool_runtime=None):
         self.llm = llm
+        self.context_builder = context_builder or ContextBuilder(llm)
         self.memory = memory
         self.resource_manager = resource_manager
         self.tool_marketplace = tool_marketplace
         self.broker = broker
+        # Optional SemanticResultCache; when set, near-duplicate tasks reuse earlier results.
+        self.result_cache = result_cache
+        # Optional MemoryWriter; results are written to memory in the background.
+        self.memory_writer = memory_writer
+        # ToolRuntime for type == "tool" tasks (thread/process pools with timeouts)
+        self.tool_runtime = tool_runtime
 
     def execute_task(self, task: Dict) -> str:
         """
         Given a task dict, e.g. { description: "...", ... }, run it using the LLM.
         Return the result (string).
         """
-        logger.debug("[TaskExecutor] Fetched context: (currently none/placeholder)")
+        if task.get('type') == 'tool':
+            return self.execute_tool_task(task)
 
-        prompt = (
-            "Objective: \n"
-            f"Task: {task['description']}\n"
-            "Context: \n"
-            "Execute this task and provide the result.\n"
+        if self.result_cache:
+            cached = self.result_cache.lookup(task)
+            if cached:
+                return cached
+
+        max_tokens = task.get('max_tokens', 200)
+        prompt = self.context_builder.build(
+            PromptTemplates.TASK_EXECUTION,
+            max_tokens=max_tokens,
+            objective=task.get('objective', ''),
+            task=task['description'],
+            context=task.get('context', '')
         )
 
-        logger.info(f"[ExecutorAgent] Generating with prompt:\n{prompt}")
-        result = self.llm.generate(prompt=prompt)
-        logger.info(f"[ExecutorAgent] LLM responded with:\n{result}\n")
+        logger.info(f"[TaskExecutor] Generating with prompt:\n{prompt}")
+        result = self.llm.generate(prompt=prompt, max_tokens=max_tokens)
+        logger.info(f"[TaskExecutor] LLM responded with:\n{result}\n")
+
+        if self.result_cache:
+            self.result_cache.store(task, result)
+
+        if self.memory_writer and result:
+            self.memory_writer.submit(
+                f"result-{task.get('id', '')}-{int(time.time() * 1000)}",
+                f"Task: {task['description']}\nResult: {result}",
+                metadata={
+                    "objective": task.get('objective', ''),
+                    "task_id": str(task.get('id', '')),
+                    "type": "result",
+                    "created_at": time.time()
+                }
+            )
+
+        return result
+
+    def submit_tool_task(self, task: Dict) -> Future:
+        """
+        Start a tool task without waiting. The Future resolves to the result
+        string (None if the tool failed or timed out).
+        """
+        result: Future = Future()
+        result.set_running_or_notify_cancel()
+        try:
+            inner = self.tool_runtime.submit(task['tool_name'], task.get('tool_args') or {})
+        except Exception as e:
+            logger.error(f"[TaskExecutor] Could not start tool '{task.get('tool_name')}': {e}")
+            result.set_result(None)
+            return result
 
-        # Optionally store result or relevant text in memory (embedding in separate model)
-        # E.g. self.memory.store(task['id'], prompt + "\n" + result)  # if you want
+        def on_done(done: Future):
+            try:
+                result.set_result(self._format_tool_result(done.result()))
+            except Exception as e:
+                logger.error(f"[TaskExecutor] Tool '{task['tool_name']}' failed: {e}")
+                result.set_result(None)
 
+        inner.add_done_callback(on_done)
         return result
+
+    def execute_tool_task(self, task: Dict) -> Optional[str]:
+        if not self.tool_runtime:
+            logger.error("[TaskExecutor] Tool task received but no tool runtime is configured.")
+            return None
+        return self.submit_tool_task(task).result()
+
+    @staticmethod
+    def _format_tool_result(value: Any) -> str:
+        if isinstance(value, str):
+            return value
+        return json.dumps(value, default=str)
@@ -1,15 +1,18 @@
 import logging
-import time
 import threading
-import psutil
+from typing import Optional
+from core.engine.system_snapshot import SystemSnapshot, default_snapshot
 
 logger = logging.getLogger(__name__)
 
 class ResourceManager:
-    def __init__(self, max_memory_percent=80.0, max_cpu_percent=90.0, interval=5.0):
+    def __init__(self, max_memory_percent=80.0, max_cpu_percent=90.0, interval=5.0,
+                 snapshot: Optional[SystemSnapshot] = None):
         self.max_memory_percent = max_memory_percent
         self.max_cpu_percent = max_cpu_percent
         self.interval = interval
+        # Shared with the system tools, which reuse the samples taken here
+        self.snapshot = snapshot or default_snapshot()
         self._stop_event = threading.Event()
         self.thread = None
         self.running = False
@@ -29,15 +32,21 @@ class ResourceManager:
 
     def _monitor(self):
         while not self._stop_event.is_set():
-            usage = self.get_resource_status()
+            usage = self.get_resource_status(max_age=0)
             logger.debug(f"[ResourceManager] Updated usage: {usage}")
             # If usage too high, you might do something or skip tasks
-            time.sleep(self.interval)
+            self._stop_event.wait(self.interval)
 
-    def get_resource_status(self):
+    def get_resource_status(self, max_age: Optional[float] = None):
+        """
+        Latest system sample, reused while younger than max_age (default: the
+        monitor interval). CPU is measured since the previous sample, without blocking.
+        """
+        sample = self.snapshot.system(self.interval if max_age is None else max_age)
         return {
-            "memory_available": psutil.virtual_memory().available,
-            "memory_percent": psutil.virtual_memory().percent,
-            "cpu_percent": psutil.cpu_percent(),
+            "memory_available": sample["memory_available"],
+            "memory_percent": sample["memory_percent"],
+            "cpu_percent": sample["cpu_percent"],
+            "disk_usage": sample["disk_usage"],
             "gpu_available": False  # You can add GPU logic if needed
         }
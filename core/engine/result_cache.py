@@ -0,0 +1,85 @@
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class SemanticResultCache:
+    """
+    Opt-in cache of completed task results, looked up by embedding similarity.
+
+    Task descriptions are embedded (MiniLM) and stored in their own VectorStorage
+    collection together with the result. A later task whose description is close
+    enough (cosine >= similarity_threshold) and that belongs to the same objective
+    reuses the stored result instead of calling the LLM again.
+    """
+
+    def __init__(self, storage, similarity_threshold: float = 0.92, ttl: Optional[float] = 3600, candidates: int = 3):
+        """
+        'storage' is a VectorStorage with an embedding interface; it should be a
+        dedicated collection so cached results do not mix with agent memory.
+        'ttl' is in seconds; None disables expiry.
+        """
+        self.storage = storage
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.candidates = candidates
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_cacheable(task: Dict) -> bool:
+        """
+        Tasks opt out with {"cache": False}. Tool tasks never go through the LLM cache.
+        """
+        return task.get('cache', True) and task.get('type', 'task') == 'task' and bool(task.get('description'))
+
+    def lookup(self, task: Dict) -> Optional[str]:
+        if not self.is_cacheable(task):
+            return None
+
+        objective = task.get('objective', '')
+        matches = self.storage.query_similar(
+            task['description'],
+            k=self.candidates,
+            where={"objective": objective}
+        )
+
+        now = time.time()
+        expired = []
+        for match in matches:
+            metadata = match.get("metadata") or {}
+            if self.ttl is not None and now - metadata.get("created_at", 0) > self.ttl:
+                expired.append(match["id"])
+                continue
+            similarity = match.get("similarity")
+            if similarity is not None and similarity >= self.similarity_threshold:
+                self.storage.delete(expired)
+                self.hits += 1
+                logger.info(
+                    f"[SemanticResultCache] Hit for '{task['description'][:50]}' "
+                    f"(similarity={similarity:.3f}, cached task {metadata.get('task_id')})"
+                )
+                return metadata.get("result")
+
+        self.storage.delete(expired)
+        self.misses += 1
+        return None
+
+    def store(self, task: Dict, result: str):
+        if not result or not self.is_cacheable(task):
+            return
+        self.storage.store(
+            str(uuid.uuid4()),
+            task['description'],
+            metadata={
+                "objective": task.get('objective', ''),
+                "task_id": str(task.get('id', '')),
+                "result": result,
+                "created_at": time.time()
+            }
+        )
+
+    def get_stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses}
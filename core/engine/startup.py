@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """
+    Records how long each startup phase took, including components that
+    finish loading later in the background.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = elapsed
+            logger.debug(f"[Startup] {name}: {elapsed * 1000:.1f} ms")
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        with self._lock:
+            parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items()]
+        return ", ".join(parts)
+
+    def get_timings(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.phases)
+
+
+class LazyComponent:
+    """
+    Stand-in for a subsystem that is expensive to build (model, vector store, ...).
+
+    The factory runs on first attribute access, or earlier on a background
+    thread via load_in_background(). Attribute access is forwarded to the real
+    object, so callers can hold the proxy wherever they would hold the object.
+    Construction happens once, under a lock; a failed load is retried on the
+    next access.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], timer: Optional[StartupTimer] = None):
+        self._name = name
+        self._factory = factory
+        self._timer = timer
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._instance is not None
+
+    def resolve(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    if self._timer:
+                        with self._timer.phase(self._name):
+                            self._instance = self._factory()
+                    else:
+                        self._instance = self._factory()
+                    logger.info(f"[LazyComponent] {self._name} ready.")
+        return self._instance
+
+    def load_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.preload, name=f"load-{self._name}", daemon=True)
+        thread.start()
+        return thread
+
+    def preload(self) -> bool:
+        """
+        Build the component now, logging instead of raising on failure.
+        """
+        try:
+            self.resolve()
+            return True
+        except Exception as e:
+            logger.error(f"[LazyComponent] Loading {self._name} failed: {e}", exc_info=True)
+            return False
+
+    def __getattr__(self, attr: str):
+        # Only called for attributes not found on the proxy itself
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "pending"
+        return f"<LazyComponent {self._name} ({state})>"
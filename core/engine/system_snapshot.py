@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROCESS_ATTRS = ["pid", "name", "status", "username", "cpu_percent", "memory_info"]
+SORT_KEYS = ("cpu", "rss", "pid", "name")
+
+
+class SystemSnapshot:
+    """
+    Shared, rate-limited sampler of system and process statistics.
+
+    One process_iter() pass reads every attribute at once (p.info), so a
+    listing costs a single scan instead of several syscalls per process.
+    Samples are reused while younger than the caller's max_age, which lets the
+    ResourceManager monitor loop keep them warm for tools. CPU percentages are
+    measured since the previous sample and never block.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._system: Optional[Dict] = None
+        self._system_at = 0.0
+        self._processes: Optional[Dict[int, Dict]] = None
+        self._processes_at = 0.0
+        self._previous_processes: Dict[int, Dict] = {}
+
+    def system(self, max_age: float = 2.0) -> Dict:
+        with self._lock:
+            if self._system is None or time.monotonic() - self._system_at > max_age:
+                self._system = self._sample_system()
+                self._system_at = time.monotonic()
+            return dict(self._system)
+
+    @staticmethod
+    def _sample_system() -> Dict:
+        import psutil
+
+        memory = psutil.virtual_memory()
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": memory.percent,
+            "memory_available": memory.available,
+            "disk_usage": psutil.disk_usage('/').percent,
+            "process_count": len(psutil.pids()),
+            "sampled_at": time.time()
+        }
+
+    def _sample_processes(self) -> Dict[int, Dict]:
+        import psutil
+
+        processes = {}
+        for proc in psutil.process_iter(PROCESS_ATTRS):
+            info = proc.info
+            memory = info.get("memory_info")
+            processes[info["pid"]] = {
+                "pid": info["pid"],
+                "name": info.get("name") or "",
+                "status": info.get("status"),
+                "username": info.get("username"),
+                "cpu_percent": info.get("cpu_percent") or 0.0,
+                "rss": memory.rss if memory else 0
+            }
+        return processes
+
+    def _refresh_processes(self, max_age: float) -> Dict[int, Dict]:
+        with self._lock:
+            if self._processes is None or time.monotonic() - self._processes_at > max_age:
+                if self._processes is not None:
+                    self._previous_processes = self._processes
+                self._processes = self._sample_processes()
+                self._processes_at = time.monotonic()
+            return self._processes
+
+    def processes(
+        self,
+        sort_by: str = "cpu",
+        top_n: Optional[int] = 20,
+        name: Optional[str] = None,
+        status: Optional[str] = None,
+        max_age: float = 2.0
+    ) -> List[Dict]:
+        """
+        Processes matching 'name' (case-insensitive substring) and 'status',
+        sorted by cpu, rss, pid or name, limited to top_n.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort_by}', expected one of {SORT_KEYS}")
+        selected = list(self._refresh_processes(max_age).values())
+        if name:
+            needle = name.lower()
+            selected = [p for p in selected if needle in p["name"].lower()]
+        if status:
+            selected = [p for p in selected if p["status"] == status]
+        key = {"cpu": "cpu_percent", "rss": "rss", "pid": "pid", "name": "name"}[sort_by]
+        selected.sort(key=lambda p: p[key], reverse=sort_by in ("cpu", "rss"))
+        return selected[:top_n] if top_n else selected
+
+    def delta(self, min_rss_change: int = 10 * 1024 * 1024, min_cpu_change: float = 5.0, max_age: float = 2.0) -> Dict:
+        """
+        Changes since the previous process sample: started and exited processes,
+        and those whose RSS or CPU moved by at least the given amounts.
+        """
+        current = self._refresh_processes(max_age)
+        with self._lock:
+            previous = self._previous_processes
+        changed = []
+        for pid, proc in current.items():
+            before = previous.get(pid)
+            if before and (
+                abs(proc["rss"] - before["rss"]) >= min_rss_change
+                or abs(proc["cpu_percent"] - before["cpu_percent"]) >= min_cpu_change
+            ):
+                changed.append({
+                    **proc,
+                    "rss_change": proc["rss"] - before["rss"],
+                    "cpu_change": round(proc["cpu_percent"] - before["cpu_percent"], 1)
+                })
+        return {
+            "started": [proc for pid, proc in current.items() if previous and pid not in previous],
+            "exited": [proc for pid, proc in previous.items() if pid not in current],
+            "changed": changed
+        }
+
+
+_default_snapshot: Optional[SystemSnapshot] = None
+_default_lock = threading.Lock()
+
+
+def default_snapshot() -> SystemSnapshot:
+    """
+    Process-wide SystemSnapshot shared by ResourceManager and the system tools.
+    """
+    global _default_snapshot
+    with _default_lock:
+        if _default_snapshot is None:
+            _default_snapshot = SystemSnapshot()
+        return _default_snapshot
@@ -1,34 +1,257 @@
-from typing import Dict, Any, List
-from queue import Queue
-from threading import Lock
+from typing import Callable, Dict, Any, List, Optional
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Event, Lock, Thread
+import hashlib
+import json
+import logging
+import multiprocessing
 import uuid
 
+logger = logging.getLogger(__name__)
+
 class WorkflowStep:
-    def __init__(self, name: str, action: str, inputs: Dict = None):
-        self.id = str(uuid.uuid4())
+    # Pass a stable step_id to resume a checkpointed workflow after a restart;
+    # steps with non-deterministic actions should set cacheable=False
+    def __init__(self, name: str, action: str, inputs: Dict = None, step_id: Optional[str] = None,
+                 cacheable: bool = True):
+        self.id = step_id or str(uuid.uuid4())
         self.name = name
         self.action = action
         self.inputs = inputs or {}
+        self.cacheable = cacheable
         self.status = "pending"
         self.output = None
+        self.error: Optional[str] = None
+        self.fingerprint: Optional[str] = None
         self.next_steps: List[str] = []
 
 class Workflow:
-    def __init__(self, name: str):
-        self.id = str(uuid.uuid4())
+    def __init__(self, name: str, workflow_id: Optional[str] = None):
+        self.id = workflow_id or str(uuid.uuid4())
         self.name = name
         self.steps: Dict[str, WorkflowStep] = {}
         self.entry_points: List[str] = []
         self.status = "pending"
+        # {"cached": [...], "executed": [...], "resumed": [...]} step names of the latest run
+        self.last_run: Dict[str, List[str]] = {}
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def step_fingerprint(action: str, version: str, inputs: Dict, upstream: Dict[str, Any]) -> str:
+    """
+    Content hash of a step: its action (and version), inputs and the digest of
+    each parent's output. A parent that reruns but yields the same output
+    leaves its children's fingerprints unchanged.
+    """
+    return _digest({
+        "action": action,
+        "version": version,
+        "inputs": inputs,
+        "upstream": {name: _digest(output) for name, output in upstream.items()}
+    })
+
+def execute_action(action: str, inputs: Dict, upstream: Dict[str, Any]) -> Any:
+    """
+    Built-in step actions. Module-level so process pools can pickle it;
+    'upstream' maps each parent step's name to its output (connect_steps
+    keeps parent names unique per step).
+    """
+    # Example only
+    if action == "task_creation":
+        return {"type": "task", "content": "Generated a new task."}
+    elif action == "task_execution":
+        return {"type": "result", "content": "Executed the task."}
+    elif action == "evaluation":
+        return {"type": "evaluation", "content": "Evaluation result."}
+    else:
+        raise ValueError(f"Unknown action: {action}")
+
+class _WorkflowRun:
+    """
+    Scheduling state of one execution: remaining parents per step, results,
+    and the future settled when the last step finishes. Steps in 'completed'
+    (step_id -> output, from a resumed run) count as already done.
+    """
+    def __init__(self, workflow: Workflow, fail_fast: bool, completed: Optional[Dict[str, Any]] = None):
+        self.workflow = workflow
+        self.fail_fast = fail_fast
+        self.parents: Dict[str, List[str]] = {step_id: [] for step_id in workflow.steps}
+        for step in workflow.steps.values():
+            for nxt in step.next_steps:
+                if step.id not in self.parents[nxt]:
+                    self.parents[nxt].append(step.id)
+        self.results: Dict[str, Any] = dict(completed or {})
+        self.waiting = {
+            step_id: sum(1 for parent in parents if parent not in self.results)
+            for step_id, parents in self.parents.items()
+        }
+        self.unfinished = len(workflow.steps) - len(self.results)
+        self.cached: List[str] = []
+        self.executed: List[str] = []
+        self.failed = False
+        self.lock = Lock()
+        self.done: Future = Future()
+
+    def frontier(self) -> List[str]:
+        """
+        Steps ready to run now: not yet completed, with every parent completed.
+        """
+        # Kahn's algorithm: steps never reaching in-degree 0 are on (or behind) a cycle and could never run
+        in_degree = {step_id: len(parents) for step_id, parents in self.parents.items()}
+        stack = [step_id for step_id, count in in_degree.items() if count == 0]
+        ordered = 0
+        while stack:
+            ordered += 1
+            for nxt in self.workflow.steps[stack.pop()].next_steps:
+                in_degree[nxt] -= 1
+                if in_degree[nxt] == 0:
+                    stack.append(nxt)
+        if ordered != len(self.workflow.steps):
+            raise ValueError(f"Workflow {self.workflow.id} contains a cycle.")
+        return [
+            step_id for step_id, count in self.waiting.items()
+            if count == 0 and step_id not in self.results
+        ]
+
+class WorkflowCheckpointer:
+    """
+    Buffers step checkpoints and writes them to the StateManager in batches:
+    once 'batch_size' are pending, every 'flush_interval' seconds, and when a
+    workflow finishes.
+    """
+    def __init__(self, state, batch_size: int = 32, flush_interval: float = 1.0):
+        self.state = state
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Dict] = []
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def record(self, workflow_id: str, step: WorkflowStep):
+        with self._lock:
+            self._pending.append({
+                "workflow_id": workflow_id,
+                "step_id": step.id,
+                "status": step.status,
+                "output": step.output,
+                "fingerprint": step.fingerprint
+            })
+            full = len(self._pending) >= self.batch_size
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="workflow-checkpoint", daemon=True)
+                self._thread.start()
+        if full:
+            self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        # Serialised so batches reach the database in the order they were recorded
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self.state.save_workflow_steps(batch)
+            except Exception as e:
+                logger.error(f"[WorkflowCheckpointer] Failed to write {len(batch)} checkpoints: {e}")
+
+    def lookup(self, fingerprint: str):
+        """
+        Memoized output for a step fingerprint, as (found, output).
+        """
+        with self._lock:
+            for checkpoint in reversed(self._pending):
+                if checkpoint["fingerprint"] == fingerprint and checkpoint["status"] == "completed":
+                    return True, checkpoint["output"]
+        return self.state.get_step_output(fingerprint)
+
+    def load(self, workflow_id: str) -> Dict[str, Dict]:
+        self.flush()
+        return self.state.get_workflow_steps(workflow_id)
+
+    def clear(self, workflow_id: str):
+        with self._lock:
+            self._pending = [c for c in self._pending if c["workflow_id"] != workflow_id]
+        self.state.clear_workflow(workflow_id)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
 
 class WorkflowEngine:
-    def __init__(self):
+    """
+    Runs workflow steps as soon as all their parents have completed, on a
+    shared thread pool ("thread") or spawned process pool ("process", for
+    CPU-bound module-level actions). Each execution keeps its own scheduling
+    state, so independent branches overlap, a step with several parents runs
+    once after all of them, and different workflows can execute concurrently.
+    With 'fail_fast', a failed step stops new steps from starting; otherwise
+    only its descendants are skipped.
+
+    Given a StateManager ('state'), step statuses and outputs are checkpointed
+    as steps finish, and execute_workflow(resume=True) reruns only the steps
+    that had not completed. Outputs are stored as JSON.
+
+    With 'memoize' (and a state), outputs are also cached by step fingerprint
+    (see step_fingerprint), so like a build system a rerun only executes
+    steps whose action, inputs or upstream outputs changed. Bump an action's
+    version in register_action() when its code changes.
+    """
+    def __init__(
+        self,
+        max_workers: int = 4,
+        executor: str = "thread",
+        fail_fast: bool = True,
+        state=None,
+        checkpoint_batch_size: int = 32,
+        checkpoint_interval: float = 1.0,
+        memoize: bool = True
+    ):
         self.workflows: Dict[str, Workflow] = {}
-        self.step_queue = Queue()
+        self.memoize = memoize
+        self.checkpointer = (
+            WorkflowCheckpointer(state, checkpoint_batch_size, checkpoint_interval) if state is not None else None
+        )
+        self.actions: Dict[str, Callable] = {}
+        self.action_versions: Dict[str, str] = {}
+        self.max_workers = max_workers
+        self.executor = executor
+        self.fail_fast = fail_fast
         self.lock = Lock()
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        with self.lock:
+            if self._pool is None:
+                if self.executor == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow")
+            return self._pool
 
-    def create_workflow(self, name: str) -> Workflow:
-        workflow = Workflow(name)
+    def register_action(self, action: str, function: Callable[[Dict, Dict[str, Any]], Any], version: str = "1"):
+        """
+        'function(inputs, upstream)' handles steps with this action; with the
+        process executor it must be importable at module level. Changing
+        'version' invalidates memoized outputs of the action.
+        """
+        self.actions[action] = function
+        self.action_versions[action] = version
+
+    def create_workflow(self, name: str, workflow_id: Optional[str] = None) -> Workflow:
+        workflow = Workflow(name, workflow_id)
         self.workflows[workflow.id] = workflow
         return workflow
 
@@ -51,41 +274,198 @@ class WorkflowEngine:
             to_step = wf.steps.get(to_step_id)
             if not from_step or not to_step:
                 raise ValueError("Invalid step IDs.")
+            if to_step_id in from_step.next_steps:
+                return
+            # Upstream outputs are keyed by parent name, so a step's parents need distinct names
+            for step in wf.steps.values():
+                if to_step_id in step.next_steps and step.name == from_step.name:
+                    raise ValueError(
+                        f"Step {to_step.name} already has a parent named {from_step.name}; "
+                        f"parents of a step must have distinct names."
+                    )
             from_step.next_steps.append(to_step_id)
 
-    def execute_workflow(self, workflow_id: str) -> Dict:
-        wf = self.workflows.get(workflow_id)
-        if not wf:
-            raise ValueError(f"Workflow {workflow_id} not found.")
+    def submit_workflow(self, workflow_id: str, resume: bool = False) -> Future:
+        """
+        Start a workflow without waiting; the Future resolves to
+        {step_id: output} of the completed steps. With 'resume', steps that
+        completed in an earlier run (in memory or checkpointed) are kept and
+        execution restarts from the frontier after them.
+        """
+        with self.lock:
+            wf = self.workflows.get(workflow_id)
+            if not wf:
+                raise ValueError(f"Workflow {workflow_id} not found.")
+            if wf.status == "running":
+                raise RuntimeError(f"Workflow {workflow_id} is already running.")
+            wf.status = "running"
+
+        try:
+            completed = self._completed_steps(wf) if resume else {}
+            if not resume and self.checkpointer:
+                self.checkpointer.clear(workflow_id)
+            run = _WorkflowRun(wf, self.fail_fast, completed)
+            frontier = run.frontier()
+        except Exception:
+            # Not started: leave the workflow runnable again
+            wf.status = "failed"
+            raise
+        for step in wf.steps.values():
+            if step.id in completed:
+                step.status, step.output, step.error = "completed", completed[step.id], None
+            else:
+                step.status, step.output, step.error = "pending", None, None
+        wf.last_run = {"cached": run.cached, "executed": run.executed, "resumed": [wf.steps[s].name for s in completed]}
+        if completed:
+            logger.info(f"[WorkflowEngine] Resuming {wf.name}: {len(completed)}/{len(wf.steps)} steps already completed")
+        if run.unfinished == 0:
+            self._finish(run)
+        self._start_steps(run, frontier)
+        return run.done
 
-        for step_id in wf.entry_points:
-            self.step_queue.put((workflow_id, step_id))
+    def execute_workflow(self, workflow_id: str, resume: bool = False) -> Dict:
+        return self.submit_workflow(workflow_id, resume).result()
 
-        results = {}
-        while not self.step_queue.empty():
-            wf_id, step_id = self.step_queue.get()
-            step = self.workflows[wf_id].steps[step_id]
+    def _completed_steps(self, wf: Workflow) -> Dict[str, Any]:
+        completed = {step.id: step.output for step in wf.steps.values() if step.status == "completed"}
+        if self.checkpointer:
+            for step_id, checkpoint in self.checkpointer.load(wf.id).items():
+                if step_id in wf.steps and checkpoint["status"] == "completed":
+                    completed.setdefault(step_id, checkpoint["output"])
+        return completed
 
+    def _start_steps(self, run: _WorkflowRun, step_ids: List[str]):
+        # Iterative, so long chains of cache hits complete without deep recursion
+        queue = list(step_ids)
+        while queue:
+            queue.extend(self._start_step(run, queue.pop(0)))
+
+    def _start_step(self, run: _WorkflowRun, step_id: str) -> List[str]:
+        """
+        Submit a step to the pool, or complete it from the memo cache and
+        return the steps that became ready.
+        """
+        step = run.workflow.steps[step_id]
+        with run.lock:
+            # A failure elsewhere may have skipped the step since it became ready
+            if step.status != "pending":
+                return []
+            step.status = "running"
+            upstream = {run.workflow.steps[parent].name: run.results[parent] for parent in run.parents[step_id]}
+        step.fingerprint = None
+        if self.memoize and self.checkpointer and step.cacheable:
+            try:
+                step.fingerprint = step_fingerprint(
+                    step.action, self.action_versions.get(step.action, "1"), step.inputs, upstream
+                )
+                hit, output = self.checkpointer.lookup(step.fingerprint)
+            except Exception as e:
+                # e.g. upstream output JSON cannot encode, or a database error: run without memoizing
+                logger.warning(f"[WorkflowEngine] Not memoizing step {step.name}: {e}")
+                step.fingerprint = None
+                hit, output = False, None
+            if hit:
+                with run.lock:
+                    run.cached.append(step.name)
+                cached: Future = Future()
+                cached.set_result(output)
+                return self._complete(run, step_id, cached)
+        with run.lock:
+            run.executed.append(step.name)
+        try:
+            action = self.actions.get(step.action)
+            if action:
+                future = self._get_pool().submit(action, step.inputs, upstream)
+            else:
+                future = self._get_pool().submit(execute_action, step.action, step.inputs, upstream)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda f: self._on_step_done(run, step_id, f))
+        return []
+
+    def _on_step_done(self, run: _WorkflowRun, step_id: str, future: Future):
+        # Runs inside the Future machinery, which would swallow an exception and leave the run hanging
+        try:
+            self._start_steps(run, self._complete(run, step_id, future))
+        except Exception as e:
+            logger.error(f"[WorkflowEngine] Scheduling after step {run.workflow.steps[step_id].name} failed: {e}",
+                         exc_info=True)
+            run.workflow.status = "failed"
+            if not run.done.done():
+                run.done.set_exception(e)
+
+    def _complete(self, run: _WorkflowRun, step_id: str, future: Future) -> List[str]:
+        """
+        Record a finished step; returns the steps it made ready.
+        """
+        step = run.workflow.steps[step_id]
+        ready: List[str] = []
+        with run.lock:
             try:
-                step.status = "running"
-                step.output = self._execute_step(step)
+                step.output = future.result()
                 step.status = "completed"
-                results[step_id] = step.output
-                for nxt in step.next_steps:
-                    self.step_queue.put((workflow_id, nxt))
+                run.results[step_id] = step.output
+                finished = 1
+                if not (run.failed and run.fail_fast):
+                    for nxt in step.next_steps:
+                        run.waiting[nxt] -= 1
+                        if run.waiting[nxt] == 0 and run.workflow.steps[nxt].status == "pending":
+                            ready.append(nxt)
             except Exception as e:
                 step.status = "failed"
-                break
-
-        return results
-
-    def _execute_step(self, step: WorkflowStep) -> Any:
-        # Example only
-        if step.action == "task_creation":
-            return {"type": "task", "content": "Generated a new task."}
-        elif step.action == "task_execution":
-            return {"type": "result", "content": "Executed the task."}
-        elif step.action == "evaluation":
-            return {"type": "evaluation", "content": "Evaluation result."}
+                step.error = str(e)
+                run.failed = True
+                logger.error(f"[WorkflowEngine] Step {step.name} failed: {e}")
+                finished = 1
+            if run.failed:
+                finished += self._skip_unreachable(run)
+            # Recorded under the run lock so every checkpoint precedes the final flush
+            if self.checkpointer:
+                self.checkpointer.record(run.workflow.id, step)
+            run.unfinished -= finished
+            last = run.unfinished == 0
+        if last:
+            self._finish(run)
+        return ready
+
+    @staticmethod
+    def _skip_unreachable(run: _WorkflowRun) -> int:
+        """
+        Mark pending steps that can no longer run as skipped and return how many:
+        with fail_fast every pending step, otherwise the descendants of failed steps.
+        """
+        steps = run.workflow.steps
+        if run.fail_fast:
+            blocked = [step for step in steps.values() if step.status == "pending"]
         else:
-            raise ValueError(f"Unknown action: {step.action}")
+            blocked = []
+            stack = [step for step in steps.values() if step.status in ("failed", "skipped")]
+            while stack:
+                for nxt in stack.pop().next_steps:
+                    if steps[nxt].status == "pending" and steps[nxt] not in blocked:
+                        blocked.append(steps[nxt])
+                        stack.append(steps[nxt])
+        for step in blocked:
+            step.status = "skipped"
+        return len(blocked)
+
+    def _finish(self, run: _WorkflowRun):
+        if self.checkpointer:
+            self.checkpointer.flush()
+        run.workflow.status = "failed" if run.failed else "completed"
+        if run.cached:
+            logger.info(
+                f"[WorkflowEngine] {run.workflow.name}: {len(run.cached)} steps from cache, "
+                f"{len(run.executed)} executed"
+            )
+        if not run.done.done():
+            run.done.set_result(dict(run.results))
+
+    def shutdown(self):
+        if self.checkpointer:
+            self.checkpointer.stop()
+        with self.lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -1,5 +1,8 @@
 # core/memory/__init__.py
 from core.memory.vector import VectorStorage
 from core.memory.state import StateManager
+from core.memory.writer import MemoryWriter
+from core.memory.compaction import MemoryCompactor
+from core.memory.backends import VectorBackend, NativeBackend
 
-__all__ = ['VectorStorage', 'StateManager']
+__all__ = ['VectorStorage', 'StateManager', 'MemoryWriter', 'MemoryCompactor', 'VectorBackend', 'NativeBackend']
@@ -0,0 +1,20 @@
+# core/memory/backends/__init__.py
+from core.memory.backends.base import VectorBackend
+from core.memory.backends.native import NativeBackend
+from core.memory.backends.metadata_index import MetadataIndex
+
+
+def create_backend(name: str, persist_directory: str, collection_name: str, **kwargs) -> VectorBackend:
+    """
+    Build a backend by name: "native" (memory-mapped flat/HNSW index) or "chroma".
+    """
+    if name == "native":
+        return NativeBackend(persist_directory, collection_name, **kwargs)
+    if name == "chroma":
+        # Imported lazily: chromadb is heavy and optional when using the native index
+        from core.memory.backends.chroma import ChromaBackend
+        return ChromaBackend(persist_directory, collection_name)
+    raise ValueError(f"Unknown vector backend: {name}")
+
+
+__all__ = ['VectorBackend', 'NativeBackend', 'MetadataIndex', 'create_backend']
@@ -0,0 +1,100 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+def matches_where(metadata: Dict, where: Optional[Dict]) -> bool:
+    """
+    Chroma-style metadata filter. Plain values are equality tests; a dict value
+    holds operators ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin), e.g.
+    {"objective": "x", "created_at": {"$gte": 1700000000}}.
+    "$and" / "$or" take a list of sub-filters.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            try:
+                if not all(_OPERATORS[op](value, arg) for op, arg in condition.items()):
+                    return False
+            except KeyError as e:
+                raise ValueError(f"Unsupported filter operator: {e.args[0]}")
+            except TypeError:
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class VectorBackend(ABC):
+    """
+    Storage and nearest-neighbor search behind VectorStorage.
+
+    Embeddings are passed as L2-normalized float32 arrays. Query results are
+    dicts with "id", "document", "metadata" and a cosine "similarity", plus the
+    stored "embedding" when include_embeddings is set.
+    """
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        embedding: np.ndarray,
+        k: int,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict]:
+        pass
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    def export(self) -> Dict:
+        """
+        Every live entry as {"ids", "embeddings" (n, dim) float32, "documents", "metadatas"}.
+        Used by maintenance jobs such as compaction.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support export")
+
+    def tombstones(self) -> int:
+        """
+        Deleted entries that still take space until vacuum().
+        """
+        return 0
+
+    def vacuum(self):
+        """
+        Reclaim space left by deleted entries, if the backend keeps tombstones.
+        """
+        pass
+
+    def close(self):
+        pass
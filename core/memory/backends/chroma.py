@@ -0,0 +1,143 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.memory.similarity import l2_normalize
+from .base import VectorBackend
+
+logger = logging.getLogger(__name__)
+
+
+class ChromaBackend(VectorBackend):
+    """
+    Chroma collection as a VectorBackend. chromadb is imported here rather than
+    at module level, so it is only loaded when this backend is selected.
+
+    New collections use the cosine space, where similarity = 1 - distance.
+    get_or_create_collection() does not change the space of an existing
+    collection, so collections created with another metric (Chroma's default
+    is l2) get similarities computed from the returned embeddings instead, and
+    can be converted once with migrate_to_cosine().
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str = "agent_memory"):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.client = chromadb.Client(
+            Settings(
+                chroma_db_impl="duckdb+parquet",
+                persist_directory=persist_directory
+            )
+        )
+        logger.debug("[ChromaBackend] Initializing collection...")
+        self.collection_name = collection_name
+        # Cosine space so that query distances map directly onto similarity scores.
+        self.collection = self.client.get_or_create_collection(
+            collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+        self.space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        if self.space != "cosine":
+            logger.warning(
+                f"[ChromaBackend] Collection '{collection_name}' uses the '{self.space}' metric; "
+                "computing cosine similarity from embeddings. Call migrate_to_cosine() to convert it."
+            )
+        logger.debug(f"[ChromaBackend] Collection '{collection_name}' ready.")
+
+    def migrate_to_cosine(self):
+        """
+        Recreate the collection in the cosine space with the same entries.
+        """
+        if self.space == "cosine":
+            return
+        data = self.export()
+        self.client.delete_collection(self.collection_name)
+        self.collection = self.client.create_collection(self.collection_name, metadata={"hnsw:space": "cosine"})
+        if data["ids"]:
+            self.add(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+        self.space = "cosine"
+        logger.info(f"[ChromaBackend] Migrated {len(data['ids'])} entries of '{self.collection_name}' to cosine.")
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        # Chroma's API takes nested lists; convert once, in C, at the storage boundary.
+        self.collection.add(
+            documents=list(documents),
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            metadatas=list(metadatas),
+            ids=list(ids)
+        )
+
+    @staticmethod
+    def _chroma_where(where: Optional[Dict]) -> Optional[Dict]:
+        # Chroma wants several top-level conditions wrapped in an explicit $and
+        if not where:
+            return None
+        if len(where) > 1:
+            return {"$and": [{key: value} for key, value in where.items()]}
+        return where
+
+    def query(
+        self,
+        embedding: np.ndarray,
+        k: int,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict]:
+        include = ["documents", "metadatas", "distances"]
+        # Distances of non-cosine collections are not similarities; recompute from the vectors
+        exact = self.space != "cosine"
+        if include_embeddings or exact:
+            include.append("embeddings")
+        results = self.collection.query(
+            query_embeddings=np.asarray(embedding, dtype=np.float32).reshape(1, -1).tolist(),
+            n_results=k,
+            where=self._chroma_where(where),
+            include=include
+        )
+        embeddings = (results.get("embeddings") or [None])[0]
+        distances = (results.get("distances") or [[]])[0]
+        similarities = None
+        if exact and embeddings is not None and len(embeddings):
+            query = l2_normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+            similarities = l2_normalize(np.asarray(embeddings, dtype=np.float32)) @ query
+        docs = []
+        for i in range(len(results["documents"][0])):
+            distance = distances[i] if i < len(distances) else None
+            if similarities is not None:
+                similarity = float(similarities[i])
+            else:
+                similarity = 1.0 - distance if distance is not None and not exact else None
+            docs.append({
+                "id": results["ids"][0][i],
+                "document": results["documents"][0][i],
+                "metadata": results["metadatas"][0][i],
+                "similarity": similarity
+            })
+            if include_embeddings and embeddings is not None:
+                docs[-1]["embedding"] = np.asarray(embeddings[i], dtype=np.float32)
+        if similarities is not None:
+            docs.sort(key=lambda doc: doc["similarity"], reverse=True)
+        return docs
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=list(ids))
+
+    def export(self) -> Dict:
+        results = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = results.get("embeddings")
+        return {
+            "ids": list(results["ids"]),
+            "embeddings": np.asarray(embeddings if embeddings is not None else [], dtype=np.float32),
+            "documents": list(results.get("documents") or []),
+            "metadatas": [m or {} for m in (results.get("metadatas") or [])]
+        }
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def close(self):
+        persist = getattr(self.client, "persist", None)
+        if persist:
+            persist()
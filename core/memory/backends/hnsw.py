@@ -0,0 +1,190 @@
+import heapq
+import math
+import pickle
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph over row numbers of an external
+    float32 matrix of L2-normalized vectors (similarity = dot product).
+
+    The index stores only the graph; callers pass the current vector matrix to
+    every call, so it can live in a memory map that is remapped as it grows.
+    Deleted rows stay in the graph as routing nodes and are filtered out of
+    results with the 'accept' predicate.
+    """
+
+    def __init__(self, M: int = 16, ef_construction: int = 100, seed: int = 42):
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.level_mult = 1.0 / math.log(M)
+        self.graph: List[Dict[int, List[int]]] = []
+        self.entry_point: Optional[int] = None
+        self.max_level = -1
+        self.size = 0
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _search_layer(self, vectors: np.ndarray, query: np.ndarray, entry_points: List[int], ef: int, level: int):
+        """
+        Greedy best-first search on one layer. Returns up to ef (similarity, node), best first.
+        Neighbor similarities are computed in one vectorized product per expanded node.
+        """
+        layer = self.graph[level]
+        visited = set(entry_points)
+        entry_sims = vectors[entry_points] @ query
+        candidates = [(-float(s), node) for s, node in zip(entry_sims, entry_points)]
+        heapq.heapify(candidates)
+        results = [(float(s), node) for s, node in zip(entry_sims, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_sim < results[0][0]:
+                break
+            neighbors = [n for n in layer.get(node, ()) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            sims = vectors[neighbors] @ query
+            for sim, neighbor in zip(sims.tolist(), neighbors):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def _select_neighbors(self, vectors: np.ndarray, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        HNSW neighbor heuristic: take candidates best-first and keep one only if it
+        is closer to the base node than to every neighbor kept so far, which keeps
+        links spread across clusters.
+        """
+        if len(candidates) <= m:
+            return [node for _, node in candidates]
+        nodes = [node for _, node in candidates]
+        # All pairwise candidate similarities in one product; the loop below only reads scalars
+        pairwise = vectors[nodes] @ vectors[nodes].T
+        kept_idx: List[int] = []
+        selected: List[int] = []
+        for i, (sim, node) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            if kept_idx and pairwise[i, kept_idx].max() > sim:
+                continue
+            kept_idx.append(i)
+            selected.append(node)
+        if len(selected) < m:
+            # Top up with the closest skipped candidates so nodes stay well connected
+            chosen = set(selected)
+            for _, node in candidates:
+                if len(selected) >= m:
+                    break
+                if node not in chosen:
+                    selected.append(node)
+                    chosen.add(node)
+        return selected
+
+    def add(self, vectors: np.ndarray, node: int):
+        query = vectors[node]
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_mult)
+        while len(self.graph) <= level:
+            self.graph.append({})
+        for l in range(level + 1):
+            self.graph[l].setdefault(node, [])
+        self.size += 1
+
+        if self.entry_point is None:
+            self.entry_point = node
+            self.max_level = level
+            return
+
+        entry = [self.entry_point]
+        for l in range(self.max_level, level, -1):
+            entry = [self._search_layer(vectors, query, entry, 1, l)[0][1]]
+
+        for l in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(vectors, query, entry, self.ef_construction, l)
+            max_links = self.M0 if l == 0 else self.M
+            neighbors = self._select_neighbors(vectors, found, self.M)
+            self.graph[l][node] = neighbors
+            for neighbor in neighbors:
+                links = self.graph[l][neighbor]
+                links.append(node)
+                if len(links) > max_links:
+                    sims = vectors[links] @ vectors[neighbor]
+                    ranked = sorted(zip(sims.tolist(), links), reverse=True)
+                    self.graph[l][neighbor] = self._select_neighbors(vectors, ranked, max_links)
+            entry = [n for _, n in found]
+
+        if level > self.max_level:
+            self.max_level = level
+            self.entry_point = node
+
+    def search(
+        self,
+        vectors: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        ef: int = 64,
+        accept: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        Approximate top-k (similarity, node), best first. If 'accept' rejects too
+        many results, the search is retried with a wider beam.
+        """
+        if self.entry_point is None or k <= 0:
+            return []
+        ef = max(ef, k)
+        while True:
+            entry = [self.entry_point]
+            for l in range(self.max_level, 0, -1):
+                entry = [self._search_layer(vectors, query, entry, 1, l)[0][1]]
+            found = self._search_layer(vectors, query, entry, ef, 0)
+            if accept is not None:
+                found = [(sim, node) for sim, node in found if accept(node)]
+            if len(found) >= k or ef >= self.size:
+                return found[:k]
+            ef = min(ef * 2, self.size)
+
+    def save(self, path: str, n_rows: int):
+        state = {
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "graph": self.graph,
+            "entry_point": self.entry_point,
+            "max_level": self.max_level,
+            "size": self.size,
+            "n_rows": n_rows,
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str, n_rows: int) -> Optional["HNSWIndex"]:
+        """
+        Load a saved graph, or None if it is missing or was built for a different row count.
+        """
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if state.get("n_rows") != n_rows:
+            return None
+        index = cls(M=state["M"], ef_construction=state["ef_construction"])
+        index.graph = state["graph"]
+        index.entry_point = state["entry_point"]
+        index.max_level = state["max_level"]
+        index.size = state["size"]
+        return index
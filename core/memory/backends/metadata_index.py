@@ -0,0 +1,116 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _union(postings: Iterable[List[int]]) -> np.ndarray:
+    arrays = [np.asarray(rows, dtype=np.int64) for rows in postings if rows is not None and len(rows)]
+    if not arrays:
+        return np.empty(0, dtype=np.int64)
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.unique(np.concatenate(arrays))
+
+
+class MetadataIndex:
+    """
+    Inverted index from metadata values to rows, used to pre-filter vector search.
+
+    'keys' are indexed by exact value (answers equality and $in). 'bucketed'
+    maps numeric keys to a bucket width (e.g. created_at -> 3600s) and answers
+    range filters by collecting the overlapping buckets. Postings are
+    append-only row lists, kept sorted because rows only grow; deleted rows
+    stay in them and are masked out by the caller.
+
+    candidates() returns a superset of the matching rows, so callers still run
+    matches_where over the (much smaller) result.
+    """
+
+    def __init__(self, keys: Iterable[str] = ("objective", "type"), bucketed: Optional[Dict[str, float]] = None):
+        self.keys = set(keys)
+        self.bucketed = dict({"created_at": 3600.0} if bucketed is None else bucketed)
+        self._postings: Dict[str, Dict[Any, List[int]]] = {
+            key: {} for key in self.keys | set(self.bucketed)
+        }
+
+    def add(self, row: int, metadata: Dict):
+        for key in self.keys:
+            value = metadata.get(key)
+            if value is not None and _hashable(value):
+                self._postings[key].setdefault(value, []).append(row)
+        for key, width in self.bucketed.items():
+            value = metadata.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._postings[key].setdefault(math.floor(value / width), []).append(row)
+
+    def candidates(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Sorted rows that can match 'where', or None if no indexed key narrows it.
+        """
+        if not where:
+            return None
+        result = None
+        for key, condition in where.items():
+            if key == "$and":
+                rows = None
+                for sub in condition:
+                    sub_rows = self.candidates(sub)
+                    if sub_rows is not None:
+                        rows = sub_rows if rows is None else np.intersect1d(rows, sub_rows, assume_unique=True)
+            elif key == "$or":
+                parts = [self.candidates(sub) for sub in condition]
+                rows = None if not parts or any(part is None for part in parts) else _union(parts)
+            elif key in self.bucketed:
+                rows = self._range_rows(key, condition)
+            elif key in self.keys:
+                rows = self._value_rows(key, condition)
+            else:
+                rows = None
+            if rows is not None:
+                result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def _value_rows(self, key: str, condition: Any) -> Optional[np.ndarray]:
+        if isinstance(condition, dict):
+            if "$eq" in condition:
+                values = [condition["$eq"]]
+            elif "$in" in condition:
+                values = list(condition["$in"])
+            else:
+                return None
+        else:
+            values = [condition]
+        if not all(_hashable(value) for value in values):
+            return None
+        postings = self._postings[key]
+        return _union(postings.get(value) for value in values)
+
+    def _range_rows(self, key: str, condition: Any) -> Optional[np.ndarray]:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        low, high = -math.inf, math.inf
+        for op, arg in condition.items():
+            if not isinstance(arg, (int, float)):
+                continue
+            if op in ("$gt", "$gte", "$eq"):
+                low = max(low, arg)
+            if op in ("$lt", "$lte", "$eq"):
+                high = min(high, arg)
+        if low == -math.inf and high == math.inf:
+            return None
+        width = self.bucketed[key]
+        first = math.floor(low / width) if low != -math.inf else None
+        last = math.floor(high / width) if high != math.inf else None
+        return _union(
+            rows for bucket, rows in self._postings[key].items()
+            if (first is None or bucket >= first) and (last is None or bucket <= last)
+        )
@@ -0,0 +1,463 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.memory.similarity import as_matrix, as_vector, l2_normalize, top_k
+from .base import VectorBackend, matches_where
+from .hnsw import HNSWIndex
+from .metadata_index import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+
+class NativeBackend(VectorBackend):
+    """
+    Local vector index with no external service.
+
+    Layout under <persist_directory>/<collection_name>/:
+      * vectors.f32 - memory-mapped float32 matrix, one row per document, grown by doubling
+      * meta.db     - SQLite table of row -> id, document, metadata, deleted flag
+      * hnsw.pkl    - saved HNSW graph (rebuilt if it does not match the rows)
+      * vectors.f32.vacuum / docs_vacuum table - staged output of an unfinished vacuum()
+
+    Small collections are searched exactly with one vectorized mat-vec product.
+    Once the number of live rows reaches 'hnsw_threshold', an HNSW graph is built
+    on a background thread, off the lock, while queries keep using the exact
+    scan; the finished graph is caught up and swapped in, then maintained
+    incrementally. Deletes are tombstones: the row is masked out
+    of results and stays in the graph for routing.
+
+    'where' filters are resolved first through an in-memory MetadataIndex on
+    'indexed_keys' (plus created_at buckets). If fewer than hnsw_threshold rows
+    match, they are searched exactly; otherwise HNSW only accepts matching rows.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        collection_name: str = "agent_memory",
+        hnsw_threshold: int = 20000,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        initial_capacity: int = 1024,
+        indexed_keys: Iterable[str] = ("objective", "type"),
+        bucketed_keys: Optional[Dict[str, float]] = None
+    ):
+        self.path = os.path.join(persist_directory, collection_name)
+        os.makedirs(self.path, exist_ok=True)
+        self.hnsw_threshold = hnsw_threshold
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.initial_capacity = initial_capacity
+
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._vacuum_path = os.path.join(self.path, "vectors.f32.vacuum")
+        self._hnsw_path = os.path.join(self.path, "hnsw.pkl")
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(os.path.join(self.path, "meta.db"), check_same_thread=False)
+
+        self.dim: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        self._capacity = 0
+        self._count = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_of: Dict[str, int] = {}
+        self._hnsw: Optional[HNSWIndex] = None
+        self._hnsw_checked = False
+        self._hnsw_thread: Optional[threading.Thread] = None
+        # Bumped whenever rows are renumbered, so a build in flight is discarded
+        self._generation = 0
+        self._meta_index = MetadataIndex(indexed_keys, bucketed_keys)
+
+        self._init_db()
+        self._load()
+
+    def _init_db(self):
+        self._create_docs_table('docs')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.commit()
+        self._recover_vacuum()
+
+    def _create_docs_table(self, name: str):
+        self.conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            row INTEGER PRIMARY KEY,
+            id TEXT NOT NULL,
+            document TEXT,
+            metadata TEXT,
+            deleted INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+
+    def _load(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT value FROM settings WHERE key = 'dim'")
+        row = cursor.fetchone()
+        if not row:
+            return
+        self.dim = int(row[0])
+        cursor.execute('SELECT row, id, metadata, deleted FROM docs ORDER BY row')
+        records = cursor.fetchall()
+        self._count = records[-1][0] + 1 if records else 0
+        self._ids = [""] * self._count
+        self._metadata = [{} for _ in range(self._count)]
+        self._alive = np.zeros(self._count, dtype=bool)
+        for row_num, doc_id, metadata, deleted in records:
+            self._ids[row_num] = doc_id
+            self._metadata[row_num] = json.loads(metadata) if metadata else {}
+            self._meta_index.add(row_num, self._metadata[row_num])
+            if not deleted:
+                self._alive[row_num] = True
+                self._row_of[doc_id] = row_num
+        self._open_vectors(max(self._count, self.initial_capacity))
+        logger.info(f"[NativeBackend] Loaded {len(self._row_of)} live vectors (dim={self.dim}) from {self.path}")
+
+    def _open_vectors(self, capacity: int):
+        """
+        (Re)map the vector file with room for at least 'capacity' rows.
+        """
+        row_bytes = self.dim * 4
+        current = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap = None
+        if current < capacity:
+            with open(self._vectors_path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+            current = capacity
+        self._capacity = current
+        self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(current, self.dim))
+        if self._alive.shape[0] < current:
+            self._alive = np.concatenate([self._alive, np.zeros(current - self._alive.shape[0], dtype=bool)])
+
+    def _ensure_capacity(self, rows: int):
+        if rows > self._capacity:
+            self._open_vectors(max(rows, self._capacity * 2))
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        embeddings = l2_normalize(as_matrix(embeddings))
+        if not len(ids):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                self._open_vectors(self.initial_capacity)
+            if embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} does not match index dim {self.dim}")
+
+            # Re-adding an id replaces the previous version
+            replaced = [doc_id for doc_id in ids if doc_id in self._row_of]
+            if replaced:
+                self.delete(replaced)
+
+            start = self._count
+            end = start + len(ids)
+            self._ensure_capacity(end)
+            self._mmap[start:end] = embeddings
+            self.conn.executemany(
+                'INSERT INTO docs (row, id, document, metadata) VALUES (?, ?, ?, ?)',
+                [
+                    (start + i, doc_id, documents[i], json.dumps(metadatas[i] or {}))
+                    for i, doc_id in enumerate(ids)
+                ]
+            )
+            self.conn.commit()
+
+            self._count = end
+            self._alive[start:end] = True
+            for i, doc_id in enumerate(ids):
+                self._ids.append(doc_id)
+                self._metadata.append(metadatas[i] or {})
+                self._row_of[doc_id] = start + i
+                self._meta_index.add(start + i, self._metadata[-1])
+
+            if self._hnsw is not None:
+                for row in range(start, end):
+                    self._hnsw.add(self._mmap, row)
+            elif len(self._row_of) >= self.hnsw_threshold:
+                self._start_hnsw_build()
+
+    def _start_hnsw_build(self):
+        """
+        Build the HNSW graph on a background thread. Called under the lock.
+        """
+        self._hnsw_checked = True
+        if self._hnsw_thread is not None:
+            return
+        rows = np.flatnonzero(self._alive[:self._count]).tolist()
+        logger.info(f"[NativeBackend] Building HNSW graph over {len(rows)} vectors in the background...")
+        # The build reads from this mapping; growing the file later leaves these rows in place
+        self._hnsw_thread = threading.Thread(
+            target=self._build_hnsw,
+            args=(self._generation, self._mmap, rows, self._count),
+            name="hnsw-build",
+            daemon=True
+        )
+        self._hnsw_thread.start()
+
+    def _build_hnsw(self, generation: int, vectors: np.ndarray, rows: List[int], built_upto: int):
+        index = HNSWIndex(M=self.M, ef_construction=self.ef_construction)
+        try:
+            for row in rows:
+                index.add(vectors, row)
+        except Exception as e:
+            logger.error(f"[NativeBackend] HNSW build failed; staying on exact search: {e}", exc_info=True)
+            with self._lock:
+                if generation == self._generation:
+                    self._hnsw_thread = None
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            # Rows added while building; rows deleted meanwhile are masked at query time
+            for row in np.flatnonzero(self._alive[built_upto:self._count]).tolist():
+                index.add(self._mmap, built_upto + row)
+            self._hnsw = index
+            self._hnsw_thread = None
+            logger.info(f"[NativeBackend] HNSW graph ready over {len(index)} vectors.")
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a background HNSW build finishes; True if the graph is in use.
+        """
+        thread = self._hnsw_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._hnsw is not None
+
+    def _ensure_hnsw(self):
+        """
+        Use a saved graph when it matches the stored rows, otherwise rebuild once.
+        """
+        if self._hnsw is not None or self._hnsw_checked:
+            return
+        self._hnsw_checked = True
+        if len(self._row_of) < self.hnsw_threshold:
+            return
+        self._hnsw = HNSWIndex.load(self._hnsw_path, self._count)
+        if self._hnsw is None:
+            self._start_hnsw_build()
+
+    def _filter_rows(self, where: Dict) -> np.ndarray:
+        """
+        Live rows matching 'where': narrowed by the metadata index, then checked exactly.
+        """
+        rows = self._meta_index.candidates(where)
+        if rows is None:
+            rows = np.arange(self._count)
+        rows = rows[self._alive[rows]]
+        metadata = self._metadata
+        return np.asarray(
+            [row for row in rows.tolist() if matches_where(metadata[row], where)],
+            dtype=np.int64
+        )
+
+    def query(
+        self,
+        embedding: np.ndarray,
+        k: int,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict]:
+        query = l2_normalize(as_vector(embedding))
+        with self._lock:
+            if self._count == 0 or self.dim is None or query.shape[0] != self.dim:
+                return []
+            self._ensure_hnsw()
+
+            candidates = self._filter_rows(where) if where else None
+            if candidates is not None and candidates.shape[0] == 0:
+                return []
+
+            if self._hnsw is not None and (candidates is None or candidates.shape[0] >= self.hnsw_threshold):
+                accept_mask = self._alive
+                if candidates is not None:
+                    accept_mask = np.zeros(self._alive.shape[0], dtype=bool)
+                    accept_mask[candidates] = True
+                found = self._hnsw.search(self._mmap, query, k, self.ef_search, lambda row: bool(accept_mask[row]))
+                rows = [row for _, row in found]
+                sims = [sim for sim, _ in found]
+            else:
+                # Small collection or selective filter: exact scan over the candidates only
+                if candidates is None:
+                    candidates = np.flatnonzero(self._alive[:self._count])
+                scores = self._mmap[candidates] @ query
+                idx, best = top_k(scores, k)
+                rows = candidates[idx].tolist()
+                sims = best.tolist()
+
+            return self._fetch(rows, sims, include_embeddings)
+
+    def _fetch(self, rows: List[int], sims: List[float], include_embeddings: bool = False) -> List[Dict]:
+        if not rows:
+            return []
+        documents = self._documents(rows)
+        results = []
+        for row, sim in zip(rows, sims):
+            result = {
+                "id": self._ids[row],
+                "document": documents.get(row, ""),
+                "metadata": self._metadata[row],
+                "similarity": float(sim)
+            }
+            if include_embeddings:
+                # Copy: the memory map may be remapped when the index grows
+                result["embedding"] = np.array(self._mmap[row])
+            results.append(result)
+        return results
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            rows = [self._row_of.pop(doc_id) for doc_id in ids if doc_id in self._row_of]
+            if not rows:
+                return
+            self._alive[rows] = False
+            self.conn.executemany('UPDATE docs SET deleted = 1 WHERE row = ?', [(row,) for row in rows])
+            self.conn.commit()
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def tombstones(self) -> int:
+        return self._count - len(self._row_of)
+
+    def export(self) -> Dict:
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._count])
+            if self.dim is None or not rows.shape[0]:
+                return {"ids": [], "embeddings": np.empty((0, self.dim or 0), dtype=np.float32), "documents": [], "metadatas": []}
+            documents = self._documents(rows.tolist())
+            return {
+                "ids": [self._ids[row] for row in rows.tolist()],
+                "embeddings": np.array(self._mmap[rows]),
+                "documents": [documents.get(row, "") for row in rows.tolist()],
+                "metadatas": [self._metadata[row] for row in rows.tolist()]
+            }
+
+    def _documents(self, rows: List[int]) -> Dict[int, str]:
+        documents: Dict[int, str] = {}
+        cursor = self.conn.cursor()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(rows), 900):
+            chunk = rows[start:start + 900]
+            placeholders = ",".join("?" for _ in chunk)
+            cursor.execute(f'SELECT row, document FROM docs WHERE row IN ({placeholders})', chunk)
+            documents.update(cursor.fetchall())
+        return documents
+
+    def vacuum(self):
+        """
+        Rewrite the vector file and metadata table without tombstoned rows.
+        Rows are renumbered, so the HNSW graph and metadata index are rebuilt.
+
+        The new vectors go to a temp file and the new rows to a staging table
+        first; the old state stays valid until both are complete, and
+        _recover_vacuum() finishes or discards an interrupted vacuum on load.
+        """
+        with self._lock:
+            if self.dim is None or len(self._row_of) == self._count:
+                return
+            rows = np.flatnonzero(self._alive[:self._count])
+            removed = self._count - rows.shape[0]
+
+            # The saved graph is only a cache and would not match the new row numbers
+            if os.path.exists(self._hnsw_path):
+                os.remove(self._hnsw_path)
+
+            capacity = max(rows.shape[0], self.initial_capacity)
+            new_vectors = np.memmap(self._vacuum_path, dtype=np.float32, mode='w+', shape=(capacity, self.dim))
+            for start in range(0, rows.shape[0], 4096):
+                block = rows[start:start + 4096]
+                new_vectors[start:start + block.shape[0]] = self._mmap[block]
+            new_vectors.flush()
+            del new_vectors
+            fd = os.open(self._vacuum_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            self.conn.execute('BEGIN')
+            self.conn.execute('DROP TABLE IF EXISTS docs_vacuum')
+            self._create_docs_table('docs_vacuum')
+            self.conn.executemany(
+                'INSERT INTO docs_vacuum (row, id, document, metadata) '
+                'SELECT ?, id, document, metadata FROM docs WHERE row = ?',
+                enumerate(rows.tolist())
+            )
+            self.conn.commit()
+
+            if self._mmap is not None:
+                self._mmap.flush()
+                self._mmap = None
+            try:
+                os.replace(self._vacuum_path, self._vectors_path)
+            except Exception:
+                # Nothing was replaced: drop the staged copy and keep serving the old rows
+                self._recover_vacuum()
+                self._open_vectors(self._capacity)
+                raise
+            # From here on, recovery completes the vacuum instead of discarding it
+            try:
+                self._swap_vacuum_table()
+            except Exception:
+                self.conn.rollback()
+                self._recover_vacuum()
+
+            self._count = 0
+            self._capacity = 0
+            self._ids = []
+            self._metadata = []
+            self._alive = np.zeros(0, dtype=bool)
+            self._row_of = {}
+            self._hnsw = None
+            self._hnsw_checked = False
+            self._hnsw_thread = None
+            self._generation += 1
+            self._meta_index = MetadataIndex(self._meta_index.keys, self._meta_index.bucketed)
+            self._load()
+            self.conn.execute('VACUUM')
+            logger.info(f"[NativeBackend] Vacuumed {removed} deleted rows; {len(self._row_of)} remain.")
+
+    def _swap_vacuum_table(self):
+        self.conn.execute('BEGIN')
+        self.conn.execute('DROP TABLE docs')
+        self.conn.execute('ALTER TABLE docs_vacuum RENAME TO docs')
+        self.conn.commit()
+
+    def _recover_vacuum(self):
+        """
+        Finish or roll back a vacuum interrupted by a crash.
+        """
+        staged = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'docs_vacuum'"
+        ).fetchone()
+        if os.path.exists(self._vacuum_path):
+            # The vector file was not replaced yet: the old rows and table are intact
+            os.remove(self._vacuum_path)
+            if staged:
+                self.conn.execute('DROP TABLE docs_vacuum')
+                self.conn.commit()
+            logger.warning(f"[NativeBackend] Discarded an interrupted vacuum in {self.path}")
+        elif staged:
+            self._swap_vacuum_table()
+            logger.warning(f"[NativeBackend] Completed an interrupted vacuum in {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._generation += 1
+            if self._mmap is not None:
+                self._mmap.flush()
+            if self._hnsw is not None:
+                self._hnsw.save(self._hnsw_path, self._count)
+            self.conn.close()
@@ -0,0 +1,215 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.memory.similarity import l2_normalize
+
+logger = logging.getLogger(__name__)
+
+class MemoryCompactor:
+    """
+    Background maintenance for a VectorStorage collection.
+
+    Each pass:
+      1. finds candidate clusters of near-duplicates (cosine >= similarity_threshold),
+         comparing embeddings block by block so memory stays bounded;
+      2. in each cluster, keeps a survivor according to 'policy' and evicts
+         only the members within the threshold of that survivor; the rest are
+         handled the same way among themselves. "newest" keeps the latest
+         created_at, "highest_score" the highest metadata 'score' (newest on ties);
+      3. enforces max_entries / max_bytes by evicting the entries retrieved
+         least recently (never-retrieved entries fall back to created_at);
+      4. vacuums the backend once deleted rows make up 'vacuum_ratio' of it,
+         so evicted rows stop costing disk and scan time without rewriting
+         the index after every small eviction.
+    """
+
+    POLICIES = ("newest", "highest_score")
+
+    def __init__(
+        self,
+        storage,
+        similarity_threshold: float = 0.95,
+        policy: str = "newest",
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        block_size: int = 1024,
+        group_by: Optional[str] = None,
+        interval: float = 600.0,
+        vacuum_ratio: float = 0.2
+    ):
+        """
+        'group_by' limits duplicate search to entries sharing that metadata value
+        (e.g. "objective"), which is much cheaper on large collections.
+        'interval' is the number of seconds between passes once start() is called.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown compaction policy '{policy}', expected one of {self.POLICIES}")
+        self.storage = storage
+        self.similarity_threshold = similarity_threshold
+        self.policy = policy
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.group_by = group_by
+        self.interval = interval
+        self.vacuum_ratio = vacuum_ratio
+        self._stop_event = threading.Event()
+        self.thread = None
+        self.last_stats: Dict = {}
+
+    def start(self):
+        logger.debug(f"[MemoryCompactor] Starting; one pass every {self.interval}s.")
+        self.thread = threading.Thread(target=self._loop, name="MemoryCompactor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread:
+            self._stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[MemoryCompactor] Compaction pass failed: {e}", exc_info=True)
+
+    def run_once(self) -> Dict:
+        start = time.perf_counter()
+        data = self.storage.export()
+        ids = data["ids"]
+        metadatas = data["metadatas"]
+        embeddings = l2_normalize(data["embeddings"]) if ids else data["embeddings"]
+
+        evict = set()
+        duplicates = 0
+        for cluster in self._clusters(embeddings, metadatas):
+            removed = self._dedupe(cluster, embeddings, metadatas)
+            evict.update(ids[i] for i in removed)
+            duplicates += len(removed)
+
+        capped = self._over_cap(ids, embeddings, data["documents"], metadatas, evict)
+        evict.update(capped)
+
+        if evict:
+            self.storage.delete(list(evict))
+        vacuumed = self.storage.tombstone_ratio() >= self.vacuum_ratio
+        if vacuumed:
+            self.storage.vacuum()
+        self.storage.save_retrieval_times()
+
+        self.last_stats = {
+            "scanned": len(ids),
+            "duplicates": duplicates,
+            "capped": len(capped),
+            "evicted": len(evict),
+            "remaining": len(ids) - len(evict),
+            "vacuumed": vacuumed,
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+        logger.info(f"[MemoryCompactor] Pass complete: {self.last_stats}")
+        return self.last_stats
+
+    def _clusters(self, embeddings: np.ndarray, metadatas: List[Dict]) -> List[List[int]]:
+        if not self.group_by:
+            return self.find_duplicates(embeddings)
+        groups: Dict = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(json.dumps(metadata.get(self.group_by), default=str), []).append(i)
+        clusters = []
+        for members in groups.values():
+            members = np.asarray(members)
+            clusters.extend([members[c].tolist() for c in self.find_duplicates(embeddings[members])])
+        return clusters
+
+    def find_duplicates(self, embeddings: np.ndarray) -> List[List[int]]:
+        """
+        Candidate clusters (lists of row indices, size >= 2) of L2-normalized
+        rows whose similarity chains above the threshold; _dedupe() decides
+        which members are actually duplicates. Compares block_size x block_size
+        tiles so only one tile of similarities is held at a time.
+        """
+        n = embeddings.shape[0]
+        parent = list(range(n))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        bs = self.block_size
+        for i in range(0, n, bs):
+            block = embeddings[i:i + bs]
+            for j in range(i, n, bs):
+                hits = (block @ embeddings[j:j + bs].T) >= self.similarity_threshold
+                if i == j:
+                    hits = np.triu(hits, k=1)
+                for a, b in zip(*np.nonzero(hits)):
+                    root_a, root_b = find(i + int(a)), find(j + int(b))
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+
+        clusters: Dict[int, List[int]] = {}
+        for x in range(n):
+            clusters.setdefault(find(x), []).append(x)
+        return [members for members in clusters.values() if len(members) > 1]
+
+    def _dedupe(self, cluster: List[int], embeddings: np.ndarray, metadatas: List[Dict]) -> List[int]:
+        """
+        Members of 'cluster' to evict: those within the threshold of the
+        survivor. Chained members that are not close to it get their own survivor.
+        """
+        removed = []
+        remaining = list(cluster)
+        while len(remaining) > 1:
+            keep = self._survivor(remaining, metadatas)
+            sims = embeddings[remaining] @ embeddings[keep]
+            duplicates = {i for i, sim in zip(remaining, sims.tolist()) if i != keep and sim >= self.similarity_threshold}
+            removed.extend(sorted(duplicates))
+            remaining = [i for i in remaining if i != keep and i not in duplicates]
+        return removed
+
+    def _survivor(self, cluster: List[int], metadatas: List[Dict]) -> int:
+        def created(i: int) -> float:
+            return metadatas[i].get("created_at") or 0.0
+
+        if self.policy == "highest_score":
+            return max(cluster, key=lambda i: (metadatas[i].get("score") or 0.0, created(i)))
+        return max(cluster, key=created)
+
+    def _over_cap(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict], evicted: set) -> List[str]:
+        """
+        Ids to evict, least recently retrieved first, until both caps are met.
+        """
+        if self.max_entries is None and self.max_bytes is None:
+            return []
+        row_bytes = embeddings.shape[1] * 4 if embeddings.ndim == 2 else 0
+        remaining = [i for i, doc_id in enumerate(ids) if doc_id not in evicted]
+        sizes = {
+            i: row_bytes + len((documents[i] or "").encode()) + len(json.dumps(metadatas[i], default=str))
+            for i in remaining
+        }
+        total_bytes = sum(sizes.values())
+        last_retrieved = self.storage.last_retrieved
+
+        def recency(i: int) -> float:
+            return last_retrieved.get(ids[i], metadatas[i].get("created_at") or 0.0)
+
+        capped = []
+        count = len(remaining)
+        for i in sorted(remaining, key=recency):
+            over_entries = self.max_entries is not None and count > self.max_entries
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not (over_entries or over_bytes):
+                break
+            capped.append(ids[i])
+            count -= 1
+            total_bytes -= sizes[i]
+        return capped
@@ -0,0 +1,82 @@
+from typing import List, Tuple
+
+import numpy as np
+
+EMPTY_VECTOR = np.empty(0, dtype=np.float32)
+EMPTY_VECTOR.flags.writeable = False
+
+
+def as_vector(embedding) -> np.ndarray:
+    """
+    Any embedding (list, nested list, array) as a flat float32 vector. No copy if already one.
+    """
+    return np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+
+def as_matrix(embeddings) -> np.ndarray:
+    """
+    A batch of embeddings as a C-contiguous (n, dim) float32 matrix.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    return np.ascontiguousarray(matrix)
+
+
+def l2_normalize(x: np.ndarray, eps: float = 1e-12) -> np.ndarray:
+    """
+    L2-normalize a vector or each row of a matrix, vectorized. Zero rows stay zero.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, eps)
+
+
+def cosine_similarity(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of one vector against every row of 'matrix'.
+    Both sides are assumed L2-normalized, so this is a single mat-vec product.
+    """
+    if matrix.size == 0:
+        return np.empty(0, dtype=np.float32)
+    return matrix @ query
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices and scores of the k highest scores, best first, in O(n + k log k).
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return idx, scores[idx]
+
+
+def mmr(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Maximal marginal relevance: pick k rows of 'candidates' that are relevant to
+    'query' but not redundant with each other. Each step is one mat-vec product
+    that updates every candidate's max similarity to the selected set.
+    """
+    n = candidates.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+    relevance = candidates @ query
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    for _ in range(k):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    return selected
@@ -2,16 +2,38 @@ import logging
 import sqlite3
 import json
 import os
+import threading
 import uuid
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+def _json_round_trip(value: Any) -> Optional[str]:
+    """
+    JSON text of 'value' if decoding it gives back an equal value, else None
+    (tuples, non-string keys, sets and other objects would come back changed).
+    """
+    try:
+        encoded = json.dumps(value)
+        return encoded if json.loads(encoded) == value else None
+    except (TypeError, ValueError):
+        return None
+
 class StateManager:
-    def __init__(self, db_path: str = "agent_state.db"):
+    # One connection is shared across threads, so every use of self.conn holds _lock
+    def __init__(self, db_path: str = "agent_state.db", max_step_outputs: Optional[int] = 10000,
+                 step_output_ttl: Optional[float] = 30 * 24 * 3600):
+        """
+        Memoized step outputs are capped at 'max_step_outputs' entries and
+        expire 'step_output_ttl' seconds after they were stored (None = no limit).
+        """
+        self.max_step_outputs = max_step_outputs
+        self.step_output_ttl = step_output_ttl
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._init_db()
+        self._lock = threading.Lock()
+        with self._lock:
+            self._init_db()
 
     def _init_db(self):
         cursor = self.conn.cursor()
@@ -23,6 +45,23 @@ class StateManager:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS workflow_steps (
+            workflow_id TEXT,
+            step_id TEXT,
+            status TEXT,
+            output TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (workflow_id, step_id)
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS step_outputs (
+            fingerprint TEXT PRIMARY KEY,
+            output TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
         self.conn.commit()
         logger.debug("[StateManager] Database initialized.")
 
@@ -30,40 +69,126 @@ class StateManager:
         return str(uuid.uuid4())
 
     def save_task(self, task: Dict):
-        cursor = self.conn.cursor()
         task_id = task.get('id', self.generate_id())
         logger.info(f"[StateManager] Saving task {task_id}")
-        cursor.execute(
-            'INSERT INTO tasks (id, data, status) VALUES (?, ?, ?)',
-            (task_id, json.dumps(task), task.get('status', 'pending'))
-        )
-        self.conn.commit()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'INSERT INTO tasks (id, data, status) VALUES (?, ?, ?)',
+                (task_id, json.dumps(task), task.get('status', 'pending'))
+            )
+            self.conn.commit()
 
     def get_task(self, task_id: str) -> Optional[Dict]:
         logger.debug(f"[StateManager] Fetching task {task_id}")
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT data FROM tasks WHERE id = ?', (task_id,))
-        result = cursor.fetchone()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT data FROM tasks WHERE id = ?', (task_id,))
+            result = cursor.fetchone()
         if result:
             return json.loads(result[0])
         return None
 
     def update_task(self, task_id: str, task: Dict):
         logger.info(f"[StateManager] Updating task {task_id} => {task.get('status')}")
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'UPDATE tasks SET data = ?, status = ? WHERE id = ?',
-            (json.dumps(task), task.get('status', 'pending'), task_id)
-        )
-        self.conn.commit()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'UPDATE tasks SET data = ?, status = ? WHERE id = ?',
+                (json.dumps(task), task.get('status', 'pending'), task_id)
+            )
+            self.conn.commit()
 
     def get_pending_tasks(self):
         logger.debug("[StateManager] Getting pending tasks")
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT data FROM tasks WHERE status = ?', ('pending',))
-        return [json.loads(row[0]) for row in cursor.fetchall()]
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT data FROM tasks WHERE status = ?', ('pending',))
+            rows = cursor.fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_workflow_steps(self, checkpoints: List[Dict]):
+        """
+        Upsert step checkpoints ({workflow_id, step_id, status, output}) in one
+        transaction. Completed steps with a 'fingerprint' are also memoized.
+        An output that does not survive a JSON round trip is not stored: its
+        step is checkpointed as "unsaved", so a resume runs it again, and it is
+        not memoized.
+        """
+        logger.debug(f"[StateManager] Checkpointing {len(checkpoints)} workflow steps")
+        rows = []
+        memoized = []
+        for c in checkpoints:
+            status, output = c['status'], _json_round_trip(c.get('output'))
+            if output is None:
+                if status == 'completed':
+                    logger.warning(
+                        f"[StateManager] Output of step {c['step_id']} does not round-trip through JSON; "
+                        f"not checkpointing or memoizing it."
+                    )
+                    status = 'unsaved'
+                output = 'null'
+            elif status == 'completed' and c.get('fingerprint'):
+                memoized.append((c['fingerprint'], output))
+            rows.append((c['workflow_id'], c['step_id'], status, output))
+        with self._lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO workflow_steps (workflow_id, step_id, status, output) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self.conn.executemany('INSERT OR REPLACE INTO step_outputs (fingerprint, output) VALUES (?, ?)', memoized)
+            if memoized:
+                self._prune_step_outputs()
+            self.conn.commit()
+
+    def _prune_step_outputs(self):
+        # Called under _lock, inside the caller's transaction
+        if self.step_output_ttl is not None:
+            self.conn.execute(
+                "DELETE FROM step_outputs WHERE created_at < datetime('now', ?)",
+                (f"-{int(self.step_output_ttl)} seconds",)
+            )
+        if self.max_step_outputs is not None:
+            count = self.conn.execute('SELECT COUNT(*) FROM step_outputs').fetchone()[0]
+            if count > self.max_step_outputs:
+                self.conn.execute(
+                    'DELETE FROM step_outputs WHERE fingerprint IN '
+                    '(SELECT fingerprint FROM step_outputs ORDER BY created_at, rowid LIMIT ?)',
+                    (count - self.max_step_outputs,)
+                )
+
+    def get_workflow_steps(self, workflow_id: str) -> Dict[str, Dict]:
+        """
+        Latest checkpoint of each step of a workflow, by step id.
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                'SELECT step_id, status, output FROM workflow_steps WHERE workflow_id = ?', (workflow_id,)
+            )
+            rows = cursor.fetchall()
+        return {step_id: {'status': status, 'output': json.loads(output)} for step_id, status, output in rows}
+
+    def get_step_output(self, fingerprint: str) -> Tuple[bool, Any]:
+        """
+        Memoized output of a step with this fingerprint, as (found, output).
+        """
+        with self._lock:
+            cursor = self.conn.execute('SELECT output FROM step_outputs WHERE fingerprint = ?', (fingerprint,))
+            row = cursor.fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def clear_step_outputs(self):
+        with self._lock:
+            self.conn.execute('DELETE FROM step_outputs')
+            self.conn.commit()
+
+    def clear_workflow(self, workflow_id: str):
+        with self._lock:
+            self.conn.execute('DELETE FROM workflow_steps WHERE workflow_id = ?', (workflow_id,))
+            self.conn.commit()
 
     def __del__(self):
         if hasattr(self, 'conn') and self.conn:
             logger.debug("[StateManager] Closing DB connection.")
-            self.conn.close()
+            with self._lock:
+                self.conn.close()
@@ -1,13 +1,20 @@
+import json
 import logging
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Dict, Optional, Union
+import numpy as np
+from core.memory.similarity import EMPTY_VECTOR, as_matrix, as_vector, l2_normalize, mmr
+from core.memory.backends import VectorBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
 class VectorStorage:
     """
-    A wrapper around Chroma for storing and retrieving embeddings and associated content.
+    Stores and retrieves embeddings and associated content through a pluggable
+    backend ("native" memory-mapped index or "chroma").
     We assume we have a separate embedding model from Llama, so we do not do Llama embeddings here.
     We call a 'MiniLMInterface' externally and pass the result in if needed.
     """
@@ -15,21 +22,33 @@ class VectorStorage:
         self,
         embedding_interface=None,
         collection_name: str = "agent_memory",
-        persist_directory: str = "chroma_db"
+        persist_directory: str = "chroma_db",
+        backend: Union[str, VectorBackend] = "chroma",
+        backend_options: Optional[Dict] = None,
+        context_cache_ttl: float = 30.0,
+        context_cache_size: int = 128
     ):
         """
         If 'embedding_interface' is not None, we can do on-the-fly embeddings inside VectorStorage.
         Otherwise, we expect the user to pass embeddings directly.
+        'backend' is a backend name or an already constructed VectorBackend.
+        get_context() results are cached for 'context_cache_ttl' seconds and
+        dropped whenever the collection changes. Retrieval times are kept in
+        <persist_directory>/<collection_name>_retrieved.json across restarts.
         """
         self.embedding_interface = embedding_interface
-        self.client = chromadb.Client(
-            Settings(
-                chroma_db_impl="duckdb+parquet",
-                persist_directory=persist_directory
-            )
-        )
-        logger.debug("[VectorStorage] Initializing collection...")
-        self.collection = self.client.get_or_create_collection(collection_name)
+        self.context_cache_ttl = context_cache_ttl
+        self.context_cache_size = context_cache_size
+        self._context_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._context_lock = threading.Lock()
+        # id -> time it was last returned by a query (drives LRU eviction)
+        self._retrieved_path = os.path.join(persist_directory, f"{collection_name}_retrieved.json")
+        self.last_retrieved: Dict[str, float] = self._load_retrieval_times()
+        if isinstance(backend, VectorBackend):
+            self.backend = backend
+        else:
+            logger.debug(f"[VectorStorage] Initializing '{backend}' backend at {persist_directory}...")
+            self.backend = create_backend(backend, persist_directory, collection_name, **(backend_options or {}))
         logger.debug(f"[VectorStorage] Collection '{collection_name}' ready.")
 
     def store(self, doc_id: str, text: str, metadata: Dict = None):
@@ -43,46 +62,197 @@ class VectorStorage:
         try:
             if self.embedding_interface:
                 # Generate embedding via MiniLM
-                embedding = self.embedding_interface.get_embedding(text)
+                embedding = as_vector(self.embedding_interface.get_embedding(text))
             else:
                 logger.warning("[VectorStorage] No embedding interface; storing doc with empty embedding.")
-                embedding = []
-
-            logger.debug(f"[VectorStorage] Storing doc_id={doc_id}, len_embedding={len(embedding)}")
-            self.collection.add(
-                documents=[text],
-                embeddings=[embedding],
-                metadatas=[metadata],
-                ids=[doc_id]
-            )
+                embedding = EMPTY_VECTOR
+
+            logger.debug(f"[VectorStorage] Storing doc_id={doc_id}, len_embedding={embedding.shape[0]}")
+            self.backend.add([doc_id], embedding.reshape(1, -1), [text], [metadata])
+            self._invalidate_context_cache()
             logger.debug("[VectorStorage] Document stored with embedding.")
         except Exception as e:
             logger.error(f"[VectorStorage] Error storing in vector DB: {e}", exc_info=True)
 
-    def query_similar(self, query_text: str, k: int = 3) -> List[Dict]:
+    def store_many(self, doc_ids: List[str], texts: List[str], metadatas: Optional[List[Dict]] = None):
+        """
+        Store many documents with one batched embedding call and one backend add.
+        Errors are logged and re-raised, so batch writers can count failures.
+        """
+        if not doc_ids:
+            return
+        if metadatas is None:
+            metadatas = [{} for _ in doc_ids]
+        if not (len(doc_ids) == len(texts) == len(metadatas)):
+            raise ValueError("doc_ids, texts and metadatas must have the same length")
+        if not self.embedding_interface:
+            raise RuntimeError("No embedding interface; cannot store_many without embeddings")
+
+        try:
+            if hasattr(self.embedding_interface, "get_embeddings"):
+                embeddings = as_matrix(self.embedding_interface.get_embeddings(texts))
+            else:
+                embeddings = as_matrix([self.embedding_interface.get_embedding(text) for text in texts])
+
+            logger.debug(f"[VectorStorage] Storing {len(doc_ids)} docs in one batch.")
+            self.backend.add(list(doc_ids), embeddings, list(texts), list(metadatas))
+            self._invalidate_context_cache()
+        except Exception as e:
+            logger.error(f"[VectorStorage] Error batch-storing in vector DB: {e}", exc_info=True)
+            raise
+
+    def delete(self, doc_ids: List[str]):
+        """
+        Remove documents by id. Unknown ids are ignored.
+        """
+        if not doc_ids:
+            return
+        try:
+            self.backend.delete(list(doc_ids))
+            self._invalidate_context_cache()
+            for doc_id in doc_ids:
+                self.last_retrieved.pop(doc_id, None)
+            logger.debug(f"[VectorStorage] Deleted {len(doc_ids)} document(s).")
+        except Exception as e:
+            logger.error(f"[VectorStorage] Error deleting from vector DB: {e}", exc_info=True)
+
+    def count(self) -> int:
+        return self.backend.count()
+
+    def query_similar(self, query_text: str, k: int = 3, where: Optional[Dict] = None) -> List[Dict]:
         """
         Query the DB for the top-k similar documents to 'query_text'.
         We'll embed the query with our interface if available.
+        'where' is an optional metadata filter, e.g. {"objective": "..."} or
+        {"type": "result", "created_at": {"$gte": since}} (see matches_where).
+        Each result carries a cosine 'similarity' (1.0 = identical).
         """
         if not self.embedding_interface:
             logger.warning("[VectorStorage] No embedding interface; cannot do similarity search. Returning empty.")
             return []
 
         try:
-            query_emb = self.embedding_interface.get_embedding(query_text)
-            results = self.collection.query(
-                query_embeddings=[query_emb],
-                n_results=k
-            )
-            # results is a dict with "documents", "ids", "metadatas", "embeddings" (optionally)
-            docs = []
-            for i in range(len(results["documents"][0])):
-                docs.append({
-                    "id": results["ids"][0][i],
-                    "document": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i]
-                })
-            return docs
+            query_emb = as_vector(self.embedding_interface.get_embedding(query_text))
+            results = self.backend.query(query_emb, k, where)
+            self._touch(results)
+            return results
         except Exception as e:
             logger.error(f"[VectorStorage] Error querying vector DB: {e}", exc_info=True)
             return []
+
+    def get_context(
+        self,
+        query: str,
+        k: int = 5,
+        token_budget: Optional[int] = None,
+        where: Optional[Dict] = None,
+        fetch_k: Optional[int] = None,
+        lambda_mult: float = 0.5,
+        token_counter: Optional[Callable[[str], int]] = None
+    ) -> str:
+        """
+        Compact context string for 'query': over-fetch 'fetch_k' candidates, keep
+        k diverse ones with maximal marginal relevance, and stop adding snippets
+        once 'token_budget' would be exceeded. 'token_counter' defaults to a
+        ~4 chars/token estimate. Repeated calls within the TTL are served from cache.
+        """
+        if not self.embedding_interface or not query:
+            return ""
+
+        cache_key = (query, k, token_budget, json.dumps(where, sort_keys=True, default=str), fetch_k, lambda_mult)
+        with self._context_lock:
+            cached = self._context_cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                self._context_cache.move_to_end(cache_key)
+                return cached[1]
+
+        try:
+            query_emb = l2_normalize(as_vector(self.embedding_interface.get_embedding(query)))
+            candidates = self.backend.query(query_emb, fetch_k or k * 4, where, include_embeddings=True)
+        except Exception as e:
+            logger.error(f"[VectorStorage] Error building context: {e}", exc_info=True)
+            return ""
+
+        candidates = [c for c in candidates if c.get("document") and c.get("embedding") is not None]
+        if candidates:
+            matrix = l2_normalize(np.stack([as_vector(c["embedding"]) for c in candidates]))
+            order = mmr(query_emb, matrix, k, lambda_mult)
+        else:
+            order = []
+
+        count = token_counter or (lambda text: len(text) // 4 + 1)
+        snippets = []
+        used = 0
+        for index in order:
+            snippet = " ".join(candidates[index]["document"].split())
+            cost = count(snippet) + 1
+            if token_budget is not None and used + cost > token_budget:
+                continue
+            snippets.append(snippet)
+            used += cost
+        context = "\n".join(f"- {snippet}" for snippet in snippets)
+        self._touch([candidates[index] for index in order])
+
+        with self._context_lock:
+            self._context_cache[cache_key] = (time.monotonic() + self.context_cache_ttl, context)
+            self._context_cache.move_to_end(cache_key)
+            while len(self._context_cache) > self.context_cache_size:
+                self._context_cache.popitem(last=False)
+        return context
+
+    def export(self) -> Dict:
+        """
+        All live entries with their embeddings; see VectorBackend.export.
+        """
+        return self.backend.export()
+
+    def tombstone_ratio(self) -> float:
+        """
+        Share of stored rows that are deleted but not yet vacuumed.
+        """
+        tombstones = self.backend.tombstones()
+        total = tombstones + self.backend.count()
+        return tombstones / total if total else 0.0
+
+    def vacuum(self):
+        self.backend.vacuum()
+
+    def _load_retrieval_times(self) -> Dict[str, float]:
+        if not os.path.exists(self._retrieved_path):
+            return {}
+        try:
+            with open(self._retrieved_path, 'r', encoding='utf-8') as f:
+                return {doc_id: float(t) for doc_id, t in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"[VectorStorage] Ignoring unreadable retrieval times {self._retrieved_path}: {e}")
+            return {}
+
+    def save_retrieval_times(self):
+        """
+        Persist last_retrieved (write to a temp file, then rename).
+        """
+        times = dict(self.last_retrieved)
+        try:
+            os.makedirs(os.path.dirname(self._retrieved_path) or ".", exist_ok=True)
+            tmp_path = self._retrieved_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(times, f)
+            os.replace(tmp_path, self._retrieved_path)
+        except OSError as e:
+            logger.error(f"[VectorStorage] Error saving retrieval times: {e}")
+
+    def _touch(self, results: List[Dict]):
+        now = time.time()
+        for result in results:
+            self.last_retrieved[result["id"]] = now
+
+    def _invalidate_context_cache(self):
+        with self._context_lock:
+            self._context_cache.clear()
+
+    def close(self):
+        self.save_retrieval_times()
+        try:
+            self.backend.close()
+        except Exception as e:
+            logger.error(f"[VectorStorage] Error closing vector DB: {e}", exc_info=True)
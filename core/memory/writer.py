@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from queue import Queue, Empty, Full
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MemoryWriter:
+    """
+    Write-behind pipeline from completed tasks into VectorStorage.
+
+    submit() only puts the document on a bounded queue, so callers never wait
+    on an embedding or a vector DB write. A background thread drains the queue,
+    splits long texts into overlapping chunks, and writes each batch with one
+    store_many() call (one batched embedding + one bulk insert).
+
+    Chunks are sized in tokens of the embedding model ('embedder'.count_tokens)
+    and capped at its max_input_tokens, so no chunk is silently truncated when
+    it is embedded. Without an embedder, tokens are estimated as chars / 4.
+
+    Backpressure: when the queue is full, submit() blocks for up to
+    'block_timeout' seconds and then drops the document (counted in 'dropped').
+    """
+
+    def __init__(
+        self,
+        storage,
+        max_queue: int = 1000,
+        batch_size: int = 32,
+        flush_interval: float = 1.0,
+        chunk_size: int = 120,
+        chunk_overlap: int = 16,
+        block_timeout: float = 0.5,
+        embedder=None
+    ):
+        """
+        'chunk_size' and 'chunk_overlap' are in tokens.
+        'flush_interval' is the longest a partial batch waits for more documents.
+        """
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.block_timeout = block_timeout
+        self.embedder = embedder
+        self._chunk_limit: Optional[int] = None
+
+        self._queue: Queue = Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "chunks": 0,
+            "batches": 0,
+            "dropped": 0,
+            "errors": 0,
+            "failed": 0,
+            "write_seconds": 0.0
+        }
+        self._thread = threading.Thread(target=self._run, name="MemoryWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, doc_id: str, text: str, metadata: Optional[Dict] = None) -> bool:
+        """
+        Queue a document for writing. Returns False if it was dropped.
+        """
+        if not text or self._stop_event.is_set():
+            return False
+        try:
+            self._queue.put((doc_id, text, metadata or {}), timeout=self.block_timeout)
+        except Full:
+            self._bump("dropped")
+            logger.warning(f"[MemoryWriter] Queue full; dropped document {doc_id}.")
+            return False
+        self._bump("submitted")
+        return True
+
+    def count_tokens(self, text: str) -> int:
+        if self.embedder is not None:
+            try:
+                return self.embedder.count_tokens(text)
+            except Exception as e:
+                logger.debug(f"[MemoryWriter] Embedding tokenizer unavailable, estimating: {e}")
+        return len(text) // 4 + 1
+
+    def chunk_limit(self) -> int:
+        """
+        chunk_size, capped at what the embedder embeds without truncating.
+        """
+        if self._chunk_limit is not None:
+            return self._chunk_limit
+        limit = self.chunk_size
+        if self.embedder is not None:
+            try:
+                max_input = getattr(self.embedder, "max_input_tokens", None)
+            except Exception as e:
+                # Embedder not loadable yet: use chunk_size for now and ask again next time
+                logger.debug(f"[MemoryWriter] Embedder unavailable for the chunk limit: {e}")
+                return max(1, limit)
+            if max_input:
+                limit = min(limit, max_input)
+        self._chunk_limit = max(1, limit)
+        return self._chunk_limit
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Split 'text' into chunks of at most chunk_limit() tokens, preferring
+        to break on whitespace, with about chunk_overlap tokens shared between neighbours.
+        """
+        text = text.strip()
+        if not text:
+            return []
+        limit = self.chunk_limit()
+        if self.count_tokens(text) <= limit:
+            return [text]
+        overlap = min(self.chunk_overlap, limit // 2)
+        chunks = []
+        start = 0
+        chars_per_token = 4.0
+        while start < len(text):
+            end, tokens = self._fit(text, start, int(limit * chars_per_token) + 1, limit)
+            chunks.append(text[start:end].strip())
+            if end >= len(text):
+                break
+            chars_per_token = (end - start) / max(tokens, 1)
+            overlap_chars = int(overlap * chars_per_token)
+            next_start = end - overlap_chars if end - overlap_chars > start else end
+            # Begin the overlap on a word boundary
+            space = text.find(" ", next_start, end)
+            start = space + 1 if next_start < end and text[next_start - 1] != " " and space != -1 else next_start
+        return [c for c in chunks if c]
+
+    def _fit(self, text: str, start: int, span: int, limit: int) -> Tuple[int, int]:
+        """
+        End of the longest piece from 'start' (about 'span' chars to begin with)
+        that fits in 'limit' tokens, and its token count.
+        """
+        end = min(start + span, len(text))
+        while True:
+            if end < len(text):
+                split = text.rfind(" ", start + 1, end + 1)
+                if split > start:
+                    end = split
+            tokens = self.count_tokens(text[start:end])
+            if tokens <= limit or end - start <= 1:
+                return end, tokens
+            # Shrink in proportion to the overshoot, with a little slack for the next recount
+            end = start + max(1, int((end - start) * limit / tokens * 0.9))
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop_event.is_set():
+                    remaining = 0
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining else self._queue.get_nowait())
+                except Empty:
+                    break
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        doc_ids, texts, metadatas = [], [], []
+        for doc_id, text, metadata in batch:
+            chunks = self.chunk(text)
+            for i, chunk in enumerate(chunks):
+                doc_ids.append(doc_id if len(chunks) == 1 else f"{doc_id}#{i}")
+                texts.append(chunk)
+                metadatas.append({**metadata, "source_id": doc_id, "chunk": i})
+        if not doc_ids:
+            return
+
+        start = time.perf_counter()
+        try:
+            self.storage.store_many(doc_ids, texts, metadatas)
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["errors"] += 1
+                self._stats["failed"] += len(batch)
+            logger.error(f"[MemoryWriter] Error writing batch of {len(batch)}: {e}", exc_info=True)
+            return
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._stats["written"] += len(batch)
+            self._stats["chunks"] += len(doc_ids)
+            self._stats["batches"] += 1
+            self._stats["write_seconds"] += elapsed
+        logger.debug(f"[MemoryWriter] Wrote {len(batch)} docs ({len(doc_ids)} chunks) in {elapsed:.3f}s.")
+
+    def _bump(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def flush(self):
+        """
+        Block until everything submitted so far has been written.
+        """
+        self._queue.join()
+
+    def stop(self):
+        """
+        Stop accepting documents and write what is still queued before returning.
+        """
+        self._stop_event.set()
+        self._thread.join()
+        logger.info(f"[MemoryWriter] Stopped. Stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
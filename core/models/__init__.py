@@ -1,5 +1,8 @@
 # core/models/__init__.py
 from core.models.llm import LlamaInterface
 from core.models.prompts import PromptTemplates
+from core.models.context import ContextBuilder
+from core.models.embedding_cache import EmbeddingCache, CachedEmbeddingInterface
+from core.models.inference_server import InferencePool, ProcessLlamaInterface, ProcessEmbeddingInterface
 
-__all__ = ['LlamaInterface', 'PromptTemplates']
+__all__ = ['LlamaInterface', 'PromptTemplates', 'ContextBuilder', 'EmbeddingCache', 'CachedEmbeddingInterface', 'InferencePool', 'ProcessLlamaInterface', 'ProcessEmbeddingInterface']
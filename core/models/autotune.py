@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BENCH_PROMPT = (
+    "The agent reads the task description, gathers context from memory, "
+    "and writes a short, precise answer. "
+)
+# Embedding inputs stay this many tokens under the smallest n_batch, leaving
+# room for special tokens and re-tokenization drift so no candidate truncates
+EMBED_HEADROOM = 8
+EMBED_TEXTS = 8
+
+_cache_lock = threading.Lock()
+
+
+def physical_core_count() -> int:
+    """
+    Physical cores if psutil can tell, otherwise logical cores.
+    llama.cpp generally runs best with one thread per physical core.
+    """
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+        if cores:
+            return cores
+    except Exception:
+        pass
+    return os.cpu_count() or 1
+
+
+def thread_candidates(cores: int) -> List[int]:
+    candidates = {max(1, cores // 4), max(1, cores // 2), max(1, (3 * cores) // 4), cores}
+    return sorted(candidates)
+
+
+def batch_candidates(n_ctx: int, embedding: bool = False) -> List[int]:
+    sizes = [64, 128, 256] if embedding else [128, 256, 512, 1024]
+    return [size for size in sizes if size <= n_ctx] or [n_ctx]
+
+
+def cores_per_process(processes: int = 1) -> int:
+    """
+    Physical cores available to each of 'processes' model processes running at once.
+    """
+    return max(1, physical_core_count() // max(1, processes))
+
+
+def settings_key(model_path: str, embedding: bool = False, processes: int = 1) -> str:
+    """
+    One entry per (model file, mode, process count, host). Size and mtime are
+    part of the key so a replaced model file gets re-tuned.
+    """
+    stat = os.stat(model_path)
+    mode = "embed" if embedding else "generate"
+    if processes > 1:
+        mode += f"/{processes}"
+    return f"{os.path.basename(model_path)}:{stat.st_size}:{int(stat.st_mtime)}:{mode}@{socket.gethostname()}"
+
+
+def benchmark_settings(
+    model_path: str,
+    n_ctx: int,
+    n_threads: int,
+    n_batch: int,
+    embedding: bool = False,
+    gen_tokens: int = 16,
+    prompt_tokens: int = 512
+) -> float:
+    """
+    Load the model with the given settings and time a 'prompt_tokens' prompt
+    eval plus generation, or EMBED_TEXTS embeddings of 'prompt_tokens' each.
+    Callers keep 'prompt_tokens' the same for every candidate so each does the
+    same work. Returns elapsed seconds; lower is better.
+    """
+    from llama_cpp import Llama
+
+    llm = Llama(
+        model_path=model_path,
+        n_ctx=n_ctx,
+        n_threads=n_threads,
+        n_batch=n_batch,
+        embedding=embedding,
+        verbose=False
+    )
+    try:
+        unit = llm.tokenize(BENCH_PROMPT.encode("utf-8"), add_bos=False)
+        count = min(prompt_tokens, n_ctx - gen_tokens - 1)
+        tokens = (unit * (count // len(unit) + 1))[:max(1, count)]
+        text = llm.detokenize(tokens).decode("utf-8", errors="ignore")
+        start = time.perf_counter()
+        if embedding:
+            for _ in range(EMBED_TEXTS):
+                llm.embed(text)
+        else:
+            llm(text, max_tokens=gen_tokens, temperature=0.0)
+        return time.perf_counter() - start
+    finally:
+        del llm
+
+
+def _load_cache(cache_path: str) -> Dict:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[Autotune] Ignoring unreadable cache {cache_path}: {e}")
+        return {}
+
+
+def _save_cache(cache_path: str, cache: Dict):
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def autotune(
+    model_path: str,
+    n_ctx: int,
+    cache_path: str,
+    embedding: bool = False,
+    force: bool = False,
+    processes: int = 1
+) -> Optional[Dict]:
+    """
+    Return {"n_threads": ..., "n_batch": ...} for this model on this host,
+    for one of 'processes' model processes sharing the cores (worker_pool
+    mode), so thread counts are tuned within cpu_count // processes.
+
+    A cached result is reused unless 'force' is set. Otherwise threads are tuned
+    first with a mid-sized batch, then the batch size with the best thread count,
+    which keeps the number of model loads small. Returns None if the model is
+    missing or every benchmark failed, so callers can keep their defaults.
+    """
+    if not os.path.exists(model_path):
+        logger.warning(f"[Autotune] Model not found at {model_path}; skipping.")
+        return None
+
+    key = settings_key(model_path, embedding, processes)
+    with _cache_lock:
+        cache = _load_cache(cache_path)
+        if key in cache and not force:
+            logger.info(f"[Autotune] Reusing tuned settings for {key}: {cache[key]}")
+            return {"n_threads": cache[key]["n_threads"], "n_batch": cache[key]["n_batch"]}
+
+    cores = cores_per_process(processes)
+    batches = batch_candidates(n_ctx, embedding)
+    if embedding:
+        # embed() truncates at n_batch: inputs must fit the smallest candidate or it does less work
+        prompt_tokens = max(1, min(batches) - EMBED_HEADROOM)
+    else:
+        # Longer than the largest candidate, so larger batches can show their benefit
+        prompt_tokens = 2 * max(batches)
+    results = {}
+
+    def run(threads: int, batch: int) -> float:
+        if (threads, batch) not in results:
+            try:
+                results[(threads, batch)] = benchmark_settings(
+                    model_path, n_ctx, threads, batch, embedding, prompt_tokens=prompt_tokens
+                )
+            except Exception as e:
+                logger.warning(f"[Autotune] n_threads={threads}, n_batch={batch} failed: {e}")
+                results[(threads, batch)] = float("inf")
+            logger.debug(f"[Autotune] n_threads={threads}, n_batch={batch}: {results[(threads, batch)]:.3f}s")
+        return results[(threads, batch)]
+
+    mid_batch = batches[len(batches) // 2]
+    best_threads = min(thread_candidates(cores), key=lambda t: run(t, mid_batch))
+    best_batch = min(batches, key=lambda b: run(best_threads, b))
+    elapsed = results[(best_threads, best_batch)]
+    if elapsed == float("inf"):
+        return None
+
+    best = {"n_threads": best_threads, "n_batch": best_batch}
+    logger.info(f"[Autotune] Best settings for {key} ({cores} physical cores per process): {best}, {elapsed:.3f}s")
+    with _cache_lock:
+        cache = _load_cache(cache_path)
+        cache[key] = {**best, "seconds": elapsed, "physical_cores": cores, "tuned_at": time.time()}
+        _save_cache(cache_path, cache)
+    return best
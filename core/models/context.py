@@ -0,0 +1,160 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+from core.models.prompts import PromptTemplates
+
+logger = logging.getLogger(__name__)
+
+Snippet = Union[str, Dict]
+
+
+class ContextBuilder:
+    """
+    Assembles prompts that are guaranteed to fit the model's context window.
+
+    The budget is n_ctx minus the tokens reserved for the answer (max_tokens)
+    minus the fixed part of the prompt. Memory snippets are packed from most to
+    least relevant until the budget is used up, so the lowest-value ones are the
+    first to be dropped. If the fixed fields alone are too long, fields are
+    truncated (longest first, or in the caller's 'truncate_order') until the
+    prompt fits. Token counts are cached because the same snippets and
+    templates come back on every call.
+    """
+
+    # Slack for tokens merged or split at snippet boundaries
+    SAFETY_MARGIN = 8
+
+    def __init__(self, llm, n_ctx: Optional[int] = None, max_tokens: int = 200, cache_size: int = 4096):
+        self.llm = llm
+        self.n_ctx = n_ctx or getattr(llm, "n_ctx", 2048)
+        self.max_tokens = max_tokens
+        self.cache_size = cache_size
+        self._token_cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        with self._lock:
+            if text in self._token_cache:
+                self._token_cache.move_to_end(text)
+                return self._token_cache[text]
+
+        try:
+            count = len(self.llm.tokenize(text))
+        except Exception as e:
+            # Rough estimate (~4 chars/token) rather than failing the prompt
+            logger.debug(f"[ContextBuilder] Tokenizer unavailable, estimating: {e}")
+            count = len(text) // 4 + 1
+
+        with self._lock:
+            self._token_cache[text] = count
+            if len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        return count
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut 'text' down to at most 'max_tokens' tokens.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        try:
+            return self.llm.detokenize(self.llm.tokenize(text)[:max_tokens])
+        except Exception:
+            return text[:max_tokens * 4]
+
+    def prompt_budget(self, max_tokens: Optional[int] = None) -> int:
+        reserve = self.max_tokens if max_tokens is None else max_tokens
+        return self.n_ctx - reserve - self.SAFETY_MARGIN
+
+    def available_tokens(self, template: str, max_tokens: Optional[int] = None, **fields) -> int:
+        """
+        Tokens left for the context field once the rest of the prompt is filled in.
+        """
+        base = PromptTemplates.format_prompt(template, **{**fields, "context": ""})
+        return max(0, self.prompt_budget(max_tokens) - self.count_tokens(base))
+
+    def pack_snippets(self, snippets: List[Snippet], budget: int, separator: str = "\n") -> str:
+        """
+        Greedily pack snippets by relevance. Dict snippets are ranked by their
+        'similarity' (or 'score'); plain strings keep their given order.
+        """
+        ranked = []
+        for position, snippet in enumerate(snippets or []):
+            if isinstance(snippet, dict):
+                text = snippet.get("document") or snippet.get("text") or ""
+                score = snippet.get("similarity", snippet.get("score"))
+            else:
+                text, score = snippet, None
+            if text:
+                ranked.append((-(score if score is not None else 0.0), position, text))
+        ranked.sort()
+
+        chosen = []
+        used = 0
+        sep_tokens = self.count_tokens(separator) if separator.strip() else 1
+        for _, position, text in ranked:
+            cost = self.count_tokens(text) + (sep_tokens if chosen else 0)
+            if used + cost > budget:
+                continue
+            chosen.append((position, text))
+            used += cost
+
+        if len(chosen) < len(ranked):
+            logger.debug(f"[ContextBuilder] Packed {len(chosen)}/{len(ranked)} snippets into {budget} tokens.")
+        # Keep the original (retrieval) order in the prompt
+        return separator.join(text for _, text in sorted(chosen))
+
+    def build(
+        self,
+        template: str,
+        snippets: Optional[List[Snippet]] = None,
+        max_tokens: Optional[int] = None,
+        truncate_order: Optional[List[str]] = None,
+        **fields
+    ) -> str:
+        """
+        Format 'template' so that prompt + max_tokens fits in n_ctx.
+        A string 'context' field is treated as a single snippet. Raises
+        ValueError if the template alone, with every field empty, is too long.
+        """
+        fields = {key: ("" if value is None else str(value)) for key, value in fields.items()}
+        snippets = list(snippets or [])
+        if fields.get("context"):
+            snippets.insert(0, fields["context"])
+        fields["context"] = ""
+
+        budget = self.prompt_budget(max_tokens)
+        overflow = self.count_tokens(PromptTemplates.format_prompt(template, **fields)) - budget
+        if overflow > 0:
+            longest_first = sorted(
+                (key for key in fields if key != "context"), key=lambda k: self.count_tokens(fields[k]), reverse=True
+            )
+            order = [key for key in (truncate_order or []) if key in fields]
+            order += [key for key in longest_first if key not in order]
+            for key in order:
+                if overflow <= 0:
+                    break
+                if not fields.get(key):
+                    continue
+                logger.warning(f"[ContextBuilder] Prompt over budget by {overflow} tokens; truncating '{key}'.")
+                fields[key] = self.truncate(fields[key], self.count_tokens(fields[key]) - overflow)
+                overflow = self.count_tokens(PromptTemplates.format_prompt(template, **fields)) - budget
+            if overflow > 0:
+                empty = {key: "" for key in fields}
+                if self.count_tokens(PromptTemplates.format_prompt(template, **empty)) > budget:
+                    raise ValueError(f"Prompt template alone exceeds the {budget}-token budget.")
+                # Token boundaries can leave a few tokens over; drop the remaining fields outright
+                for key in order:
+                    if overflow <= 0:
+                        break
+                    fields[key] = ""
+                    overflow = self.count_tokens(PromptTemplates.format_prompt(template, **fields)) - budget
+
+        fields["context"] = self.pack_snippets(snippets, self.available_tokens(template, max_tokens, **fields))
+        return PromptTemplates.format_prompt(template, **fields)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from core.memory.similarity import as_vector
+from core.models.embedding_minilm import EmbeddingError
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 20  # sha1
+
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by sha1(model id + normalized text).
+
+    Two tiers:
+      * a bounded in-memory LRU of vectors
+      * an append-only on-disk store: 'vectors.f32' holds float32 rows and
+        'index.bin' holds the 20-byte digest of each row, in the same order.
+
+    The vector file is memory-mapped read-only, so lookups return views into
+    the page cache instead of copies. Only one process should use a directory.
+    Rows are written before their index entry, so a crash leaves at most an
+    orphan row that is ignored on the next load. Appends are fsynced at most
+    every 'sync_interval' seconds and on close(), not on every miss batch.
+    All-zero or non-finite vectors are never cached; a row that reads back
+    that way (lost in a crash) is a miss and is rewritten by the next put.
+    """
+
+    def __init__(self, cache_dir: str, model_id: str, max_memory_items: int = 4096, sync_interval: float = 5.0):
+        self.model_id = model_id
+        self.sync_interval = sync_interval
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+        self.max_memory_items = max_memory_items
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_id)
+        self.path = os.path.join(cache_dir, safe_name)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._index_path = os.path.join(self.path, "index.bin")
+        self._meta_path = os.path.join(self.path, "meta.json")
+
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._rows: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._mmap: Optional[np.ndarray] = None
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_id}\0{self.normalize(text)}".encode("utf-8")).digest()
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, 'r', encoding='utf-8') as f:
+            self.dim = json.load(f)["dim"]
+        self._read_index()
+        logger.info(f"[EmbeddingCache] Loaded {len(self._rows)} cached embeddings from {self.path}")
+
+    def _read_index(self):
+        if self.dim is None or not os.path.exists(self._index_path):
+            return
+        with self._lock:
+            with open(self._index_path, 'rb') as f:
+                f.seek(self._index_offset)
+                data = f.read()
+            usable = len(data) - len(data) % DIGEST_SIZE
+            first_row = self._index_offset // DIGEST_SIZE
+            # A digest rewritten after a bad row appears again later; the last row wins
+            for i in range(usable // DIGEST_SIZE):
+                self._rows[data[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]] = first_row + i
+            self._index_offset += usable
+            self._remap()
+
+    def _remap(self):
+        row_bytes = self.dim * 4
+        available = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        rows = min(available, self._index_offset // DIGEST_SIZE)
+        if rows == 0:
+            self._mmap = None
+            return
+        self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+
+    def _lru_put(self, digest: bytes, vector: np.ndarray):
+        self._lru[digest] = vector
+        self._lru.move_to_end(digest)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def _get_locked(self, digest: bytes) -> Optional[np.ndarray]:
+        vector = self._lru.get(digest)
+        if vector is not None:
+            self._lru.move_to_end(digest)
+            self.hits += 1
+            return vector
+        row = self._rows.get(digest)
+        if row is not None:
+            if self._mmap is None or row >= self._mmap.shape[0]:
+                self._remap()
+            if self._mmap is not None and row < self._mmap.shape[0]:
+                vector = np.asarray(self._mmap[row])  # plain ndarray view, no copy
+                # A row lost to a crash before its fsync reads back as zeros: treat it as a miss
+                if self.is_valid(vector):
+                    self._lru_put(digest, vector)
+                    self.disk_hits += 1
+                    return vector
+        self.misses += 1
+        return None
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        digest = self.key(text)
+        with self._lock:
+            return self._get_locked(digest)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        digests = [self.key(text) for text in texts]
+        with self._lock:
+            return [self._get_locked(digest) for digest in digests]
+
+    @staticmethod
+    def is_valid(vector: np.ndarray) -> bool:
+        return vector.size > 0 and bool(np.isfinite(vector).all()) and bool(np.any(vector))
+
+    def put(self, text: str, vector) -> None:
+        self.put_many([text], [vector])
+
+    def put_many(self, texts: Sequence[str], vectors) -> None:
+        with self._lock:
+            new_rows = []
+            pending = set()
+            for text, vector in zip(texts, vectors):
+                vector = as_vector(vector)
+                if not self.is_valid(vector):
+                    if vector.size:
+                        logger.warning("[EmbeddingCache] Not caching an all-zero or non-finite embedding.")
+                    continue
+                if self.dim is None:
+                    self.dim = vector.size
+                    with open(self._meta_path, 'w', encoding='utf-8') as f:
+                        json.dump({"model_id": self.model_id, "dim": self.dim}, f)
+                if vector.size != self.dim:
+                    logger.warning(f"[EmbeddingCache] Skipping vector of dim {vector.size} (expected {self.dim}).")
+                    continue
+                digest = self.key(text)
+                # Cached arrays are shared with every caller; make accidental mutation an error
+                vector = vector.copy() if vector.flags.writeable else vector
+                vector.flags.writeable = False
+                self._lru_put(digest, vector)
+                if digest not in pending and (digest not in self._rows or not self._row_valid(digest)):
+                    pending.add(digest)
+                    new_rows.append((digest, vector))
+
+            if new_rows:
+                self._append(new_rows)
+
+    def _row_valid(self, digest: bytes) -> bool:
+        """
+        Whether the stored row of 'digest' reads back as a usable vector.
+        """
+        row = self._rows[digest]
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            self._remap()
+        return self._mmap is not None and row < self._mmap.shape[0] and self.is_valid(np.asarray(self._mmap[row]))
+
+    def _append(self, new_rows: List):
+        first_row = self._index_offset // DIGEST_SIZE
+        with open(self._vectors_path, 'ab') as f:
+            # Keep rows aligned with the index even if a previous write was torn
+            f.truncate(first_row * self.dim * 4)
+            f.write(b"".join(vector.tobytes() for _, vector in new_rows))
+        with open(self._index_path, 'ab') as f:
+            f.truncate(self._index_offset)
+            f.write(b"".join(digest for digest, _ in new_rows))
+        for i, (digest, _) in enumerate(new_rows):
+            self._rows[digest] = first_row + i
+        self._index_offset += len(new_rows) * DIGEST_SIZE
+        self._unsynced = True
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        # Vectors first, so a synced index entry never points at an unsynced row
+        for path in (self._vectors_path, self._index_path):
+            if os.path.exists(path):
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            if self._unsynced:
+                self._sync_locked()
+
+    def close(self):
+        self.sync()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "memory_items": len(self._lru),
+                "disk_items": self._index_offset // DIGEST_SIZE,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+
+class CachedEmbeddingInterface:
+    """
+    Wraps any embedder (MiniLMInterface or the worker-pool proxy) with an
+    EmbeddingCache, so repeated texts never reach the model. get_embeddings()
+    raises EmbeddingError rather than returning empty or zero rows.
+    """
+
+    def __init__(self, embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+
+    @property
+    def max_input_tokens(self) -> Optional[int]:
+        return getattr(self.embedder, "max_input_tokens", None)
+
+    def count_tokens(self, text: str) -> int:
+        return self.embedder.count_tokens(text)
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        embedding = as_vector(self.embedder.get_embedding(text))
+        if self.cache.is_valid(embedding):
+            self.cache.put(text, embedding)
+        return embedding
+
+    def get_embeddings(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        cached = self.cache.get_many(texts)
+        # Embed each distinct missing text once
+        missing = list(dict.fromkeys(texts[i] for i, vector in enumerate(cached) if vector is None))
+        if missing:
+            if hasattr(self.embedder, "get_embeddings"):
+                computed = self.embedder.get_embeddings(missing)
+            else:
+                computed = [self.embedder.get_embedding(text) for text in missing]
+            self.cache.put_many(missing, computed)
+            by_text = {text: as_vector(vector) for text, vector in zip(missing, computed)}
+            cached = [by_text[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        dim = max(vector.size for vector in cached)
+        failed = [i for i, vector in enumerate(cached) if vector.size != dim or not self.cache.is_valid(vector)]
+        if failed:
+            raise EmbeddingError(f"Could not embed {len(failed)} of {len(texts)} texts", failed)
+        return np.stack(cached)
+
+    def close(self):
+        self.cache.close()
@@ -1,10 +1,19 @@
 import logging
 import os
-from llama_cpp import Llama
-from typing import List
+import numpy as np
+from typing import Sequence
+from core.memory.similarity import EMPTY_VECTOR, as_matrix, as_vector, l2_normalize
 
 logger = logging.getLogger(__name__)
 
+class EmbeddingError(RuntimeError):
+    """
+    Raised when some texts of a batch could not be embedded; 'failed' holds their indexes.
+    """
+    def __init__(self, message: str, failed=None):
+        super().__init__(message)
+        self.failed = list(failed or [])
+
 class MiniLMInterface:
     """
     A specialized embedding interface that uses a smaller .gguf model
@@ -25,6 +34,8 @@ class MiniLMInterface:
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"MiniLM model not found at {self.model_path}")
 
+        from llama_cpp import Llama
+
         logger.info(f"[MiniLMInterface] Loading embedding model from {self.model_path} with n_ctx={self.n_ctx}")
         # llama.cpp can run "embedding=True" for certain specialized smaller models
         self.emb_llm = Llama(
@@ -35,16 +46,52 @@ class MiniLMInterface:
             embedding=True,  # Important: We enable embedding mode here
         )
 
-    def get_embedding(self, text: str) -> List[float]:
+    @property
+    def max_input_tokens(self) -> int:
+        # Longer inputs are truncated by get_embeddings()
+        return min(self.n_batch, self.n_ctx)
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Tokens the embedding model sees for 'text', including its special tokens.
+        """
+        return len(self.emb_llm.tokenize(text.encode("utf-8")))
+
+    def get_embedding(self, text: str) -> np.ndarray:
         """
         Generate an embedding for the given text using the miniLM .gguf model.
         Typically, the dimension is 384 if the model is truly a miniLM-l6-v2 variant.
+        Returns an L2-normalized float32 vector (empty on failure).
         """
         try:
-            # The llama-cpp embedding call returns a list of floats
-            emb_result = self.emb_llm.embed(text)
-            logger.debug(f"[MiniLMInterface] Embedding for '{text[:30]}...' => dim={len(emb_result)}")
+            emb_result = l2_normalize(as_vector(self.emb_llm.embed(text)))
+            logger.debug(f"[MiniLMInterface] Embedding for '{text[:30]}...' => dim={emb_result.shape[0]}")
             return emb_result  # This should be ~384 floats
         except Exception as e:
             logger.exception(f"[MiniLMInterface] Error generating embedding: {e}")
-            return []
+            return EMPTY_VECTOR
+
+    def get_embeddings(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed many texts at once. llama.cpp packs the inputs as separate sequences
+        into batches of up to n_batch tokens, so the per-call overhead is paid once
+        per batch instead of once per text. Returns a (len(texts), dim) float32 matrix
+        of L2-normalized rows. Raises EmbeddingError if any text cannot be embedded;
+        a failed row is never returned as zeros.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        try:
+            # truncate=True: an input longer than n_batch is cut instead of failing the whole batch
+            matrix = l2_normalize(as_matrix(self.emb_llm.embed(texts, truncate=True)))
+            logger.debug(f"[MiniLMInterface] Batched {len(texts)} embeddings => shape={matrix.shape}")
+            return matrix
+        except Exception as e:
+            logger.warning(f"[MiniLMInterface] Batched embedding failed ({e}); falling back to one call per text.")
+            rows = [self.get_embedding(text) for text in texts]
+            dim = max(row.shape[0] for row in rows)
+            failed = [i for i, row in enumerate(rows) if row.shape[0] == 0 or row.shape[0] != dim]
+            if failed:
+                raise EmbeddingError(f"Could not embed {len(failed)} of {len(texts)} texts", failed)
+            return np.stack(rows)
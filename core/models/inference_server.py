@@ -0,0 +1,322 @@
+import logging
+import multiprocessing as mp
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from queue import Empty
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from core.memory.similarity import EMPTY_VECTOR
+
+logger = logging.getLogger(__name__)
+
+# Request ops understood by the worker processes
+OP_GENERATE = "generate"
+OP_EMBED = "embed"          # MiniLM embedding model
+OP_EMBED_MANY = "embed_many"
+OP_LLM_EMBED = "llm_embed"  # Llama embedding model
+OP_TOKENIZE = "tokenize"
+OP_EMBED_COUNT_TOKENS = "embed_count_tokens"  # MiniLM tokenizer
+OP_DETOKENIZE = "detokenize"
+OP_STOP = "stop"
+
+# Arrays smaller than this are pickled with the response; creating and
+# unlinking a shared-memory block costs more than copying a single embedding
+SHM_MIN_BYTES = 64 * 1024
+
+
+def _array_to_shm(matrix: np.ndarray) -> tuple:
+    """
+    Copy a float32 vector or matrix into a fresh shared-memory block and return
+    (name, shape). The parent process copies it out and unlinks the block.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        np.ndarray(matrix.shape, dtype=np.float32, buffer=shm.buf)[...] = matrix
+        return shm.name, matrix.shape
+    finally:
+        shm.close()
+
+
+def _array_reply(matrix: np.ndarray) -> tuple:
+    """
+    (kind, value) response payload for an array: shared memory for large ones.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.nbytes >= SHM_MIN_BYTES:
+        return "shm", _array_to_shm(matrix)
+    return "value", matrix
+
+
+def _array_from_shm(name: str, shape: tuple) -> np.ndarray:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _worker_main(worker_id: int, requests, responses, llm_kwargs: Dict, embedding_kwargs: Optional[Dict]):
+    """
+    Entry point of a model worker process. Loads the models once, then serves
+    requests until told to stop. Must stay module-level so 'spawn' can pickle it.
+    """
+    from core.models.llm import LlamaInterface
+    from core.models.embedding_minilm import MiniLMInterface
+
+    llm = LlamaInterface(**llm_kwargs)
+    embedder = MiniLMInterface(**embedding_kwargs) if embedding_kwargs else None
+    logger.info(f"[InferenceWorker-{worker_id}] Ready.")
+
+    while True:
+        request_id, op, args = requests.get()
+        if op == OP_STOP:
+            break
+        try:
+            if op == OP_GENERATE:
+                responses.put((request_id, True, "value", llm.generate(**args)))
+            elif op == OP_TOKENIZE:
+                responses.put((request_id, True, "value", llm.tokenize(args["text"])))
+            elif op == OP_DETOKENIZE:
+                responses.put((request_id, True, "value", llm.detokenize(args["tokens"])))
+            elif op == OP_EMBED_COUNT_TOKENS:
+                if embedder is None:
+                    raise RuntimeError("No embedding model loaded in worker")
+                responses.put((request_id, True, "value", embedder.count_tokens(args["text"])))
+            elif op == OP_EMBED_MANY:
+                if embedder is None:
+                    raise RuntimeError("No embedding model loaded in worker")
+                responses.put((request_id, True) + _array_reply(embedder.get_embeddings(args["texts"])))
+            elif op in (OP_EMBED, OP_LLM_EMBED):
+                model = embedder if op == OP_EMBED else llm
+                if model is None:
+                    raise RuntimeError("No embedding model loaded in worker")
+                responses.put((request_id, True) + _array_reply(model.get_embedding(args["text"])))
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            logger.exception(f"[InferenceWorker-{worker_id}] Request {request_id} failed: {e}")
+            responses.put((request_id, False, "error", repr(e)))
+
+
+class InferencePool:
+    """
+    A pool of model worker processes. Generation and embedding requests are
+    dispatched to the least-loaded worker over a per-worker queue; large
+    embedding batches come back through shared memory instead of being pickled.
+
+    A worker that dies fails its outstanding requests and is respawned, so a
+    llama.cpp crash no longer takes the agent down with it. Liveness is
+    checked every 'health_check_interval' seconds whether or not other
+    workers are responding. Restarts back off exponentially from
+    'restart_backoff' seconds; a worker that dies 'max_restarts' times
+    without serving a request (e.g. a bad model path) is given up on.
+    """
+
+    def __init__(self, llm_kwargs: Dict, embedding_kwargs: Optional[Dict] = None, num_workers: int = 2,
+                 health_check_interval: float = 1.0, max_restarts: int = 5, restart_backoff: float = 1.0):
+        self.llm_kwargs = llm_kwargs
+        self.embedding_kwargs = embedding_kwargs
+        self.num_workers = max(1, num_workers)
+        self.health_check_interval = health_check_interval
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        # spawn: never fork a process that already runs broker/UI threads
+        self._ctx = mp.get_context("spawn")
+        self._responses = self._ctx.Queue()
+        self._workers: List[Dict] = []
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._running = True
+
+        for worker_id in range(self.num_workers):
+            self._workers.append(self._spawn_worker(worker_id))
+
+        self._collector = threading.Thread(target=self._collect_loop, daemon=True)
+        self._collector.start()
+        logger.info(f"[InferencePool] Started {self.num_workers} worker process(es).")
+
+    def _spawn_worker(self, worker_id: int, restarts: int = 0) -> Dict:
+        # A fresh queue: one shared with a process that died mid-read may be left locked
+        requests = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, requests, self._responses, self.llm_kwargs, self.embedding_kwargs),
+            daemon=True
+        )
+        proc.start()
+        return {
+            "id": worker_id,
+            "process": proc,
+            "requests": requests,
+            "outstanding": set(),
+            "restarts": restarts,
+            "restart_at": None,
+            "failed": False
+        }
+
+    def submit(self, op: str, **args) -> Future:
+        future: Future = Future()
+        request_id = str(uuid.uuid4())
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("InferencePool is stopped")
+            available = [w for w in self._workers if not w["failed"] and w["restart_at"] is None]
+            if not available:
+                raise RuntimeError("No inference worker is running")
+            worker = min(available, key=lambda w: len(w["outstanding"]))
+            worker["outstanding"].add(request_id)
+            self._pending[request_id] = future
+        worker["requests"].put((request_id, op, args))
+        return future
+
+    def _collect_loop(self):
+        next_check = time.monotonic() + self.health_check_interval
+        while self._running:
+            # On a schedule, not only when idle: a busy queue must not hide a dead worker
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + self.health_check_interval
+            try:
+                request_id, ok, kind, value = self._responses.get(
+                    timeout=max(0.0, next_check - time.monotonic())
+                )
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+                for worker in self._workers:
+                    if request_id in worker["outstanding"]:
+                        worker["outstanding"].discard(request_id)
+                        # It served a request, so it started fine: later crashes restart promptly
+                        worker["restarts"] = 0
+
+            try:
+                if kind == "shm":
+                    value = _array_from_shm(*value)
+            except Exception as e:
+                ok, value = False, repr(e)
+
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _check_workers(self):
+        now = time.monotonic()
+        with self._lock:
+            for index, worker in enumerate(self._workers):
+                if worker["failed"] or not self._running:
+                    continue
+                if worker["restart_at"] is None:
+                    if worker["process"].is_alive():
+                        continue
+                    for request_id in worker["outstanding"]:
+                        future = self._pending.pop(request_id, None)
+                        if future:
+                            future.set_exception(RuntimeError("Inference worker crashed"))
+                    worker["outstanding"].clear()
+                    if worker["restarts"] >= self.max_restarts:
+                        worker["failed"] = True
+                        logger.error(
+                            f"[InferencePool] Worker {worker['id']} exited with code {worker['process'].exitcode} "
+                            f"after {worker['restarts']} restarts; giving up on it."
+                        )
+                        continue
+                    delay = min(self.restart_backoff * 2 ** worker["restarts"], 60.0)
+                    worker["restart_at"] = now + delay
+                    logger.error(
+                        f"[InferencePool] Worker {worker['id']} exited with code "
+                        f"{worker['process'].exitcode}; respawning in {delay:.1f}s."
+                    )
+                if now >= worker["restart_at"]:
+                    self._workers[index] = self._spawn_worker(worker["id"], worker["restarts"] + 1)
+
+    def stop(self, timeout: float = 5.0):
+        logger.info("[InferencePool] Stopping workers...")
+        with self._lock:
+            self._running = False
+            workers = list(self._workers)
+            for future in self._pending.values():
+                future.set_exception(RuntimeError("InferencePool stopped"))
+            self._pending.clear()
+        for worker in workers:
+            worker["requests"].put((None, OP_STOP, {}))
+        for worker in workers:
+            worker["process"].join(timeout)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        self._collector.join(timeout)
+
+
+class ProcessLlamaInterface:
+    """
+    Drop-in replacement for LlamaInterface that forwards calls to an InferencePool.
+    Errors are logged and mapped to the same empty results LlamaInterface returns.
+    """
+
+    def __init__(self, pool: InferencePool, timeout: Optional[float] = 300.0):
+        """
+        'timeout' bounds each call, so a hung (but alive) worker cannot block the caller forever.
+        """
+        self.pool = pool
+        self.timeout = timeout
+        self.n_ctx = pool.llm_kwargs.get("n_ctx", 2048)
+
+    def generate(self, prompt: str, max_tokens: int = 200, **kwargs) -> str:
+        try:
+            return self.pool.submit(OP_GENERATE, prompt=prompt, max_tokens=max_tokens, **kwargs).result(self.timeout)
+        except Exception as e:
+            logger.error(f"[ProcessLlamaInterface] Generation failed: {e}")
+            return ""
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.pool.submit(OP_TOKENIZE, text=text).result(self.timeout)
+
+    def detokenize(self, tokens: List[int]) -> str:
+        return self.pool.submit(OP_DETOKENIZE, tokens=list(tokens)).result(self.timeout)
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        try:
+            return self.pool.submit(OP_LLM_EMBED, text=text).result(self.timeout)
+        except Exception as e:
+            logger.error(f"[ProcessLlamaInterface] Embedding failed: {e}")
+            return EMPTY_VECTOR
+
+
+class ProcessEmbeddingInterface:
+    """
+    Drop-in replacement for MiniLMInterface backed by an InferencePool.
+    """
+
+    def __init__(self, pool: InferencePool, timeout: Optional[float] = 60.0):
+        self.pool = pool
+        self.timeout = timeout
+        kwargs = pool.embedding_kwargs or {}
+        self.max_input_tokens = min(kwargs.get("n_batch", 128), kwargs.get("n_ctx", 512))
+
+    def count_tokens(self, text: str) -> int:
+        return self.pool.submit(OP_EMBED_COUNT_TOKENS, text=text).result(self.timeout)
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        try:
+            return self.pool.submit(OP_EMBED, text=text).result(self.timeout)
+        except Exception as e:
+            logger.error(f"[ProcessEmbeddingInterface] Embedding failed: {e}")
+            return EMPTY_VECTOR
+
+    def get_embeddings(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.pool.submit(OP_EMBED_MANY, texts=texts).result(self.timeout)
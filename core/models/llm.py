@@ -1,41 +1,140 @@
 import logging
-from typing import List, Union
-from llama_cpp import Llama
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from core.memory.similarity import EMPTY_VECTOR, as_vector, l2_normalize
 
 logger = logging.getLogger(__name__)
 
 class LlamaInterface:
-    def __init__(self, model_path: str, n_ctx: int = 2048):
+    def __init__(
+        self,
+        model_path: str,
+        n_ctx: int = 2048,
+        n_threads: int = 8,
+        n_batch: int = 512,
+        speculative: Optional[str] = None,
+        draft_model_path: Optional[str] = None,
+        num_pred_tokens: int = 10
+    ):
         self.model_path = model_path
         self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self.n_batch = n_batch
+        # Default speculative decoding mode: None, "prompt_lookup" or "draft"
+        self.speculative = speculative
+        self.draft_model_path = draft_model_path
+        self.num_pred_tokens = num_pred_tokens
+        self._draft_models: Dict = {}
+        self._grammars: Dict = {}
+        self._embedding_model = None
+        # llama.cpp contexts are not thread-safe, and draft models are swapped per call
+        self._generate_lock = threading.Lock()
         self._init_models()
 
     def _init_models(self):
-        logger.info(f"[LlamaInterface] Loading model from {self.model_path} with n_ctx={self.n_ctx}")
-        self.llm = Llama(
-            model_path=self.model_path,
-            n_ctx=self.n_ctx,
-            n_threads=8,
-            n_batch=512
+        # llama_cpp is imported here so importing this module stays cheap
+        from llama_cpp import Llama
+
+        logger.info(
+            f"[LlamaInterface] Loading model from {self.model_path} with n_ctx={self.n_ctx}, "
+            f"n_threads={self.n_threads}, n_batch={self.n_batch}"
         )
-        self.embedding_model = Llama(
+        # Verifying drafted tokens reads the logits of every position, which llama.cpp
+        # only keeps when the context is created with logits_all (implied by draft_model).
+        # The draft model itself is attached per call in generate(). The cost is an
+        # n_ctx x n_vocab float32 logits buffer (~1 GB for a 128k vocab at n_ctx=2048)
+        # and logits for every prompt token, so it is only enabled with speculation.
+        self.speculation_enabled = bool(self.speculative or self.draft_model_path)
+        self.llm = Llama(
             model_path=self.model_path,
             n_ctx=self.n_ctx,
-            n_threads=8,
-            embedding=True
+            n_threads=self.n_threads,
+            n_batch=self.n_batch,
+            logits_all=self.speculation_enabled
         )
 
-    def generate(self, prompt: str, max_tokens: int = 200) -> str:
-        try:
-            response = self.llm(
-                prompt,
-                max_tokens=max_tokens,
-                temperature=0.1,
-                top_p=0.95,
-                top_k=40,
-                repeat_penalty=1.1,
-                stop=["Human:", "Assistant:"]
+    @property
+    def embedding_model(self):
+        """
+        Second model instance in embedding mode, loaded on first get_embedding().
+        Most setups embed with MiniLM instead, so this is usually never paid for.
+        """
+        if self._embedding_model is None:
+            from llama_cpp import Llama
+            with self._generate_lock:
+                if self._embedding_model is None:
+                    self._embedding_model = Llama(
+                        model_path=self.model_path,
+                        n_ctx=self.n_ctx,
+                        n_threads=self.n_threads,
+                        embedding=True
+                    )
+        return self._embedding_model
+
+    def _get_draft_model(self, mode: str):
+        if mode not in self._draft_models:
+            from core.models.speculative import create_draft_model
+            self._draft_models[mode] = create_draft_model(
+                mode,
+                num_pred_tokens=self.num_pred_tokens,
+                draft_model_path=self.draft_model_path,
+                n_ctx=self.n_ctx
+            )
+        return self._draft_models[mode]
+
+    def _get_grammar(self, grammar: str):
+        if grammar not in self._grammars:
+            from llama_cpp import LlamaGrammar
+            self._grammars[grammar] = LlamaGrammar.from_string(grammar, verbose=False)
+        return self._grammars[grammar]
+
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 200,
+        speculative: Optional[str] = None,
+        grammar: Optional[str] = None,
+        temperature: float = 0.1
+    ) -> str:
+        """
+        'speculative' overrides the instance default for this call; pass "off" to disable.
+        Drafted tokens are verified by the main model, so the output is unchanged.
+        Speculation needs a model loaded with speculative or draft_model_path set.
+        'grammar' is a GBNF string that constrains the output; compiled grammars are cached.
+        """
+        mode = speculative or self.speculative
+        if mode == "off":
+            mode = None
+        if mode and not self.speculation_enabled:
+            logger.warning(
+                f"[LlamaInterface] Speculative mode '{mode}' ignored: the model was loaded without "
+                "logits for every position (set speculative or draft_model_path)."
             )
+            mode = None
+        try:
+            with self._generate_lock:
+                draft = self._get_draft_model(mode) if mode else None
+                if draft:
+                    draft.begin()
+                self.llm.draft_model = draft
+                try:
+                    response = self.llm(
+                        prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        top_p=0.95,
+                        top_k=40,
+                        repeat_penalty=1.1,
+                        stop=["Human:", "Assistant:"],
+                        grammar=self._get_grammar(grammar) if grammar else None
+                    )
+                finally:
+                    self.llm.draft_model = None
+                if draft:
+                    usage = response.get("usage") or {}
+                    draft.finish(usage.get("total_tokens"))
+                    logger.debug(f"[LlamaInterface] Speculative ({mode}) stats: {draft.get_stats()}")
             text_out = response["choices"][0]["text"].strip()
             logger.info(f"[LlamaInterface] Generated text: {text_out}")
             return text_out
@@ -43,30 +142,30 @@ class LlamaInterface:
             logger.exception(f"[LlamaInterface] Error in LLM generation: {e}")
             return ""
 
-    def get_embedding(self, text: str) -> List[float]:
-        try:
-            raw_embed = self.embedding_model.embed(text)
-            emb = self._really_flatten_embedding(raw_embed)
-            logger.debug(f"[LlamaInterface] Generated embedding of length {len(emb)}.")
-            return emb
-        except Exception as e:
-            logger.exception(f"[LlamaInterface] Error getting embedding: {e}")
-            return []
+    def get_speculative_stats(self) -> Dict:
+        """
+        Drafted/accepted token counts per speculative mode used so far.
+        """
+        return {mode: draft.get_stats() for mode, draft in self._draft_models.items()}
 
-    def _really_flatten_embedding(self, emb: Union[float, List]) -> List[float]:
+    def tokenize(self, text: str) -> List[int]:
         """
-        Flatten any nested list elements into one 1D list of floats.
+        Tokenize with the generation model's tokenizer (no BOS token).
         """
-        flattened = []
-        stack = [emb]  # iterative approach to flatten
+        return self.llm.tokenize(text.encode("utf-8"), add_bos=False)
 
-        while stack:
-            current = stack.pop()
-            if isinstance(current, list):
-                stack.extend(current)
-            else:
-                # must be numeric or castable to float
-                flattened.append(float(current))
+    def detokenize(self, tokens: List[int]) -> str:
+        return self.llm.detokenize(tokens).decode("utf-8", errors="ignore")
 
-        flattened.reverse()  # because we used pop from the end
-        return flattened
+    def get_embedding(self, text: str) -> np.ndarray:
+        """
+        L2-normalized float32 embedding. Nested (per-token) output is flattened
+        in one vectorized reshape.
+        """
+        try:
+            emb = l2_normalize(as_vector(self.embedding_model.embed(text)))
+            logger.debug(f"[LlamaInterface] Generated embedding of length {emb.shape[0]}.")
+            return emb
+        except Exception as e:
+            logger.exception(f"[LlamaInterface] Error getting embedding: {e}")
+            return EMPTY_VECTOR
@@ -0,0 +1,109 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+logger = logging.getLogger(__name__)
+
+MODE_PROMPT_LOOKUP = "prompt_lookup"
+MODE_DRAFT = "draft"
+
+
+class DraftModelDecoding(LlamaDraftModel):
+    """
+    Drafts tokens greedily with a small GGUF model that shares the target's vocabulary.
+    llama.cpp verifies every drafted token against the main model, so output is unchanged.
+    """
+
+    def __init__(self, model_path: str, n_ctx: int = 2048, n_threads: int = 4, num_pred_tokens: int = 8):
+        self.num_pred_tokens = num_pred_tokens
+        logger.info(f"[DraftModelDecoding] Loading draft model from {model_path}")
+        self.draft = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+
+    def __call__(self, input_ids, /, **kwargs):
+        drafted = []
+        # reset=True keeps the KV cache for the common prefix, so only new tokens are evaluated
+        for token in self.draft.generate(input_ids.tolist(), top_k=1, temp=0.0, reset=True):
+            if token == self.draft.token_eos():
+                break
+            drafted.append(token)
+            if len(drafted) >= self.num_pred_tokens:
+                break
+        return np.array(drafted, dtype=np.intc)
+
+
+class TrackedDraftModel(LlamaDraftModel):
+    """
+    Wraps a draft model and estimates how many drafted tokens were accepted.
+
+    llama.cpp calls the draft model once per verification round with the full
+    sequence so far. The sequence grows by (accepted drafts + 1 sampled token)
+    between rounds, which gives the acceptance count without patching llama.cpp.
+    """
+
+    def __init__(self, inner: LlamaDraftModel):
+        self.inner = inner
+        self._lock = threading.Lock()
+        self.generations = 0
+        self.proposed = 0
+        self.accepted = 0
+        self._last_len: Optional[int] = None
+        self._last_proposed = 0
+
+    def begin(self):
+        self._last_len = None
+        self._last_proposed = 0
+
+    def _account(self, new_len: int):
+        if self._last_len is not None and self._last_proposed:
+            accepted = min(max(new_len - self._last_len - 1, 0), self._last_proposed)
+            with self._lock:
+                self.accepted += accepted
+
+    def finish(self, total_tokens: Optional[int]):
+        """
+        Close the last round using the final sequence length (prompt + completion tokens).
+        """
+        if total_tokens is not None:
+            self._account(total_tokens)
+        with self._lock:
+            self.generations += 1
+        self.begin()
+
+    def __call__(self, input_ids, /, **kwargs):
+        self._account(len(input_ids))
+        drafted = self.inner(input_ids, **kwargs)
+        self._last_len = len(input_ids)
+        self._last_proposed = len(drafted)
+        with self._lock:
+            self.proposed += len(drafted)
+        return drafted
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "generations": self.generations,
+                "proposed": self.proposed,
+                "accepted": self.accepted,
+                "acceptance_rate": self.accepted / self.proposed if self.proposed else 0.0
+            }
+
+
+def create_draft_model(
+    mode: str,
+    num_pred_tokens: int = 10,
+    draft_model_path: Optional[str] = None,
+    n_ctx: int = 2048
+) -> TrackedDraftModel:
+    if mode == MODE_PROMPT_LOOKUP:
+        inner = LlamaPromptLookupDecoding(num_pred_tokens=num_pred_tokens)
+    elif mode == MODE_DRAFT:
+        if not draft_model_path:
+            raise ValueError("Speculative mode 'draft' requires a draft_model_path")
+        inner = DraftModelDecoding(draft_model_path, n_ctx=n_ctx, num_pred_tokens=num_pred_tokens)
+    else:
+        raise ValueError(f"Unknown speculative decoding mode: {mode}")
+    return TrackedDraftModel(inner)
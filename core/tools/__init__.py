@@ -1,5 +1,7 @@
 # core/tools/__init__.py
 from core.tools.marketplace import ToolMarketplace
 from core.tools.base_tool import BaseTool
+from core.tools.runtime import ToolRuntime, ToolTimeoutError
+from core.tools.cache import ToolResultCache, file_state_key
 
-__all__ = ['ToolMarketplace', 'BaseTool']
\ No newline at end of file
+__all__ = ['ToolMarketplace', 'BaseTool', 'ToolRuntime', 'ToolTimeoutError', 'ToolResultCache', 'file_state_key']
\ No newline at end of file
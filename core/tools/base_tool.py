@@ -1,7 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, Hashable, List, Optional
+from core.tools.cache import args_key
 
 class BaseTool(ABC):
+    # Idempotent tools set cacheable; cache_key() and cache_ttl control reuse
+    cacheable: bool = False
+    cache_ttl: Optional[float] = None
+    # "thread" for IO-bound tools, "process" for CPU-bound ones, "sandbox" for isolation; timeout in seconds
+    executor: str = "thread"
+    timeout: Optional[float] = None
+    # rlimits applied when sandboxed: cpu_seconds, memory_mb, file_mb
+    limits: Optional[Dict[str, float]] = None
+
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -14,6 +24,12 @@ class BaseTool(ABC):
     def validate_inputs(self, **kwargs) -> bool:
         return True
 
+    def cache_key(self, **kwargs) -> Optional[Hashable]:
+        """
+        Key under which a result of this call may be reused; None disables caching for the call.
+        """
+        return args_key(kwargs)
+
     @property
     def requirements(self) -> List[str]:
         return []
@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PATH_ARGS = ("file_path", "path", "filename")
+
+
+def file_state_key(args: Dict) -> Optional[Hashable]:
+    """
+    Cache key for tools that read a file: the path plus its mtime and size, so
+    any change to the file produces a new key. None (do not cache) if the file
+    does not exist.
+    """
+    path = next((args[name] for name in PATH_ARGS if args.get(name)), None)
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    rest = {key: value for key, value in args.items() if key not in PATH_ARGS}
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, args_key(rest))
+
+
+def args_key(args: Dict) -> str:
+    return json.dumps(args, sort_keys=True, default=str)
+
+
+# Named key functions tools can refer to from their TOOL_CONFIG
+KEY_FUNCTIONS: Dict[str, Callable[[Dict], Optional[Hashable]]] = {
+    "args": args_key,
+    "file_state": file_state_key,
+}
+
+
+class ToolResultCache:
+    """
+    Bounded LRU of tool results for tools that declare themselves cacheable.
+
+    The key is (tool name, key function(args)); the key function defaults to
+    the canonical JSON of the arguments. Entries can also expire after the
+    tool's TTL. Results are returned as stored, not copied, so callers must not
+    mutate them.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, tool_name: str, args: Dict, key_function: Optional[Callable] = None) -> Optional[Tuple]:
+        try:
+            key = (key_function or args_key)(args)
+        except Exception as e:
+            logger.debug(f"[ToolResultCache] Key function for {tool_name} failed: {e}")
+            return None
+        return None if key is None else (tool_name, key)
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Tuple, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        """
+        Drop every cached result, or only those of 'tool_name'.
+        """
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == tool_name]:
+                    del self._entries[key]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
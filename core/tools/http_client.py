@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+from core.tools.cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpError(RuntimeError):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncHttpClient:
+    """
+    Pooled asyncio HTTP client for tools (aiohttp, imported on first use).
+
+    One event loop runs on a background thread, so synchronous tool code
+    (request(), request_many()) and coroutines (fetch(), fetch_many()) share the
+    same keep-alive connections. At most 'max_connections' connections are
+    open, 'max_connections_per_host' to one host, and 'max_concurrency'
+    requests in flight. Failed connections and 429/5xx responses are retried
+    'retries' times with jittered exponential backoff (honouring Retry-After).
+    Successful GET responses are cached for 'cache_ttl' seconds.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 32,
+        max_connections_per_host: int = 8,
+        max_concurrency: int = 16,
+        timeout: float = 15.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache_ttl: Optional[float] = 300.0,
+        cache_size: int = 256,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_ttl = cache_ttl
+        self.headers = headers or {}
+        self.cache = ToolResultCache(cache_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0, "errors": 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="http-client", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _get_session(self):
+        if self._session is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    @staticmethod
+    def _cache_key(method: str, url: str, params: Optional[Dict]) -> tuple:
+        return ("http", method, url, json.dumps(params or {}, sort_keys=True, default=str))
+
+    async def fetch(
+        self,
+        url: str,
+        method: str = "GET",
+        params: Optional[Dict] = None,
+        json_body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        use_cache: bool = True
+    ) -> Dict:
+        """
+        Returns {"status", "url", "headers", "text", "json"}; "json" is None
+        when the body is not JSON. Raises HttpError once retries are exhausted.
+        """
+        import aiohttp
+
+        cacheable = use_cache and self.cache_ttl and method == "GET"
+        if cacheable:
+            hit, value = self.cache.get(self._cache_key(method, url, params))
+            if hit:
+                self.stats["cache_hits"] += 1
+                return value
+
+        session = await self._get_session()
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+            delay = None
+            try:
+                async with self._semaphore:
+                    self.stats["requests"] += 1
+                    async with session.request(method, url, params=params, json=json_body, headers=headers) as response:
+                        text = await response.text()
+                        if response.status in RETRY_STATUSES:
+                            last_error = HttpError(f"{method} {url} returned {response.status}", response.status)
+                            delay = self._retry_after(response.headers.get("Retry-After"))
+                        elif response.status >= 400:
+                            self.stats["errors"] += 1
+                            raise HttpError(f"{method} {url} returned {response.status}", response.status)
+                        else:
+                            try:
+                                body = json.loads(text) if text else None
+                            except ValueError:
+                                body = None
+                            result = {
+                                "status": response.status,
+                                "url": str(response.url),
+                                "headers": dict(response.headers),
+                                "text": text,
+                                "json": body
+                            }
+                            if cacheable:
+                                self.cache.put(self._cache_key(method, url, params), result, self.cache_ttl)
+                            return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+            if attempt < self.retries:
+                delay = delay if delay is not None else self.backoff * (2 ** attempt) * (0.5 + random.random())
+                logger.debug(f"[AsyncHttpClient] Retrying {method} {url} in {delay:.2f}s: {last_error}")
+                await asyncio.sleep(delay)
+        self.stats["errors"] += 1
+        raise HttpError(f"{method} {url} failed after {self.retries + 1} attempts: {last_error}",
+                        getattr(last_error, "status", None))
+
+    @staticmethod
+    def _retry_after(value: Optional[str]) -> Optional[float]:
+        try:
+            return min(float(value), 30.0) if value else None
+        except ValueError:
+            return None
+
+    async def fetch_many(self, requests: List[Dict]) -> List[Any]:
+        """
+        Run fetch(**request) for each request concurrently. Returns, in order,
+        each response or the exception it raised.
+        """
+        return await asyncio.gather(*(self.fetch(**request) for request in requests), return_exceptions=True)
+
+    def request(self, url: str, **kwargs) -> Dict:
+        """
+        Blocking fetch() for synchronous callers such as tools.
+        """
+        return asyncio.run_coroutine_threadsafe(self.fetch(url, **kwargs), self._ensure_loop()).result()
+
+    def request_many(self, requests: List[Dict]) -> List[Any]:
+        return asyncio.run_coroutine_threadsafe(self.fetch_many(requests), self._ensure_loop()).result()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "cache": self.cache.get_stats()}
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+
+
+_default_client: Optional[AsyncHttpClient] = None
+_default_lock = threading.Lock()
+
+
+def default_http_client() -> AsyncHttpClient:
+    """
+    Process-wide client configured from HTTP_CONFIG, shared by all web tools.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            from config.settings import HTTP_CONFIG
+
+            _default_client = AsyncHttpClient(
+                max_connections=HTTP_CONFIG["max_connections"],
+                max_connections_per_host=HTTP_CONFIG["max_connections_per_host"],
+                max_concurrency=HTTP_CONFIG["max_concurrency"],
+                timeout=HTTP_CONFIG["timeout"],
+                retries=HTTP_CONFIG["retries"],
+                backoff=HTTP_CONFIG["backoff"],
+                cache_ttl=HTTP_CONFIG["cache_ttl"],
+                cache_size=HTTP_CONFIG["cache_size"],
+                headers={"User-Agent": HTTP_CONFIG["user_agent"]}
+            )
+        return _default_client
+
+
+def close_default_http_client():
+    global _default_client
+    with _default_lock:
+        client, _default_client = _default_client, None
+    if client is not None:
+        client.close()
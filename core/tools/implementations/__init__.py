@@ -1,12 +1,23 @@
 # core/tools/implementations/__init__.py
-from core.tools.implementations.file_tools import FileReader, FileWriter
-from core.tools.implementations.web_tools import WebSearch
-from core.tools.implementations.system_tools import SystemInfo, ProcessManager
-
-__all__ = [
-    'FileReader',
-    'FileWriter',
-    'WebSearch',
-    'SystemInfo',
-    'ProcessManager'
-]
+import importlib
+
+# Resolved on first access: ToolMarketplace imports a tool's module only when the
+# tool first runs, and importing one implementation must not import the others.
+_EXPORTS = {
+    'FileReader': 'core.tools.implementations.file_tools',
+    'FileWriter': 'core.tools.implementations.file_tools',
+    'WebSearch': 'core.tools.implementations.web_tools',
+    'SystemInfo': 'core.tools.implementations.system_tools',
+    'ProcessManager': 'core.tools.implementations.system_tools',
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'core.tools.implementations' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = list(_EXPORTS)
@@ -1,21 +1,181 @@
+import codecs
+import itertools
+import mmap
 import os
+import re
 import json
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from ..base_tool import BaseTool
+from ..cache import file_state_key
 
 class FileReader(BaseTool):
+    """
+    Reads a slice of a file with memory bounded by max_bytes, whatever the file size.
+
+    Modes:
+      full  - the file from the start, cut at max_bytes
+      head  - the first 'lines' lines
+      tail  - the last 'lines' lines (scanned backwards, via mmap on large files)
+      range - bytes [start, end), or lines start_line..end_line (1-based, inclusive)
+      grep  - lines matching the regex 'pattern', prefixed with line numbers
+
+    iter_chunks() and iter_lines() stream a file for callers that process it piecewise.
+    """
+    cacheable = True
+
+    MODES = ("full", "head", "tail", "range", "grep")
+    DEFAULT_MAX_BYTES = 1024 * 1024
+    # Files at least this large are memory-mapped for backwards scans and byte ranges
+    MMAP_THRESHOLD = 1024 * 1024
+    CHUNK_SIZE = 64 * 1024
+
     def __init__(self):
         super().__init__(
             name="file_reader",
-            description="Read content from files"
+            description="Read content from files (modes: full, head, tail, range, grep)"
         )
 
-    def execute(self, file_path: str) -> str:
+    def cache_key(self, **kwargs):
+        # Path + mtime + size: an edited file never serves a stale result
+        return file_state_key(kwargs)
+
+    def execute(
+        self,
+        file_path: str,
+        mode: str = "full",
+        lines: Optional[int] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        pattern: Optional[str] = None,
+        max_matches: int = 100,
+        max_bytes: Optional[int] = None,
+        encoding: str = "utf-8"
+    ) -> str:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        # Planner arguments arrive as strings
+        lines, start, end, start_line, end_line, max_matches, max_bytes = (
+            int(v) if v is not None else None
+            for v in (lines, start, end, start_line, end_line, max_matches, max_bytes)
+        )
+        max_bytes = max_bytes or self.DEFAULT_MAX_BYTES
+
+        if mode == "full":
+            return self._read_bytes(file_path, 0, None, max_bytes, encoding)
+        if mode == "head":
+            return self._join(self.iter_lines(file_path, 1, lines or 10, encoding), max_bytes)
+        if mode == "tail":
+            return self._tail(file_path, lines or 10, max_bytes, encoding)
+        if mode == "grep":
+            if not pattern:
+                raise ValueError("grep mode needs a 'pattern'")
+            return self._grep(file_path, pattern, max_matches, max_bytes, encoding)
+        if start_line is not None or end_line is not None:
+            return self._join(self.iter_lines(file_path, start_line or 1, end_line, encoding), max_bytes)
+        return self._read_bytes(file_path, start or 0, end, max_bytes, encoding)
+
+    def iter_chunks(self, file_path: str, chunk_size: Optional[int] = None, start: int = 0,
+                    end: Optional[int] = None, encoding: str = "utf-8") -> Iterator[str]:
+        """
+        Decoded text of bytes [start, end) in chunks of about chunk_size bytes.
+        Multi-byte characters split across chunk boundaries are decoded correctly.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else max(0, end - start)
+            while remaining is None or remaining > 0:
+                data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def iter_lines(self, file_path: str, start_line: int = 1, end_line: Optional[int] = None,
+                   encoding: str = "utf-8") -> Iterator[str]:
+        """
+        Lines start_line..end_line (1-based, inclusive), read one at a time.
+        """
+        with open(file_path, "r", encoding=encoding, errors="replace", newline="") as f:
+            yield from itertools.islice(f, max(start_line - 1, 0), end_line)
+
+    def _read_bytes(self, file_path: str, start: int, end: Optional[int], max_bytes: int, encoding: str) -> str:
+        size = os.path.getsize(file_path)
+        end = size if end is None else min(end, size)
+        start = min(max(start, 0), end)
+        stop = min(end, start + max_bytes)
+        if size >= self.MMAP_THRESHOLD:
+            with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = mapped[start:stop]
+        else:
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                data = f.read(stop - start)
+        text = data.decode(encoding, errors="replace")
+        if stop < end:
+            text += f"\n[truncated: showing bytes {start}-{stop} of {size}]"
+        return text
+
+    def _tail(self, file_path: str, count: int, max_bytes: int, encoding: str) -> str:
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return ""
+        with open(file_path, "rb") as f:
+            if size >= self.MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    start = self._tail_offset(mapped, size, count)
+                    data = mapped[max(start, size - max_bytes):]
+            else:
+                data = f.read()
+                data = data[max(self._tail_offset(data, size, count), size - max_bytes):]
+        return data.decode(encoding, errors="replace")
+
+    @staticmethod
+    def _tail_offset(buffer, size: int, count: int) -> int:
+        # Walk back over 'count' newlines, ignoring a trailing one
+        position = size - 1 if buffer[size - 1:size] == b"\n" else size
+        for _ in range(count):
+            position = buffer.rfind(b"\n", 0, position)
+            if position < 0:
+                return 0
+        return position + 1
+
+    def _grep(self, file_path: str, pattern: str, max_matches: int, max_bytes: int, encoding: str) -> str:
+        regex = re.compile(pattern)
+        matches = []
+        used = 0
+        for number, line in enumerate(self.iter_lines(file_path, encoding=encoding), 1):
+            if regex.search(line):
+                entry = f"{number}: {line.rstrip()}"
+                used += len(entry) + 1
+                if used > max_bytes or len(matches) >= max_matches:
+                    matches.append("[more matches omitted]")
+                    break
+                matches.append(entry)
+        return "\n".join(matches)
+
+    @staticmethod
+    def _join(lines: Iterable[str], max_bytes: int) -> str:
+        parts = []
+        used = 0
+        for line in lines:
+            used += len(line)
+            if used > max_bytes:
+                parts.append("\n[truncated]")
+                break
+            parts.append(line)
+        return "".join(parts)
 
 class FileWriter(BaseTool):
     def __init__(self):
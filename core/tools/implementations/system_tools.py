@@ -1,42 +1,66 @@
-import os
 import platform
 import psutil
+from typing import Optional
+from core.engine.system_snapshot import default_snapshot
 from ..base_tool import BaseTool
 
 class SystemInfo(BaseTool):
+    """
+    System stats from the shared snapshot; a sample younger than 'max_age'
+    seconds (e.g. one taken by the ResourceManager monitor) is reused.
+    """
+
     def __init__(self):
         super().__init__(
             name="system_info",
             description="Get system information"
         )
 
-    def execute(self) -> dict:
+    def execute(self, max_age: float = 5.0) -> dict:
+        sample = default_snapshot().system(float(max_age))
         return {
             'os': platform.system(),
-            'cpu_percent': psutil.cpu_percent(),
-            'memory_percent': psutil.virtual_memory().percent,
-            'disk_usage': psutil.disk_usage('/').percent
+            'cpu_percent': sample['cpu_percent'],
+            'memory_percent': sample['memory_percent'],
+            'disk_usage': sample['disk_usage'],
+            'process_count': sample['process_count']
         }
 
 class ProcessManager(BaseTool):
+    """
+    Actions:
+      list  - top_n processes sorted by cpu, rss, pid or name, optionally
+              filtered by 'name' substring and 'status'
+      delta - processes started, exited or changed since the previous sample
+      kill  - terminate 'pid'
+    """
+
     def __init__(self):
         super().__init__(
             name="process_manager",
-            description="Manage system processes"
+            description="Manage system processes (actions: list, delta, kill)"
         )
 
-    def execute(self, action: str = "list", pid: Optional[int] = None) -> dict:
+    def execute(
+        self,
+        action: str = "list",
+        pid: Optional[int] = None,
+        sort_by: str = "cpu",
+        top_n: int = 20,
+        name: Optional[str] = None,
+        status: Optional[str] = None,
+        max_age: float = 2.0
+    ) -> dict:
+        snapshot = default_snapshot()
         if action == "list":
-            return {
-                'processes': [{
-                    'pid': p.pid,
-                    'name': p.name(),
-                    'status': p.status()
-                } for p in psutil.process_iter(['pid', 'name', 'status'])]
-            }
+            processes = snapshot.processes(sort_by, int(top_n), name, status, float(max_age))
+            return {'processes': processes, 'count': len(processes)}
+        elif action == "delta":
+            return snapshot.delta(max_age=float(max_age))
         elif action == "kill" and pid:
             try:
-                psutil.Process(pid).terminate()
+                psutil.Process(int(pid)).terminate()
                 return {'status': 'success', 'message': f'Process {pid} terminated'}
-            except:
-                return {'status': 'error', 'message': f'Failed to terminate process {pid}'}
\ No newline at end of file
+            except psutil.Error:
+                return {'status': 'error', 'message': f'Failed to terminate process {pid}'}
+        return {'status': 'error', 'message': f'Unknown action {action}'}
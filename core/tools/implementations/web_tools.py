@@ -1,19 +1,71 @@
-import requests
+from typing import Dict, List, Optional
+from core.tools.http_client import default_http_client
 from ..base_tool import BaseTool
-from typing import List  # Add at top
 
 class WebSearch(BaseTool):
+    """
+    Queries the search endpoint in HTTP_CONFIG (a DuckDuckGo-style instant
+    answer API by default; point it at a local stub server for testing)
+    through the shared pooled HTTP client. The endpoint may return either a
+    list or {"results": [...]} of {title, url, snippet} objects, or the
+    DuckDuckGo format. search_many() runs several queries concurrently.
+    """
+
     def __init__(self):
         super().__init__(
             name="web_search",
             description="Perform web searches"
         )
 
-    def execute(self, query: str) -> str:
-        # Implement basic search functionality
-        # This is a placeholder - implement actual search logic
-        return f"Search results for: {query}"
+    def execute(self, query: str, max_results: int = 5, endpoint: Optional[str] = None) -> str:
+        return self.search_many([query], int(max_results), endpoint)[0]
+
+    def search_many(self, queries: List[str], max_results: int = 5, endpoint: Optional[str] = None) -> List[str]:
+        from config.settings import HTTP_CONFIG
+
+        endpoint = endpoint or HTTP_CONFIG["search_endpoint"]
+        responses = default_http_client().request_many([
+            {"url": endpoint, "params": {**HTTP_CONFIG["search_params"], HTTP_CONFIG["search_query_param"]: query}}
+            for query in queries
+        ])
+        results = []
+        for query, response in zip(queries, responses):
+            if isinstance(response, Exception):
+                results.append(f"Search failed for: {query} ({response})")
+                continue
+            hits = self._parse(response["json"])[:max_results]
+            if not hits:
+                results.append(f"No results for: {query}")
+                continue
+            results.append("\n".join(
+                f"- {hit['title']}: {hit['snippet']} ({hit['url']})" if hit["title"] else f"- {hit['snippet']} ({hit['url']})"
+                for hit in hits
+            ))
+        return results
+
+    @staticmethod
+    def _parse(body) -> List[Dict]:
+        if isinstance(body, dict) and "results" in body:
+            body = body["results"]
+        if isinstance(body, list):
+            return [
+                {"title": item.get("title", ""), "url": item.get("url", ""), "snippet": item.get("snippet", "")}
+                for item in body if isinstance(item, dict)
+            ]
+        if not isinstance(body, dict):
+            return []
+        hits = []
+        if body.get("AbstractText"):
+            hits.append({"title": body.get("Heading", ""), "url": body.get("AbstractURL", ""), "snippet": body["AbstractText"]})
+        topics = list(body.get("RelatedTopics", []))
+        while topics:
+            topic = topics.pop(0)
+            if "Topics" in topic:
+                topics.extend(topic["Topics"])
+            elif topic.get("Text"):
+                hits.append({"title": "", "url": topic.get("FirstURL", ""), "snippet": topic["Text"]})
+        return hits
 
     @property
     def requirements(self) -> List[str]:
-        return ["requests"]
\ No newline at end of file
+        return ["aiohttp"]
@@ -0,0 +1,200 @@
+import ast
+import importlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Class attributes of BaseTool subclasses copied into the manifest
+TOOL_CLASS_ATTRIBUTES = ("cacheable", "cache_ttl", "executor", "timeout", "limits")
+
+
+def _literal(node: ast.AST) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def _is_base_tool(node: ast.ClassDef) -> bool:
+    for base in node.bases:
+        if isinstance(base, ast.Name) and base.id == "BaseTool":
+            return True
+        if isinstance(base, ast.Attribute) and base.attr == "BaseTool":
+            return True
+    return False
+
+
+def _super_init_kwargs(node: ast.ClassDef) -> Dict[str, Any]:
+    """
+    Literal keyword arguments of the super().__init__(...) call in __init__.
+    """
+    for item in node.body:
+        if isinstance(item, ast.FunctionDef) and item.name == "__init__":
+            for call in ast.walk(item):
+                if (
+                    isinstance(call, ast.Call)
+                    and isinstance(call.func, ast.Attribute)
+                    and call.func.attr == "__init__"
+                    and isinstance(call.func.value, ast.Call)
+                    and isinstance(call.func.value.func, ast.Name)
+                    and call.func.value.func.id == "super"
+                ):
+                    return {kw.arg: _literal(kw.value) for kw in call.keywords if kw.arg}
+    return {}
+
+
+def _class_entry(node: ast.ClassDef, module: str) -> Optional[Dict]:
+    init_kwargs = _super_init_kwargs(node)
+    if not init_kwargs.get("name"):
+        return None
+    entry = {
+        "name": init_kwargs["name"],
+        "description": init_kwargs.get("description", ""),
+        "entry_point": f"{module}:{node.name}",
+        "kind": "class",
+        "requirements": []
+    }
+    for item in node.body:
+        if isinstance(item, ast.Assign):
+            for target in item.targets:
+                if isinstance(target, ast.Name) and target.id in TOOL_CLASS_ATTRIBUTES:
+                    entry[target.id] = _literal(item.value)
+        elif isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name):
+            if item.target.id in TOOL_CLASS_ATTRIBUTES and item.value is not None:
+                entry[item.target.id] = _literal(item.value)
+        elif isinstance(item, ast.FunctionDef) and item.name == "requirements":
+            returns = [n for n in ast.walk(item) if isinstance(n, ast.Return) and n.value is not None]
+            if len(returns) == 1:
+                entry["requirements"] = _literal(returns[0].value) or []
+    return entry
+
+
+def _function_entry(config: Any, module: str) -> Optional[Dict]:
+    if not (isinstance(config, dict) and config.get("name") and config.get("function")):
+        return None
+    entry = {key: value for key, value in config.items() if key != "function"}
+    entry["entry_point"] = f"{module}:{config['function']}"
+    entry["kind"] = "function"
+    return entry
+
+
+def _imported_entry(module: str) -> Optional[Dict]:
+    """
+    Entry for a module whose TOOL_CONFIG is built at import time: import it
+    and read the dict, as discovery did before the manifest. Marked 'dynamic'
+    so the manifest never caches it.
+    """
+    try:
+        config = getattr(importlib.import_module(module), "TOOL_CONFIG", None)
+    except Exception as e:
+        logger.error(f"[ToolManifest] Error importing tool module {module}: {e}", exc_info=True)
+        return None
+    entry = _function_entry(config, module)
+    if entry:
+        entry["dynamic"] = True
+    return entry
+
+
+def scan_source(source: str, module: str) -> List[Dict]:
+    """
+    Tool entries declared in one module: a TOOL_CONFIG dict (function tools)
+    and/or BaseTool subclasses, found without importing it. A TOOL_CONFIG
+    that is not a literal is read by importing the module instead.
+    """
+    tree = ast.parse(source)
+    entries = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "TOOL_CONFIG" for target in node.targets
+        ):
+            config = _literal(node.value)
+            if config is None:
+                logger.warning(f"[ToolManifest] TOOL_CONFIG in {module} is not a literal; importing the module to read it.")
+                entry = _imported_entry(module)
+            else:
+                entry = _function_entry(config, module)
+            if entry:
+                entries.append(entry)
+        elif isinstance(node, ast.ClassDef) and _is_base_tool(node):
+            entry = _class_entry(node, module)
+            if entry:
+                entries.append(entry)
+    return entries
+
+
+class ToolManifest:
+    """
+    On-disk cache of tool declarations (name, description, entry point,
+    options), keyed by source file path with its mtime and size. Only files
+    that changed since the last run are parsed again, and nothing is imported
+    except modules whose TOOL_CONFIG is not a literal; those are imported on
+    every scan and never cached.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._files: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"[ToolManifest] Ignoring unreadable manifest {path}: {e}")
+
+    def scan(self, sources: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        'sources' is a list of (directory, package) pairs. Returns the tool
+        entries of every non-private .py file, in directory order.
+        """
+        entries: List[Dict] = []
+        seen = set()
+        changed = False
+        for directory, package in sources:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(".py") or filename.startswith("_"):
+                    continue
+                file_path = os.path.abspath(os.path.join(directory, filename))
+                seen.add(file_path)
+                stat = os.stat(file_path)
+                cached = self._files.get(file_path)
+                if cached and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                    entries.extend(cached["tools"])
+                    continue
+                module = f"{package}.{filename[:-3]}"
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        tools = scan_source(f.read(), module)
+                except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                    logger.error(f"[ToolManifest] Could not scan {file_path}: {e}")
+                    tools = []
+                entries.extend(tools)
+                if any(tool.get("dynamic") for tool in tools):
+                    if self._files.pop(file_path, None) is not None:
+                        changed = True
+                    continue
+                self._files[file_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "tools": tools}
+                changed = True
+
+        stale = [file_path for file_path in self._files if file_path not in seen]
+        for file_path in stale:
+            del self._files[file_path]
+        if changed or stale:
+            self.save()
+        return entries
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"files": self._files}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"[ToolManifest] Could not save manifest {self.path}: {e}")
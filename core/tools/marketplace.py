@@ -1,51 +1,209 @@
 import logging
 import importlib
 import os
-from typing import Dict, List, Optional, Callable, Any
+import threading
+from typing import Dict, List, Optional, Callable, Any, Tuple
+from core.tools.base_tool import BaseTool
+from core.tools.cache import KEY_FUNCTIONS, ToolResultCache
+from core.tools.manifest import ToolManifest
 
 logger = logging.getLogger(__name__)
 
+# Built-in BaseTool implementations, discovered the same way as user tools
+IMPLEMENTATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "implementations")
+
 class Tool:
-    def __init__(self, name: str, description: str, function: Callable, requirements: List[str] = None):
+    """
+    A registered tool. Tools found through the manifest only carry an
+    'entry_point' ("module:attribute") and are imported on first use. The
+    attribute is either a plain function or a BaseTool subclass, which is
+    instantiated once and called through its execute().
+    """
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        function: Optional[Callable] = None,
+        requirements: List[str] = None,
+        entry_point: Optional[str] = None
+    ):
         self.name = name
         self.description = description
-        self.function = function
         self.requirements = requirements or []
+        self.entry_point = entry_point
         self.metadata = {}
+        self.instance: Optional[BaseTool] = None
+        self._function = function
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._function is not None
+
+    @property
+    def function(self) -> Callable:
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    self._load()
+        return self._function
+
+    def _load(self):
+        module_name, _, attribute = self.entry_point.partition(":")
+        target = getattr(importlib.import_module(module_name), attribute)
+        if isinstance(target, type) and issubclass(target, BaseTool):
+            self.instance = target()
+            self._function = self.instance.execute
+        else:
+            self._function = target
+        logger.debug(f"[ToolMarketplace] Imported tool {self.name} from {self.entry_point}")
+
+    def key_function(self) -> Optional[Callable[[Dict], Any]]:
+        """
+        The cache key function: a callable, a KEY_FUNCTIONS name, a function in
+        the tool's module, or (for BaseTool tools) the instance's cache_key().
+        """
+        key = self.metadata.get("cache_key")
+        if isinstance(key, str):
+            if key in KEY_FUNCTIONS:
+                return KEY_FUNCTIONS[key]
+            module_name = self.entry_point.partition(":")[0]
+            return getattr(importlib.import_module(module_name), key)
+        if key is None and self.metadata.get("kind") == "class":
+            self.function  # instantiates the tool
+            instance = self.instance
+            return lambda args: instance.cache_key(**args)
+        return key
 
 class ToolMarketplace:
-    def __init__(self, tools_directory: str = "tools"):
+    """
+    Unified registry of function tools (modules in 'tools_directory' with a
+    TOOL_CONFIG) and BaseTool classes (core/tools/implementations).
+
+    Discovery reads declarations from a cached manifest, parsing only files
+    whose mtime/size changed and importing nothing; a tool's module is
+    imported the first time it runs. Tools in 'tools_directory' win name
+    clashes. 'builtin_tools' limits which built-in implementations are
+    registered (None = all).
+    """
+    def __init__(
+        self,
+        tools_directory: str = "tools",
+        cache_size: int = 256,
+        manifest_path: Optional[str] = None,
+        builtin_tools: Optional[List[str]] = None
+    ):
         self.tools: Dict[str, Tool] = {}
         self.tools_directory = tools_directory
+        self.builtin_tools = builtin_tools
+        self.manifest = ToolManifest(manifest_path)
+        # Results of tools registered as cacheable
+        self.result_cache = ToolResultCache(cache_size)
         self.load_tools()
 
     def load_tools(self):
         if not os.path.exists(self.tools_directory):
             logger.info(f"[ToolMarketplace] No tools directory found at {self.tools_directory}.")
-            return
-        for filename in os.listdir(self.tools_directory):
-            if filename.endswith('.py') and not filename.startswith('_'):
-                try:
-                    module_name = filename[:-3]
-                    module = importlib.import_module(f"tools.{module_name}")
-                    if hasattr(module, 'TOOL_CONFIG'):
-                        tool_config = module.TOOL_CONFIG
-                        self.register_tool(
-                            name=tool_config['name'],
-                            description=tool_config['description'],
-                            function=getattr(module, tool_config['function']),
-                            requirements=tool_config.get('requirements', [])
-                        )
-                except Exception as e:
-                    logger.error(f"Error loading tool {filename}: {e}", exc_info=True)
-
-    def register_tool(self, name: str, description: str, function: Callable, requirements: List[str] = None) -> bool:
+        entries = self.manifest.scan([
+            (self.tools_directory, "tools"),
+            (IMPLEMENTATIONS_DIR, "core.tools.implementations")
+        ])
+        for entry in entries:
+            builtin = entry["entry_point"].startswith("core.tools.implementations.")
+            if builtin and self.builtin_tools is not None and entry["name"] not in self.builtin_tools:
+                continue
+            self.register_entry(entry)
+
+    def register_entry(self, entry: Dict) -> bool:
+        """
+        Register a tool from a manifest entry without importing it.
+        """
+        if entry["name"] in self.tools:
+            return False
+        tool = Tool(
+            entry["name"],
+            entry.get("description", ""),
+            requirements=entry.get("requirements", []),
+            entry_point=entry["entry_point"]
+        )
+        self._set_options(
+            tool,
+            kind=entry.get("kind", "function"),
+            executor=entry.get("executor") or "thread",
+            timeout=entry.get("timeout"),
+            cacheable=bool(entry.get("cacheable", False)),
+            cache_key=entry.get("cache_key"),
+            cache_ttl=entry.get("cache_ttl"),
+            limits=entry.get("limits")
+        )
+        self.tools[tool.name] = tool
+        logger.debug(f"[ToolMarketplace] Registered tool: {tool.name} ({tool.entry_point})")
+        return True
+
+    def register_base_tool(self, base_tool: BaseTool) -> bool:
+        """
+        Register an already constructed BaseTool instance.
+        """
+        if base_tool.name in self.tools:
+            return False
+        tool = Tool(base_tool.name, base_tool.description, base_tool.execute, base_tool.requirements)
+        tool.instance = base_tool
+        self._set_options(
+            tool,
+            kind="class",
+            executor=base_tool.executor,
+            timeout=base_tool.timeout,
+            cacheable=base_tool.cacheable,
+            cache_key=None,
+            cache_ttl=base_tool.cache_ttl,
+            limits=base_tool.limits
+        )
+        self.tools[tool.name] = tool
+        logger.info(f"[ToolMarketplace] Loaded tool: {tool.name}")
+        return True
+
+    def register_tool(
+        self,
+        name: str,
+        description: str,
+        function: Callable,
+        requirements: List[str] = None,
+        executor: str = "thread",
+        timeout: Optional[float] = None,
+        cacheable: bool = False,
+        cache_key: Optional[Callable[[Dict], Any]] = None,
+        cache_ttl: Optional[float] = None,
+        limits: Optional[Dict[str, float]] = None
+    ) -> bool:
+        """
+        'executor' is "thread" (IO-bound), "process" (CPU-bound) or "sandbox"
+        (isolated worker process, under 'limits'); the latter two need a function
+        importable at module level. 'timeout' overrides the runtime default.
+        Only idempotent tools should be 'cacheable'. 'cache_key' maps the call's
+        arguments to a key (None = do not cache this call; default: the arguments
+        themselves), e.g. file_state_key for file reads. 'cache_ttl' bounds
+        how long a result is reused.
+        """
         if name in self.tools:
             return False
-        self.tools[name] = Tool(name, description, function, requirements)
+        tool = Tool(name, description, function, requirements)
+        self._set_options(tool, "function", executor, timeout, cacheable, cache_key, cache_ttl, limits)
+        self.tools[name] = tool
         logger.info(f"[ToolMarketplace] Loaded tool: {name}")
         return True
 
+    @staticmethod
+    def _set_options(tool: Tool, kind: str, executor: str, timeout, cacheable: bool, cache_key, cache_ttl, limits=None):
+        tool.metadata["kind"] = kind
+        tool.metadata["executor"] = executor
+        tool.metadata["cacheable"] = cacheable
+        tool.metadata["cache_key"] = cache_key
+        tool.metadata["cache_ttl"] = cache_ttl
+        if timeout is not None:
+            tool.metadata["timeout"] = timeout
+        if limits:
+            tool.metadata["limits"] = limits
+
     def get_tool(self, name: str) -> Optional[Tool]:
         return self.tools.get(name)
 
@@ -59,8 +217,35 @@ class ToolMarketplace:
             for tool in self.tools.values()
         ]
 
+    def cache_key(self, name: str, args: Dict) -> Optional[Tuple]:
+        """
+        Result-cache key for this call, or None if the tool/call is not cacheable.
+        """
+        tool = self.get_tool(name)
+        if not tool or not tool.metadata.get("cacheable"):
+            return None
+        return self.result_cache.make_key(name, args, tool.key_function())
+
+    def store_result(self, name: str, key: Tuple, result: Any):
+        tool = self.get_tool(name)
+        self.result_cache.put(key, result, tool.metadata.get("cache_ttl") if tool else None)
+
+    def invalidate_cache(self, name: Optional[str] = None):
+        self.result_cache.invalidate(name)
+
+    def get_cache_stats(self) -> Dict:
+        return self.result_cache.get_stats()
+
     def execute_tool(self, name: str, **kwargs) -> Any:
         tool = self.get_tool(name)
         if not tool:
             raise ValueError(f"Tool {name} not found")
-        return tool.function(**kwargs)
+        key = self.cache_key(name, kwargs)
+        if key is not None:
+            hit, value = self.result_cache.get(key)
+            if hit:
+                return value
+        result = tool.function(**kwargs)
+        if key is not None:
+            self.store_result(name, key, result)
+        return result
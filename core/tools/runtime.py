@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+from core.tools.sandbox import SandboxPool
+
+logger = logging.getLogger(__name__)
+
+class ToolTimeoutError(TimeoutError):
+    pass
+
+
+class ToolRuntime:
+    """
+    Runs tools off the caller's thread with a per-call timeout.
+
+    Each tool declares where it runs in its metadata ("executor": "thread" for
+    IO-bound tools, the default, "process" for CPU-bound ones, or "sandbox"
+    for isolation in a SandboxPool under the tool's "limits") and may
+    override the timeout ("timeout", seconds). With 'sandbox' set, every tool
+    runs in the SandboxPool. submit() returns a Future that
+    fails with ToolTimeoutError once the deadline passes. Results of cacheable
+    tools are served from, and stored in, the marketplace's result cache.
+
+    Threads cannot be
+    killed, so a timed-out thread keeps running in the background; a timed-out
+    process call recycles the process pool so the stuck worker is terminated
+    (other process calls in flight at that moment fail as well). A timed-out
+    sandboxed call only replaces its own worker.
+    """
+
+    def __init__(
+        self,
+        marketplace,
+        max_threads: int = 8,
+        max_processes: int = 2,
+        default_timeout: Optional[float] = 30,
+        sandbox: bool = False,
+        sandbox_options: Optional[Dict] = None
+    ):
+        self.marketplace = marketplace
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.default_timeout = default_timeout
+        self.sandbox = sandbox
+        self.sandbox_options = sandbox_options or {}
+        self._threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="tool")
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._sandbox: Optional[SandboxPool] = None
+        self._process_lock = threading.Lock()
+        if sandbox:
+            # Workers start in the background, ready before the first tool call
+            self._sandbox_pool()
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._process_lock:
+            if self._processes is None:
+                # spawn: forking a process that holds llama.cpp models and threads is unsafe
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.max_processes,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+
+    def _sandbox_pool(self) -> SandboxPool:
+        with self._process_lock:
+            if self._sandbox is None:
+                self._sandbox = SandboxPool(**self.sandbox_options)
+            return self._sandbox
+
+    def _recycle_process_pool(self):
+        with self._process_lock:
+            pool, self._processes = self._processes, None
+        if pool is None:
+            return
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.warning("[ToolRuntime] Recycled process pool after a tool timeout.")
+
+    def submit(self, name: str, args: Optional[Dict] = None, timeout: Optional[float] = None) -> Future:
+        """
+        Start tool 'name' with keyword 'args'. The returned Future resolves to
+        the tool's return value, or raises its exception / ToolTimeoutError.
+        """
+        tool = self.marketplace.get_tool(name)
+        if not tool:
+            raise ValueError(f"Tool {name} not found")
+        args = args or {}
+        cache_key = self.marketplace.cache_key(name, args)
+        if cache_key is not None:
+            hit, value = self.marketplace.result_cache.get(cache_key)
+            if hit:
+                logger.debug(f"[ToolRuntime] {name} served from result cache")
+                cached: Future = Future()
+                cached.set_result(value)
+                return cached
+        executor_kind = "sandbox" if self.sandbox else tool.metadata.get("executor", "thread")
+        if timeout is None:
+            timeout = tool.metadata.get("timeout", self.default_timeout)
+
+        if executor_kind == "sandbox":
+            # Workers import the tool themselves; only the entry point and arguments are sent
+            inner = self._sandbox_pool().submit(tool.entry_point or tool.function, args, tool.metadata.get("limits"))
+        elif executor_kind == "process":
+            inner = self._process_pool().submit(tool.function, **args)
+        else:
+            inner = self._threads.submit(tool.function, **args)
+
+        outer: Future = Future()
+        outer.set_running_or_notify_cancel()
+        started = time.perf_counter()
+
+        def on_done(done: Future):
+            if outer.done():
+                return
+            try:
+                result = done.result()
+            except BaseException as e:
+                self._settle(outer, exception=e)
+            else:
+                if cache_key is not None:
+                    self.marketplace.store_result(name, cache_key, result)
+                self._settle(outer, result=result)
+            logger.debug(f"[ToolRuntime] {name} finished in {time.perf_counter() - started:.3f}s")
+
+        if timeout:
+            def on_timeout():
+                if self._settle(outer, exception=ToolTimeoutError(f"Tool {name} timed out after {timeout}s")):
+                    logger.warning(f"[ToolRuntime] {name} timed out after {timeout}s")
+                    if executor_kind == "sandbox":
+                        self._sandbox.cancel(inner)
+                    elif not inner.cancel() and executor_kind == "process":
+                        self._recycle_process_pool()
+
+            timer = threading.Timer(timeout, on_timeout)
+            timer.daemon = True
+            timer.start()
+            outer.add_done_callback(lambda _: timer.cancel())
+
+        inner.add_done_callback(on_done)
+        return outer
+
+    @staticmethod
+    def _settle(future: Future, result: Any = None, exception: Optional[BaseException] = None) -> bool:
+        # The worker and the timeout timer race to settle the same future
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+            return True
+        except Exception:
+            return False
+
+    def run(self, name: str, args: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        return self.submit(name, args, timeout).result()
+
+    def run_many(self, calls: List[Tuple[str, Dict]], timeout: Optional[float] = None) -> List[Any]:
+        """
+        Run independent tool calls concurrently. Returns one entry per call, in
+        order: the result, or the exception the call raised.
+        """
+        futures = []
+        for name, args in calls:
+            try:
+                futures.append(self.submit(name, args, timeout))
+            except Exception as e:
+                failed: Future = Future()
+                failed.set_exception(e)
+                futures.append(failed)
+        wait(futures)
+        return [f.exception() or f.result() for f in futures]
+
+    def get_sandbox_stats(self) -> Optional[Dict]:
+        return self._sandbox.get_stats() if self._sandbox else None
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        with self._process_lock:
+            if self._processes is not None:
+                self._processes.shutdown(wait=False, cancel_futures=True)
+                self._processes = None
+            if self._sandbox is not None:
+                self._sandbox.shutdown()
+                self._sandbox = None
@@ -0,0 +1,256 @@
+import logging
+import multiprocessing
+import pickle
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # not available on Windows; limits are then not enforced
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Tool "limits" keys and the rlimit each one lowers for the duration of a call
+LIMIT_RESOURCES = {
+    "cpu_seconds": "RLIMIT_CPU",
+    "memory_mb": "RLIMIT_AS",
+    "file_mb": "RLIMIT_FSIZE",
+}
+
+
+class ToolCrashedError(RuntimeError):
+    pass
+
+
+def _dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _rlimit_value(key: str, value: float) -> int:
+    if key == "cpu_seconds":
+        # RLIMIT_CPU counts total CPU time of the worker, so the budget is added to what it used so far
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return int(usage.ru_utime + usage.ru_stime + value) + 1
+    return int(value * 1024 * 1024)
+
+
+def _apply_limits(limits: Dict[str, float]) -> Dict[int, Tuple[int, int]]:
+    """
+    Lower the soft rlimits named in 'limits'; returns the previous values for _restore_limits.
+    """
+    previous = {}
+    if resource is None:
+        return previous
+    for key, value in limits.items():
+        if value is None or key not in LIMIT_RESOURCES:
+            continue
+        resource_id = getattr(resource, LIMIT_RESOURCES[key])
+        soft, hard = resource.getrlimit(resource_id)
+        wanted = _rlimit_value(key, value)
+        if hard != resource.RLIM_INFINITY:
+            wanted = min(wanted, hard)
+        resource.setrlimit(resource_id, (wanted, hard))
+        previous[resource_id] = (soft, hard)
+    return previous
+
+
+def _restore_limits(previous: Dict[int, Tuple[int, int]]):
+    for resource_id, limit in previous.items():
+        resource.setrlimit(resource_id, limit)
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker_main(conn):
+    """
+    Worker loop: receive (target, args, limits), run the tool, reply
+    ("ok" | "error", value, peak_rss_mb). A target is a tool entry point
+    ("module:attribute") resolved once per worker, or a picklable function.
+    """
+    # Imported here so the parent does not need the marketplace to start workers
+    from core.tools.marketplace import Tool
+
+    tools: Dict[str, Tool] = {}
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+        target, args, limits = pickle.loads(message)
+        previous = {}
+        try:
+            if isinstance(target, str):
+                if target not in tools:
+                    tools[target] = Tool(target, "", entry_point=target)
+                function = tools[target].function
+            else:
+                function = target
+            previous = _apply_limits(limits)
+            try:
+                reply = ("ok", function(**args))
+            finally:
+                _restore_limits(previous)
+        except BaseException as e:
+            reply = ("error", e)
+        try:
+            payload = _dumps(reply + (_peak_rss_mb(),))
+        except Exception as e:
+            # Unpicklable results/exceptions travel as text
+            payload = _dumps(("error", RuntimeError(f"{type(e).__name__}: {e} ({reply[1]!r})"), _peak_rss_mb()))
+        conn.send_bytes(payload)
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def stop(self):
+        self.conn.close()
+        self.process.terminate()
+        self.process.join(timeout=5)
+
+
+class SandboxPool:
+    """
+    Runs tool calls in a pool of worker processes started up front, so a
+    crashing, leaking or CPU-heavy tool cannot take down the agent or hold the
+    GIL against inference threads.
+
+    Workers are spawned (forking a process holding llama.cpp models is unsafe)
+    and replaced after 'max_calls' calls, once their peak RSS passes
+    'max_rss_mb', or when they die. Calls carry the tool's entry point and
+    arguments, pickled with the highest protocol. 'limits' (cpu_seconds,
+    memory_mb, file_mb) become soft rlimits for the duration of a call;
+    per-call limits override 'default_limits'.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_calls: Optional[int] = 100,
+        max_rss_mb: Optional[float] = 1024,
+        default_limits: Optional[Dict[str, float]] = None
+    ):
+        self.workers = workers
+        self.max_calls = max_calls
+        self.max_rss_mb = max_rss_mb
+        self.default_limits = default_limits or {}
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._running: Dict[Future, _Worker] = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+        self.stats = {"calls": 0, "errors": 0, "crashes": 0, "recycled": 0}
+        self._threads = [
+            threading.Thread(target=self._slot, name=f"sandbox-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, target: Union[str, Callable], args: Optional[Dict] = None,
+               limits: Optional[Dict[str, float]] = None) -> Future:
+        """
+        Queue a call of 'target' (entry point or module-level function) with keyword 'args'.
+        """
+        if self._stopping:
+            raise RuntimeError("SandboxPool is shut down")
+        future: Future = Future()
+        self._jobs.put((future, _dumps((target, args or {}, {**self.default_limits, **(limits or {})}))))
+        return future
+
+    def cancel(self, future: Future):
+        """
+        Stop a call: dequeued if still waiting, otherwise its worker is killed and replaced.
+        """
+        if future.cancel():
+            return
+        with self._lock:
+            worker = self._running.get(future)
+        if worker:
+            worker.process.terminate()
+
+    def _slot(self):
+        # Start the worker before the first call arrives, off the caller's thread
+        worker: Optional[_Worker] = _Worker(self._context)
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, payload = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if worker is None or not worker.process.is_alive():
+                worker = _Worker(self._context)
+            with self._lock:
+                self._running[future] = worker
+            try:
+                worker.conn.send_bytes(payload)
+                status, value, rss_mb = pickle.loads(worker.conn.recv_bytes())
+            except (EOFError, OSError) as e:
+                self.stats["crashes"] += 1
+                worker.stop()
+                code = worker.process.exitcode
+                worker = None
+                self._settle(future, exception=ToolCrashedError(f"Sandboxed tool worker died (exit code {code}): {e}"))
+                logger.warning(f"[SandboxPool] Worker died (exit code {code}); starting a new one.")
+                continue
+            finally:
+                with self._lock:
+                    self._running.pop(future, None)
+
+            self.stats["calls"] += 1
+            worker.calls += 1
+            if status == "ok":
+                self._settle(future, result=value)
+            else:
+                self.stats["errors"] += 1
+                self._settle(future, exception=value)
+            if (self.max_calls and worker.calls >= self.max_calls) or (self.max_rss_mb and rss_mb > self.max_rss_mb):
+                logger.info(f"[SandboxPool] Recycling worker after {worker.calls} calls ({rss_mb:.0f} MB peak RSS).")
+                self.stats["recycled"] += 1
+                worker.stop()
+                worker = None
+        if worker:
+            worker.stop()
+
+    @staticmethod
+    def _settle(future: Future, result: Any = None, exception: Optional[BaseException] = None):
+        # A caller-side timeout may already have settled the future
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "workers": self.workers, "queued": self._jobs.qsize()}
+
+    def shutdown(self):
+        self._stopping = True
+        while True:
+            try:
+                future, _ = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+        with self._lock:
+            running = list(self._running.values())
+        for worker in running:
+            worker.process.terminate()
+        for _ in self._threads:
+            self._jobs.put(None)
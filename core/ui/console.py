@@ -157,8 +157,9 @@ class ConsoleUI:
                 table = Table(title="Resource Status")
                 table.add_column("Resource")
                 table.add_column("Usage")
-                table.add_row("CPU", f"{status['cpu_usage']}%")
-                table.add_row("Memory", f"{status['memory_usage']}%")
+                table.add_row("CPU", f"{status['cpu_percent']}%")
+                table.add_row("Memory", f"{status['memory_percent']}%")
+                table.add_row("Disk", f"{status['disk_usage']}%")
                 table.add_row("GPU", "Available" if status['gpu_available'] else "Not Available")
                 self.console.print(table)
                 self.logs.append("[INFO] Displayed resource status")
@@ -173,6 +174,11 @@ class ConsoleUI:
             table.add_column("Status")
             table.add_row("Task Queue", str(len(self.engine.get_tasks())))
             table.add_row("Model", self.engine.config.get("model_path", "Not loaded"))
+            if hasattr(self.engine, 'tool_marketplace') and getattr(self.engine.tool_marketplace, 'is_loaded', True):
+                stats = self.engine.tool_marketplace.get_cache_stats()
+                table.add_row("Tool cache", f"{stats['hits']} hits / {stats['misses']} misses ({stats['entries']} entries)")
+            if hasattr(self.engine, 'startup'):
+                table.add_row("Startup", self.engine.startup.report() or "-")
             self.console.print(table)
             self.logs.append("[INFO] Displayed system status")
         except Exception as e:
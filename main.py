@@ -1,21 +1,32 @@
 import logging
+import os
 import sys
 import time
 import threading
 
-from config import get_config
+from config import get_config, SEMANTIC_CACHE_CONFIG, TOOL_CONFIG
 from core.models.llm import LlamaInterface
 from core.models.embedding_minilm import MiniLMInterface
+from core.models.autotune import autotune, cores_per_process
+from core.models.context import ContextBuilder
+from core.models.embedding_cache import EmbeddingCache, CachedEmbeddingInterface
+from core.models.inference_server import InferencePool, ProcessLlamaInterface, ProcessEmbeddingInterface
 from core.memory.vector import VectorStorage
 from core.memory.state import StateManager
+from core.memory.writer import MemoryWriter
+from core.memory.compaction import MemoryCompactor
 from core.engine.scheduler import TaskScheduler
 from core.engine.queue import TaskQueue
 from core.engine.executor import TaskExecutor
+from core.engine.result_cache import SemanticResultCache
 from core.engine.broker import MessageBroker  # if you have it
 from core.engine.resource_manager import ResourceManager
+from core.engine.startup import LazyComponent, StartupTimer
 from core.agents.planner import PlannerAgent   # if you have it
 from core.plugins.registry import PluginRegistry  # if you have it
 from core.tools.marketplace import ToolMarketplace
+from core.tools.runtime import ToolRuntime
+from core.tools.http_client import close_default_http_client
 from core.ui.console import ConsoleUI
 
 logging.basicConfig(
@@ -26,58 +37,241 @@ logging.basicConfig(
 
 class SuperLocal:
     def __init__(self):
+        self.startup = StartupTimer()
+
         # Load configuration
-        self.config = get_config()
+        with self.startup.phase("config"):
+            self.config = get_config()
 
         # Initialize broker, resource manager, tools
-        self.broker = MessageBroker()
-        self.resource_manager = ResourceManager(
-            max_memory_percent=self.config.get('max_memory_percent', 80.0),
-            max_cpu_percent=self.config.get('max_cpu_percent', 90.0)
-        )
-        self.tool_marketplace = ToolMarketplace()
+        with self.startup.phase("broker"):
+            self.broker = MessageBroker()
+            self.resource_manager = ResourceManager(
+                max_memory_percent=self.config.get('max_memory_percent', 80.0),
+                max_cpu_percent=self.config.get('max_cpu_percent', 90.0)
+            )
 
-        # Initialize Llama for generation
-        self.llm = LlamaInterface(
-            model_path=self.config["model_path"],
-            n_ctx=self.config["n_ctx"]
+        # Models, vector stores and the tools scan are built on first use (or in the
+        # background, see _warm_up) so the console comes up without waiting on them.
+        self.tool_marketplace = LazyComponent(
+            "tools",
+            lambda: ToolMarketplace(
+                cache_size=TOOL_CONFIG["result_cache_size"],
+                manifest_path=TOOL_CONFIG["manifest_path"],
+                builtin_tools=TOOL_CONFIG["enabled_tools"]
+            ),
+            self.startup
+        )
+        self.tool_runtime = ToolRuntime(
+            self.tool_marketplace,
+            max_threads=TOOL_CONFIG["max_tool_threads"],
+            max_processes=TOOL_CONFIG["max_tool_processes"],
+            default_timeout=TOOL_CONFIG["tool_timeout"],
+            sandbox=TOOL_CONFIG["sandbox"],
+            sandbox_options={
+                "workers": TOOL_CONFIG["sandbox_workers"],
+                "max_calls": TOOL_CONFIG["sandbox_max_calls"],
+                "max_rss_mb": TOOL_CONFIG["sandbox_max_rss_mb"],
+                "default_limits": TOOL_CONFIG["sandbox_limits"]
+            }
         )
 
-        # Initialize MiniLM for embeddings
-        self.embedder = MiniLMInterface(
-            model_path=self.config["embedding_model_path"],
-            n_ctx=512,
-            n_threads=4,
-            n_batch=128
+        self.llm_kwargs = {
+            "model_path": self.config["model_path"],
+            "n_ctx": self.config["n_ctx"],
+            "n_threads": self.config["n_threads"],
+            "n_batch": self.config["n_batch"],
+            "speculative": self.config["speculative"],
+            "draft_model_path": self.config["draft_model_path"],
+            "num_pred_tokens": self.config["num_pred_tokens"]
+        }
+        self.embedding_kwargs = {
+            "model_path": self.config["embedding_model_path"],
+            "n_ctx": 512,
+            "n_threads": 4,
+            "n_batch": 128
+        }
+
+        self.inference_pool = None
+        if self.config.get("inference_mode") == "worker_pool":
+            # Generation and embeddings run in separate model processes
+            self.inference_pool = LazyComponent("inference_pool", self._create_inference_pool, self.startup)
+        self.llm = LazyComponent("llm", self._create_llm, self.startup)
+        self.embedder = LazyComponent("embedder", self._create_embedder, self.startup)
+
+        # Shared so token counts are cached across the planner and executors
+        self.context_builder = ContextBuilder(
+            self.llm,
+            n_ctx=self.config["n_ctx"],
+            max_tokens=self.config["max_tokens"]
         )
 
         # Initialize vector storage with embedding interface
-        self.memory = VectorStorage(embedding_interface=self.embedder)
+        self.memory = LazyComponent("memory", lambda: self._create_vector_storage("agent_memory"), self.startup)
+        self.memory_writer = None
+        if self.config.get("write_results", True):
+            self.memory_writer = MemoryWriter(
+                self.memory,
+                max_queue=self.config["write_queue_size"],
+                batch_size=self.config["write_batch_size"],
+                flush_interval=self.config["write_flush_interval"],
+                chunk_size=self.config["write_chunk_size"],
+                chunk_overlap=self.config["write_chunk_overlap"],
+                embedder=self.embedder
+            )
+        self.compactor = None
+        if self.config.get("compaction_interval"):
+            self.compactor = MemoryCompactor(
+                self.memory,
+                similarity_threshold=self.config["dedup_threshold"],
+                policy=self.config["dedup_policy"],
+                max_entries=self.config["max_memory_entries"],
+                max_bytes=self.config["max_memory_bytes"],
+                interval=self.config["compaction_interval"],
+                vacuum_ratio=self.config["compaction_vacuum_ratio"]
+            )
+            self.compactor.start()
 
         # Initialize state, queue, scheduler, executor
-        self.state = StateManager(self.config.get('state_db_path', 'agent_state.db'))
-        self.queue = TaskQueue()
-        self.scheduler = TaskScheduler(self.queue, self.state)
+        with self.startup.phase("state"):
+            self.state = StateManager(
+                self.config.get('state_db_path', 'agent_state.db'),
+                max_step_outputs=self.config.get('max_step_outputs', 10000),
+                step_output_ttl=self.config.get('step_output_ttl', 30 * 24 * 3600)
+            )
+            self.queue = TaskQueue()
+            self.scheduler = TaskScheduler(self.queue, self.state)
+
+        # Optional semantic cache so near-duplicate tasks skip inference
+        self.result_cache = None
+        if SEMANTIC_CACHE_CONFIG["enabled"]:
+            self.result_cache = SemanticResultCache(
+                LazyComponent(
+                    "result_cache",
+                    lambda: self._create_vector_storage(SEMANTIC_CACHE_CONFIG["collection_name"]),
+                    self.startup
+                ),
+                similarity_threshold=SEMANTIC_CACHE_CONFIG["similarity_threshold"],
+                ttl=SEMANTIC_CACHE_CONFIG["ttl"]
+            )
+
         self.executor = TaskExecutor(
             llm=self.llm,
             memory=self.memory,
             resource_manager=self.resource_manager,
             tool_marketplace=self.tool_marketplace,
-            broker=self.broker
+            broker=self.broker,
+            result_cache=self.result_cache,
+            context_builder=self.context_builder,
+            memory_writer=self.memory_writer,
+            tool_runtime=self.tool_runtime
         )
 
         # If you have a Planner agent or plugin registry:
-        self.planner = PlannerAgent(self.llm, self.memory)  # or pass embedder if needed
+        self.planner = PlannerAgent(
+            self.llm,
+            self.memory,
+            self.context_builder,
+            tool_marketplace=self.tool_marketplace,
+            use_grammar=self.config.get("planner_grammar", False),
+            max_steps=self.config.get("max_tasks", 10)
+        )
         self.plugins = PluginRegistry()
 
         # UI
-        self.ui = ConsoleUI(self)
+        with self.startup.phase("ui"):
+            self.ui = ConsoleUI(self)
 
         # Start a background worker thread to auto-execute tasks
         self._running = True
         self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
         self.worker_thread.start()
 
+        logging.getLogger(__name__).info(
+            f"[SuperLocal] Ready in {self.startup.elapsed() * 1000:.0f} ms ({self.startup.report()})"
+        )
+        if self.config.get("preload_models", True):
+            threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+
+    def _warm_up(self):
+        """
+        Load the deferred components one after another so they do not compete
+        for CPU and disk, then report the full startup timings.
+        """
+        components = [self.tool_marketplace, self.inference_pool, self.llm, self.embedder, self.memory]
+        if self.result_cache:
+            components.append(self.result_cache.storage)
+        for component in components:
+            if component is None or not self._running:
+                continue
+            component.preload()
+        logging.getLogger(__name__).info(
+            f"[SuperLocal] Background loading finished after {self.startup.elapsed():.1f}s ({self.startup.report()})"
+        )
+
+    def _tuned(self, kwargs: dict, embedding: bool = False, processes: int = 1) -> dict:
+        """
+        Settings for one of 'processes' model processes: tuned if autotune is on,
+        and with n_threads capped so the processes together do not oversubscribe the cores.
+        """
+        if self.config.get("autotune"):
+            # Tuned settings are cached per (model file, process count, host), so only the first run pays for this
+            tuned = autotune(
+                kwargs["model_path"], kwargs["n_ctx"], self.config["autotune_cache_path"],
+                embedding=embedding, processes=processes
+            )
+            kwargs = {**kwargs, **(tuned or {})}
+        if processes > 1:
+            kwargs = {**kwargs, "n_threads": min(kwargs["n_threads"], cores_per_process(processes))}
+        return kwargs
+
+    def _create_inference_pool(self) -> InferencePool:
+        workers = self.config.get("inference_workers", 2)
+        return InferencePool(
+            self._tuned(self.llm_kwargs, processes=workers),
+            self._tuned(self.embedding_kwargs, embedding=True, processes=workers),
+            num_workers=workers
+        )
+
+    def _create_llm(self):
+        if self.inference_pool:
+            return ProcessLlamaInterface(self.inference_pool.resolve())
+        # Initialize Llama for generation
+        return LlamaInterface(**self._tuned(self.llm_kwargs))
+
+    def _create_embedder(self) -> CachedEmbeddingInterface:
+        if self.inference_pool:
+            embedder = ProcessEmbeddingInterface(self.inference_pool.resolve())
+        else:
+            # Initialize MiniLM for embeddings
+            embedder = MiniLMInterface(**self._tuned(self.embedding_kwargs, embedding=True))
+
+        # Repeated texts are served from the on-disk embedding cache instead of the model
+        return CachedEmbeddingInterface(
+            embedder,
+            EmbeddingCache(
+                self.config["embedding_cache_dir"],
+                model_id=os.path.basename(self.embedding_kwargs["model_path"]),
+                max_memory_items=self.config["embedding_cache_size"]
+            )
+        )
+
+    def _create_vector_storage(self, collection_name: str) -> VectorStorage:
+        return VectorStorage(
+            embedding_interface=self.embedder,
+            collection_name=collection_name,
+            persist_directory=self.config["vector_db_path"],
+            context_cache_ttl=self.config.get("context_cache_ttl", 30.0),
+            backend=self.config.get("vector_backend", "chroma"),
+            backend_options=(
+                {
+                    "hnsw_threshold": self.config["hnsw_threshold"],
+                    "indexed_keys": self.config["indexed_metadata_keys"]
+                }
+                if self.config.get("vector_backend") == "native" else None
+            )
+        )
+
     def _worker_loop(self):
         """
         Continuously pull tasks from the queue and execute them.
@@ -88,15 +282,23 @@ class SuperLocal:
                 time.sleep(1)  # No pending tasks, sleep briefly
                 continue
 
-            print(f"[WORKER] Picked up task '{task['description']}' (ID: {task['id']}).")
-            result = self.execute_task(task)
-            if result:
-                print(f"[WORKER] Task '{task['description']}' completed with result:\n{result}\n")
-                self.scheduler.complete_task(task['id'], result)
-            else:
-                print(f"[WORKER] Task '{task['description']}' had no result or failed.")
-                task['status'] = 'failed'
-                self.state.update_task(task['id'], task)
+            print(f"[WORKER] Picked up task '{task.get('description') or task.get('tool_name')}' (ID: {task['id']}).")
+            if task.get('type') == 'tool':
+                # Tools run on the tool runtime's pools; keep pulling so independent calls overlap
+                future = self.executor.submit_tool_task(task)
+                future.add_done_callback(lambda done, task=task: self._finish_task(task, done.result()))
+                continue
+            self._finish_task(task, self.execute_task(task))
+
+    def _finish_task(self, task: dict, result):
+        label = task.get('description') or f"tool {task.get('tool_name')}"
+        if result:
+            print(f"[WORKER] Task '{label}' completed with result:\n{result}\n")
+            self.scheduler.complete_task(task['id'], result)
+        else:
+            print(f"[WORKER] Task '{label}' had no result or failed.")
+            task['status'] = 'failed'
+            self.state.update_task(task['id'], task)
 
     def start(self):
         print("SuperLocal starting...")
@@ -114,6 +316,21 @@ class SuperLocal:
             self.worker_thread.join()
             self.resource_manager.stop()
             self.broker.stop()
+            self.tool_runtime.shutdown()
+            close_default_http_client()
+            if self.compactor:
+                self.compactor.stop()
+            if self.memory_writer:
+                self.memory_writer.stop()
+            # Only close what was actually loaded; closing must not trigger a load
+            if self.inference_pool and self.inference_pool.is_loaded:
+                self.inference_pool.stop()
+            if self.memory.is_loaded:
+                self.memory.close()
+            if self.result_cache and self.result_cache.storage.is_loaded:
+                self.result_cache.storage.close()
+            if self.embedder.is_loaded:
+                self.embedder.close()
             # self.executor.stop() if needed
         except Exception as e:
             print(f"Error during cleanup: {e}")